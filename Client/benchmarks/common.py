@@ -0,0 +1,60 @@
+"""Shared helpers for the camera client benchmarks.
+
+Run the scripts from the camera folder, e.g.
+``python benchmarks/bench_decode_workers.py``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2  # type: ignore  # noqa: E402
+import numpy as np  # noqa: E402
+
+from decoders import DEFAULT_CASCADE  # noqa: E402
+
+
+def detector_args(**overrides) -> argparse.Namespace:
+    """Return client arguments with the default model paths."""
+    base = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    args = argparse.Namespace(
+        model_path=os.path.join(base, "barcode_yolo.pt"),
+        yolo_batch=0,
+        yolo_max_wait_ms=10.0,
+        yolo_imgsz=640,
+        decode_threads=1,
+        decode_workers=0,
+        wechat_det_prototxt=os.path.join(base, "detect.prototxt"),
+        wechat_det_model=os.path.join(base, "detect.caffemodel"),
+        wechat_sr_prototxt=os.path.join(base, "sr.prototxt"),
+        wechat_sr_model=os.path.join(base, "sr.caffemodel"),
+        decoders=DEFAULT_CASCADE,
+        adaptive_decoders=False,
+        roi_full_scan_every=1,
+        roi_ttl=1.0,
+    )
+    for key, value in overrides.items():
+        setattr(args, key, value)
+    return args
+
+
+def synthetic_frames(count: int = 16, width: int = 1280, height: int = 1080, seed: int = 0) -> List[np.ndarray]:
+    """Return noisy frames, each with one QR code at a random position."""
+    rng = np.random.default_rng(seed)
+    encoder = cv2.QRCodeEncoder.create()
+    frames = []
+    for i in range(count):
+        frame = rng.integers(90, 140, size=(height, width, 3), dtype=np.uint8)
+        qr = encoder.encode(f"OLPN{i:08d}")
+        size = int(rng.integers(120, 220))
+        qr = cv2.resize(qr, (size, size), interpolation=cv2.INTER_NEAREST)
+        x = int(rng.integers(0, width - size))
+        y = int(rng.integers(0, height - size))
+        frame[y : y + size, x : x + size] = qr[..., None]
+        frames.append(frame)
+    return frames
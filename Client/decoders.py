@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+"""Pluggable barcode/QR decoders and the instrumented decoder cascade."""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Callable, Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import cv2  # type: ignore
+import numpy as np
+from pyzbar import pyzbar  # type: ignore
+
+try:
+    from ultralytics import YOLO  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    YOLO = None  # type: ignore
+
+log = logging.getLogger(__name__)
+
+UPSCALE = 1.5
+YOLO_TIMEOUT = 10.0  # seconds a decoder waits for the shared YOLO service
+DEFAULT_CASCADE = "barcode,qr,wechat,pyzbar,yolo"
+
+
+class Detection(NamedTuple):
+    """A located barcode; ``text`` is empty if it could not be decoded."""
+
+    text: str
+    points: np.ndarray  # polygon in original frame coordinates
+
+
+def _rect(x: int, y: int, w: int, h: int) -> np.ndarray:
+    return np.array([[x, y], [x + w, y], [x + w, y + h], [x, y + h]], dtype=np.float32)
+
+
+class Decoder:
+    """Base class: find barcodes in a grayscale image (``frame`` is BGR)."""
+
+    name = ""
+    crop_retry = True  # also used to read the upscaled crops of undecoded codes
+
+    def decode(self, gray: np.ndarray, frame: np.ndarray) -> List[Detection]:
+        raise NotImplementedError
+
+
+class BarcodeDecoder(Decoder):
+    """OpenCV 1D barcode detector."""
+
+    name = "barcode"
+
+    def __init__(self, args) -> None:
+        self.detector = cv2.barcode_BarcodeDetector()  # type: ignore
+
+    def decode(self, gray: np.ndarray, frame: np.ndarray) -> List[Detection]:
+        retval, decoded_info, points, _ = self.detector.detectAndDecodeMulti(gray)
+        if not retval:
+            return []
+        return [
+            Detection(text, pts.reshape(-1, 2)) for text, pts in zip(decoded_info, points) if text
+        ]
+
+
+class QRDecoder(Decoder):
+    """OpenCV QR code detector."""
+
+    name = "qr"
+
+    def __init__(self, args) -> None:
+        self.detector = cv2.QRCodeDetector()
+
+    def decode(self, gray: np.ndarray, frame: np.ndarray) -> List[Detection]:
+        data, bbox, _ = self.detector.detectAndDecode(gray)
+        if bbox is None or not len(bbox):
+            return []
+        return [Detection(data or "", bbox.reshape(-1, 2))]
+
+
+class WeChatDecoder(Decoder):
+    """WeChat CNN-based QR code detector."""
+
+    name = "wechat"
+
+    def __init__(self, args) -> None:
+        if not hasattr(cv2, "wechat_qrcode"):
+            raise RuntimeError("opencv-contrib wechat_qrcode module not available")
+        self.detector = cv2.wechat_qrcode.WeChatQRCode(
+            args.wechat_det_prototxt,
+            args.wechat_det_model,
+            args.wechat_sr_prototxt,
+            args.wechat_sr_model,
+        )
+
+    def decode(self, gray: np.ndarray, frame: np.ndarray) -> List[Detection]:
+        try:
+            texts, points = self.detector.detectAndDecode(gray)
+        except Exception as exc:  # pragma: no cover - runtime issues
+            log.warning("WeChatQRCode detection failed: %s", exc)
+            return []
+        return [Detection(text or "", pts.reshape(-1, 2)) for text, pts in zip(texts, points)]
+
+
+class PyzbarDecoder(Decoder):
+    """ZBar 1D/2D decoder."""
+
+    name = "pyzbar"
+
+    def __init__(self, args) -> None:
+        pass
+
+    def decode(self, gray: np.ndarray, frame: np.ndarray) -> List[Detection]:
+        return [Detection(bc.data.decode("utf-8"), _rect(*bc.rect)) for bc in pyzbar.decode(gray)]
+
+
+class YOLODecoder(Decoder):
+    """YOLO barcode localisation followed by ZBar on each box.
+
+    Inference goes through the process-wide :class:`yolo_service.YOLOService`,
+    which batches frames from every decode thread and camera. A frame the
+    service does not answer within ``YOLO_TIMEOUT`` has no YOLO detections.
+    """
+
+    name = "yolo"
+    crop_retry = False  # a crop is a whole extra inference just to locate the same code
+
+    def __init__(self, args) -> None:
+        if YOLO is None:
+            raise RuntimeError("ultralytics is not installed")
+        if not os.path.exists(args.model_path):
+            raise RuntimeError(f"YOLO model file '{args.model_path}' not found")
+        from yolo_service import shared_service
+
+        self.service = shared_service(args)
+
+    def decode(self, gray: np.ndarray, frame: np.ndarray) -> List[Detection]:
+        try:
+            boxes = self.service(frame, timeout=YOLO_TIMEOUT)
+        except FutureTimeout:
+            log.warning("YOLO service did not answer within %.0f s", YOLO_TIMEOUT)
+            return []
+        found = []
+        for x1, y1, x2, y2 in boxes:
+            detected = pyzbar.decode(gray[y1:y2, x1:x2])
+            if not detected:
+                found.append(Detection("", _rect(x1, y1, x2 - x1, y2 - y1)))
+            for bc in detected:
+                x, y, w, h = bc.rect
+                found.append(Detection(bc.data.decode("utf-8"), _rect(x1 + x, y1 + y, w, h)))
+        return found
+
+
+DECODERS: Dict[str, Callable[..., Decoder]] = {
+    cls.name: cls
+    for cls in (BarcodeDecoder, QRDecoder, WeChatDecoder, PyzbarDecoder, YOLODecoder)
+}
+
+
+def build_decoders(
+    spec: str, args, shared: Optional[Dict[str, Optional[Decoder]]] = None
+) -> List[Decoder]:
+    """Instantiate the comma separated decoder names in ``spec``.
+
+    Decoders whose dependencies or models are missing are skipped. Instances
+    already in ``shared`` are reused, and new ones are added to it, so
+    several cascades can share one copy of each model.
+    """
+    shared = {} if shared is None else shared
+    decoders = []
+    for name in (n.strip().lower() for n in spec.split(",")):
+        if not name:
+            continue
+        if name not in DECODERS:
+            raise ValueError(f"Unknown decoder '{name}', expected one of {', '.join(DECODERS)}")
+        if name not in shared:
+            try:
+                shared[name] = DECODERS[name](args)
+            except Exception as exc:  # pragma: no cover - optional dependency
+                log.warning("Decoder '%s' disabled: %s", name, exc)
+                shared[name] = None
+        if shared[name] is not None:
+            decoders.append(shared[name])
+    return decoders
+
+
+class DecoderStats:
+    """Call count, hit rate and timing of one decoder."""
+
+    def __init__(self, samples: int = 1024) -> None:
+        self.calls = 0
+        self.hits = 0
+        self.total = 0.0
+        self._recent: Deque[float] = deque(maxlen=samples)
+
+    def record(self, elapsed: float, hit: bool) -> None:
+        self.calls += 1
+        self.hits += hit
+        self.total += elapsed
+        self._recent.append(elapsed)
+
+    @property
+    def mean_ms(self) -> float:
+        return 1000 * self.total / self.calls if self.calls else 0.0
+
+    @property
+    def p99_ms(self) -> float:
+        if not self._recent:
+            return 0.0
+        ordered = sorted(self._recent)
+        return 1000 * ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))]
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.calls if self.calls else 0.0
+
+    @property
+    def score(self) -> float:
+        """Smoothed hits per millisecond, used by the adaptive cascade."""
+        return (self.hits + 1) / (1000 * self.total + self.mean_ms + 1)
+
+
+Timing = Tuple[str, float, bool]
+
+
+class CascadeStats:
+    """Thread-safe per-decoder statistics, keyed by decoder name."""
+
+    def __init__(self) -> None:
+        self.decoders: Dict[str, DecoderStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, timings: Iterable[Timing]) -> None:
+        with self._lock:
+            for name, elapsed, hit in timings:
+                self.decoders.setdefault(name, DecoderStats()).record(elapsed, hit)
+
+    def report(self) -> str:
+        with self._lock:
+            rows = [
+                f"  {name:<8}{s.calls:>8}{s.hit_rate:>8.0%}{s.mean_ms:>10.1f}{s.p99_ms:>10.1f}"
+                for name, s in self.decoders.items()
+            ]
+        header = f"  {'decoder':<8}{'calls':>8}{'hits':>8}{'mean ms':>10}{'p99 ms':>10}"
+        return "\n".join([header] + rows)
+
+
+class Cascade:
+    """Run ``decoders`` in order until one finds something.
+
+    Frames are decoded at native resolution. Codes that are located but
+    not decoded are retried once on a crop upscaled by :data:`UPSCALE`, by
+    the decoders with ``crop_retry`` and without adding to the stats. In
+    adaptive mode the order is re-sorted every ``reorder_every`` frames by
+    observed hits per millisecond.
+    """
+
+    def __init__(
+        self,
+        decoders: List[Decoder],
+        adaptive: bool = False,
+        reorder_every: int = 100,
+        upscale_retry: bool = True,
+    ) -> None:
+        self.decoders = list(decoders)
+        self.adaptive = adaptive
+        self.reorder_every = reorder_every
+        self.upscale_retry = upscale_retry
+        self.stats = CascadeStats()
+        self._frames = 0
+        self._timings: List[Timing] = []
+        self._gray: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_args(
+        cls, args, spec: Optional[str] = None, shared: Optional[Dict[str, Optional[Decoder]]] = None
+    ) -> "Cascade":
+        return cls(
+            build_decoders(spec or args.decoders or DEFAULT_CASCADE, args, shared),
+            adaptive=args.adaptive_decoders,
+        )
+
+    def _to_gray(self, frame: np.ndarray) -> np.ndarray:
+        """Convert ``frame`` into a grayscale buffer reused across calls."""
+        if frame.ndim == 2:
+            return frame
+        if self._gray is None or self._gray.shape != frame.shape[:2]:
+            self._gray = np.empty(frame.shape[:2], dtype=np.uint8)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._gray)
+
+    def _run(self, gray: np.ndarray, frame: np.ndarray) -> List[Detection]:
+        found: List[Detection] = []
+        timings = []
+        for decoder in self.decoders:
+            start = time.perf_counter()
+            found = decoder.decode(gray, frame)
+            timings.append((decoder.name, time.perf_counter() - start, bool(found)))
+            if found:
+                break
+        self.stats.record(timings)
+        self._timings.extend(timings)
+        return found
+
+    def _retry_upscaled(self, det: Detection, frame: np.ndarray) -> Detection:
+        """Decode an upscaled crop around an undecoded detection."""
+        height, width = frame.shape[:2]
+        x1, y1 = det.points.min(axis=0)
+        x2, y2 = det.points.max(axis=0)
+        margin = 0.1 * max(x2 - x1, y2 - y1)
+        x1, y1 = max(0, int(x1 - margin)), max(0, int(y1 - margin))
+        x2, y2 = min(width, int(x2 + margin) + 1), min(height, int(y2 + margin) + 1)
+        if x2 <= x1 or y2 <= y1:
+            return det
+        crop = cv2.resize(
+            frame[y1:y2, x1:x2], None, fx=UPSCALE, fy=UPSCALE, interpolation=cv2.INTER_LINEAR
+        )
+        gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+        offset = np.array([x1, y1], dtype=np.float32)
+        for decoder in self.decoders:
+            if not decoder.crop_retry:
+                continue
+            for retry in decoder.decode(gray, crop):
+                if retry.text:
+                    return Detection(retry.text, retry.points / UPSCALE + offset)
+        return det
+
+    def __call__(self, frame: np.ndarray) -> List[Detection]:
+        found = self._run(self._to_gray(frame), frame)
+        if self.upscale_retry:
+            found = [det if det.text else self._retry_upscaled(det, frame) for det in found]
+
+        self._frames += 1
+        if self.adaptive and self._frames % self.reorder_every == 0:
+            self.reorder()
+        return found
+
+    def reorder(self) -> None:
+        stats = self.stats.decoders
+        self.decoders.sort(
+            key=lambda d: stats[d.name].score if d.name in stats else float("inf"),
+            reverse=True,
+        )
+
+    def pop_timings(self) -> List[Timing]:
+        """Return and clear the timings recorded since the last call."""
+        timings, self._timings = self._timings, []
+        return timings
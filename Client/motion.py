@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""Cheap scene-change detection used to skip decoding static frames."""
+
+from __future__ import annotations
+
+import time
+from typing import Optional, Tuple
+
+import cv2  # type: ignore
+import numpy as np
+
+
+class MotionGate:
+    """Decide whether a frame differs enough from the last decoded one.
+
+    Frames are shrunk to ``size`` grayscale thumbnails; a frame counts as
+    changed when more than ``threshold`` percent of the thumbnail pixels
+    differ by over ``pixel_delta`` levels. Counting changed pixels rather
+    than averaging the difference keeps a small label entering the view
+    from being diluted by the static background. A decode is forced at
+    least every ``force_interval`` seconds; a ``threshold`` of 0 disables
+    the gate.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.5,
+        force_interval: float = 2.0,
+        size: Tuple[int, int] = (64, 36),
+        pixel_delta: int = 25,
+    ) -> None:
+        self.threshold = threshold
+        self.force_interval = force_interval
+        self.size = size
+        self.pixel_delta = pixel_delta
+        self.checked = 0
+        self.skipped = 0
+        self._reference: Optional[np.ndarray] = None
+        self._last_decode = 0.0
+
+    def __call__(self, image: np.ndarray, now: Optional[float] = None) -> bool:
+        """Return ``True`` if ``image`` should be decoded."""
+        self.checked += 1
+        if self.threshold <= 0:
+            return True
+        now = time.monotonic() if now is None else now
+        thumb = cv2.resize(image, self.size, interpolation=cv2.INTER_AREA)
+        if thumb.ndim == 3:
+            thumb = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+        if (
+            self._reference is not None
+            and now - self._last_decode < self.force_interval
+            and self._changed_percent(thumb) <= self.threshold
+        ):
+            self.skipped += 1
+            return False
+        self._reference = thumb
+        self._last_decode = now
+        return True
+
+    def _changed_percent(self, thumb: np.ndarray) -> float:
+        diff = cv2.absdiff(thumb, self._reference)
+        return 100.0 * np.count_nonzero(diff > self.pixel_delta) / diff.size
+
+    def __str__(self) -> str:
+        rate = self.skipped / self.checked if self.checked else 0.0
+        return f"motion gate: skipped {self.skipped}/{self.checked} ({rate:.0%})"
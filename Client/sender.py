@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""Background delivery of scans to the server."""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from spool import ScanSpool
+
+ResultCallback = Callable[[Dict, Optional[bool]], None]
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+log = logging.getLogger(__name__)
+
+
+class ScanSender:
+    """Queue scans and post them in batches from a background thread.
+
+    ``submit`` never blocks: when the queue is full the oldest scan is
+    dropped. Validation results are handed to ``on_result`` from the sender
+    thread, so the callback must be cheap.
+
+    With a ``spool``, a batch whose first post fails is written to disk
+    straight away instead of being retried inline, so the queue keeps
+    draining while the server is down; spooled scans are replayed in bulk
+    once the server answers again. Replayed scans get
+    their ``on_result`` call when the replay succeeds. Only scans the server
+    rejects as malformed are ever discarded (counted in ``rejected``).
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        on_result: Optional[ResultCallback] = None,
+        max_queue: int = 1000,
+        max_batch: int = 50,
+        max_delay: float = 0.05,
+        timeout: float = 2.0,
+        retries: int = 3,
+        backoff: float = 0.5,
+        spool: Optional[ScanSpool] = None,
+        replay_batch: int = 500,
+    ) -> None:
+        self.batch_url = base_url.rstrip("/") + "/api/scans/batch"
+        self.on_result = on_result
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.spool = spool
+        self.replay_batch = replay_batch
+        self.sent = 0
+        self.replayed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.rejected = 0
+
+        self._queue: "queue.Queue[Dict]" = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._offline_until = 0.0
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._thread = threading.Thread(target=self._run, name="scan-sender", daemon=True)
+
+    def start(self) -> "ScanSender":
+        self._thread.start()
+        return self
+
+    def submit(self, payload: Dict) -> None:
+        """Queue ``payload`` for delivery without blocking."""
+        while True:
+            try:
+                self._queue.put_nowait(payload)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush queued scans for up to ``timeout`` seconds and stop.
+
+        Scans still queued afterwards are spooled when a spool is configured.
+        """
+        self._stop.set()
+        self._thread.join(timeout)
+        if self.spool is not None and not self._thread.is_alive():
+            leftover = []
+            while not self._queue.empty():
+                leftover.append(self._queue.get_nowait())
+            self.spool.push(leftover)
+        self._session.close()
+
+    def _next_batch(self) -> List[Dict]:
+        try:
+            batch = [self._queue.get(timeout=0.2)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self._deliver(batch)
+            if not self._stop.is_set():
+                self._replay()
+
+    def _offline(self) -> bool:
+        return time.monotonic() < self._offline_until
+
+    def _post(self, batch: List[Dict], retries: int) -> Optional[List[Dict]]:
+        """Post ``batch`` with retries; return the per-scan results or ``None``.
+
+        ``None`` means the batch was not stored and must be kept. Scans the
+        server rejects as malformed are dropped, the rest are posted again
+        and the dropped ones get an empty result.
+        """
+        for attempt in range(retries + 1):
+            try:
+                resp = self._session.post(self.batch_url, json=batch, timeout=self.timeout)
+                if resp.ok:
+                    return resp.json().get("results", [])
+                if resp.status_code == 400:
+                    return self._post_without_rejected(batch, resp, retries)
+                if resp.status_code == 413 and len(batch) > 1:
+                    return self._post_halves(batch, retries)
+                if resp.status_code not in RETRY_STATUSES:
+                    # e.g. 404 from a server without the batch endpoint: keep the
+                    # scans until it is upgraded rather than drop them
+                    log.warning(
+                        "Server refused %d scans (%d): %s",
+                        len(batch), resp.status_code, resp.text[:200],
+                    )
+                    break
+                log.warning("Server busy (%d), retrying %d scans", resp.status_code, len(batch))
+            except (requests.RequestException, ValueError) as exc:
+                log.warning("Failed to send %d scans: %s", len(batch), exc)
+            if attempt < retries and self._stop.wait(self.backoff * 2**attempt):
+                break
+        self._offline_until = time.monotonic() + self.backoff * 2**retries
+        return None
+
+    def _post_halves(self, batch: List[Dict], retries: int) -> Optional[List[Dict]]:
+        half = len(batch) // 2
+        first = self._post(batch[:half], retries)
+        if first is None:
+            return None
+        second = self._post(batch[half:], retries)
+        return None if second is None else first + second
+
+    def _post_without_rejected(
+        self, batch: List[Dict], resp: requests.Response, retries: int
+    ) -> Optional[List[Dict]]:
+        """Drop the scans a 400 response names and post the rest again."""
+        try:
+            errors = resp.json().get("errors") or []
+            rejected = {int(error["index"]) for error in errors} & set(range(len(batch)))
+        except (ValueError, TypeError, KeyError, AttributeError):
+            rejected = set()
+        if not rejected:
+            if len(batch) > 1:  # no scan named: narrow it down
+                return self._post_halves(batch, retries)
+            rejected = {0}
+        log.warning(
+            "Server rejected %d of %d scans: %s", len(rejected), len(batch), resp.text[:200]
+        )
+        self.rejected += len(rejected)
+        kept = [payload for index, payload in enumerate(batch) if index not in rejected]
+        kept_results = self._post(kept, retries) if kept else []
+        if kept_results is None:
+            return None
+        results = iter(kept_results)
+        return [{} if index in rejected else next(results, {}) for index in range(len(batch))]
+
+    def _deliver(self, batch: List[Dict]) -> None:
+        if self.spool is not None and (self._offline() or len(self.spool)):
+            # keep capture order: replay what is already spooled first
+            self.spool.push(batch)
+            return
+        # with a spool, retrying here would only stall the queue behind this batch
+        results = self._post(batch, 0 if self.spool is not None else self.retries)
+        if results is None:
+            self.failed += len(batch)
+            if self.spool is not None:
+                self.spool.push(batch)
+            return
+        self.sent += len(batch)
+        self._report(batch, results)
+
+    def _report(self, batch: List[Dict], results: List[Dict]) -> None:
+        if self.on_result is None:
+            return
+        for payload, result in zip(batch, results):
+            if "valid" in result:
+                self.on_result(payload, bool(result["valid"]))
+
+    def _replay(self) -> None:
+        """Send one chunk of spooled scans if the server looks reachable."""
+        if self.spool is None or not len(self.spool) or self._offline():
+            return
+        last_id, batch = self.spool.peek(self.replay_batch)
+        if not batch:
+            return
+        results = self._post(batch, retries=0)
+        if results is not None:
+            self.spool.ack(last_id)
+            self.replayed += len(batch)
+            # live scans queue behind the spool, so this is their only result
+            self._report(batch, results)
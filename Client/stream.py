@@ -3,197 +3,253 @@
 
 from __future__ import annotations
 
-import os
-from typing import Dict
+import logging
+import signal
+import threading
+from typing import Any, Dict, List, Optional, Tuple
 import time
 
 import cv2 # type: ignore
-from pyzbar import pyzbar # type: ignore
+import numpy as np
+
+import utils
+import yolo_service
+from decoders import Cascade, Detection, Timing
+from dedup import make_deduper
+from pipeline import DecodePool, DropOldestQueue, FrameGrabber, FrameResult, StageStats
+from motion import MotionGate
+from procpool import ProcessDecodePool
+from sender import ScanSender
+from spool import ScanSpool
+from tracker import ROITracker
+
+WINDOW_NAME = "Security Camera Stream"
+
+log = logging.getLogger(__name__)
+
+
+class FrameDecoder:
+    """Per-worker decode function: a decoder cascade plus optional ROI tracking.
+
+    Regions are decoded only where the tracker expects barcodes; the full
+    frame is scanned when it asks for it or when its regions come back empty.
+
+    Each ``source`` (camera) gets its own cascade and tracker, while the
+    decoder models are loaded once per worker. ``args.source_decoders`` may
+    map a source to its own cascade spec.
+    """
+
+    def __init__(self, args) -> None:
+        self.args = args
+        self._models: Dict[str, Any] = {}
+        self._cascades: Dict[str, Cascade] = {}
+        self._trackers: Dict[str, Optional[ROITracker]] = {}
+
+    def _state(self, source: str) -> Tuple[Cascade, Optional[ROITracker]]:
+        if source not in self._cascades:
+            spec = getattr(self.args, "source_decoders", {}).get(source)
+            self._cascades[source] = Cascade.from_args(self.args, spec, self._models)
+            self._trackers[source] = None
+            if self.args.roi_full_scan_every > 1:
+                self._trackers[source] = ROITracker(
+                    self.args.roi_full_scan_every, ttl=self.args.roi_ttl
+                )
+        return self._cascades[source], self._trackers[source]
+
+    def __call__(self, frame: np.ndarray, source: str = "") -> List[Detection]:
+        cascade, tracker = self._state(source)
+        if tracker is None:
+            return cascade(frame)
+        rois = tracker.plan(frame.shape)
+        found: List[Detection] = []
+        if rois is not None:
+            for x1, y1, x2, y2 in rois:
+                offset = np.array([x1, y1], dtype=np.float32)
+                for det in cascade(frame[y1:y2, x1:x2]):
+                    found.append(Detection(det.text, det.points + offset))
+            if not found:
+                tracker.reset()
+        if rois is None or not found:
+            found = cascade(frame)
+        tracker.update(det.points for det in found)
+        return found
+
+    def pop_timings(self) -> List[Timing]:
+        timings: List[Timing] = []
+        for cascade in self._cascades.values():
+            timings.extend(cascade.pop_timings())
+        return timings
+
+
+def draw_detections(
+    image: np.ndarray, detections: List[Detection], scale: Tuple[float, float] = (1.0, 1.0)
+) -> None:
+    """Outline ``detections`` on ``image``: green if decoded, yellow if not.
+
+    ``scale`` maps frame coordinates to ``image`` coordinates.
+    """
+    for det in detections:
+        pts = (det.points * scale).astype(np.int32)
+        color = (0, 255, 0) if det.text else (0, 255, 255)
+        cv2.polylines(image, [pts], True, color, 1)
+        if det.text:
+            x, y = pts[0]
+            cv2.putText(
+                image, det.text, (int(x), int(y) - 4), cv2.FONT_HERSHEY_SIMPLEX, 0.4, color, 1
+            )
 
-from utils import send_barcode
 
-try:
-    from ultralytics import YOLO # type: ignore
-except ImportError:  # pragma: no cover - optional dependency
-    YOLO = None  # type: ignore
+class DisplayRenderer:
+    """Render the small preview image into buffers reused across frames."""
 
+    def __init__(self, size: Tuple[int, int] = (250, 250)) -> None:
+        self.size = size
+        self._small = np.empty((size[1], size[0], 3), dtype=np.uint8)
+        self._flash = np.empty_like(self._small)
+        self._flash_color: Optional[Tuple[int, int, int]] = None
 
-def run_stream(cap: cv2.VideoCapture, camera_info: Dict[str, str], args) -> None:
-    """Display ``cap`` frames and detect barcodes/QR codes."""
-    last_scanned: Dict[str, float] = {}
-    flash_color = None
-    flash_end = 0.0
-
-    detector = cv2.QRCodeDetector()
-    barcode_detector = cv2.barcode_BarcodeDetector()  # type: ignore
-
-    wechat_detector = None
-    if hasattr(cv2, "wechat_qrcode"):
-        try:
-            wechat_detector = cv2.wechat_qrcode.WeChatQRCode(
-                args.wechat_det_prototxt,
-                args.wechat_det_model,
-                args.wechat_sr_prototxt,
-                args.wechat_sr_model,
-            )
-        except Exception as exc:  # pragma: no cover - optional dependency
-            print(f"Failed to load WeChatQRCode models: {exc}")
-
-    yolo_model = None
-    if YOLO is not None:
-        model_path = args.model_path
-        if os.path.exists(model_path):
-            try:
-                yolo_model = YOLO(model_path)
-            except Exception as exc:  # pragma: no cover - model loading optional
-                print(f"Failed to load YOLO model from {model_path}: {exc}")
-        else:
-            print(
-                f"YOLO model file '{model_path}' not found. Barcode detection with YOLO disabled."
-            )
+    def render(
+        self,
+        frame: np.ndarray,
+        detections: List[Detection],
+        flash_color: Optional[Tuple[int, int, int]] = None,
+    ) -> np.ndarray:
+        """Downscale ``frame`` and draw ``detections`` and the flash on it.
+
+        The returned array is overwritten by the next call.
+        """
+        cv2.resize(frame, self.size, dst=self._small)
+        if detections:
+            scale = (self.size[0] / frame.shape[1], self.size[1] / frame.shape[0])
+            draw_detections(self._small, detections, scale)
+        if flash_color is not None:
+            if flash_color != self._flash_color:
+                self._flash[:] = flash_color
+                self._flash_color = flash_color
+            cv2.addWeighted(self._small, 0.7, self._flash, 0.3, 0, dst=self._small)
+        return self._small
 
-    cv2.namedWindow("Security Camera Stream", cv2.WINDOW_NORMAL)
-    cv2.resizeWindow("Security Camera Stream", 250, 250)
-
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            print("Failed to read frame")
-            break
-
-        frame = cv2.resize(frame, None, fx=1.5, fy=1.5, interpolation=cv2.INTER_LINEAR)
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
-        display_frame = frame.copy()
-
-        retval, decoded_info, points, _ = barcode_detector.detectAndDecodeMulti(gray)
-        if retval:
-            for text, pts in zip(decoded_info, points):
-                if text:
-                    pts = pts.astype(int).reshape(-1, 2)
-                    cv2.polylines(display_frame, [pts], True, (0, 255, 0), 2)
-                    cv2.putText(
-                        display_frame,
-                        text,
-                        tuple(pts[0]),
-                        cv2.FONT_HERSHEY_SIMPLEX,
-                        0.6,
-                        (0, 255, 0),
-                        2,
-                    )
-                    result = send_barcode(text, camera_info, last_scanned)
-                    if result is not None:
-                        flash_color = (0, 255, 0) if result else (0, 0, 255)
-                        flash_end = time.time() + 1.5
-        else:
-            data, bbox, _ = detector.detectAndDecode(gray)
-            if bbox is not None and len(bbox):
-                points = bbox.astype(int).reshape(-1, 2)
-                cv2.polylines(display_frame, [points], True, (0, 255, 0), 2)
-                if data:
-                    cv2.putText(
-                        display_frame,
-                        data,
-                        tuple(points[0]),
-                        cv2.FONT_HERSHEY_SIMPLEX,
-                        0.6,
-                        (0, 255, 0),
-                        2,
-                    )
-                    result = send_barcode(data, camera_info, last_scanned)
-                    if result is not None:
-                        flash_color = (0, 255, 0) if result else (0, 0, 255)
-                        flash_end = time.time() + 1.5
-            else:
-                texts, w_points = [], []
-                if wechat_detector is not None:
-                    try:
-                        texts, w_points = wechat_detector.detectAndDecode(gray)
-                    except Exception as exc:  # pragma: no cover - runtime issues
-                        print(f"WeChatQRCode detection failed: {exc}")
-
-                if w_points:
-                    for text, pts in zip(texts, w_points):
-                        pts = pts.astype(int).reshape(-1, 2)
-                        cv2.polylines(display_frame, [pts], True, (0, 255, 0), 2)
-                        if text:
-                            cv2.putText(
-                                display_frame,
-                                text,
-                                tuple(pts[0]),
-                                cv2.FONT_HERSHEY_SIMPLEX,
-                                0.6,
-                                (0, 255, 0),
-                                2,
-                            )
-                            result = send_barcode(text, camera_info, last_scanned)
-                            if result is not None:
-                                flash_color = (0, 255, 0) if result else (0, 0, 255)
-                                flash_end = time.time() + 1.5
-                else:
-                    barcodes = pyzbar.decode(gray)
-                    if not barcodes and yolo_model is not None:
-                        results = yolo_model(frame, verbose=False)
-                        for bbox in results.boxes.xyxy.tolist():  # type: ignore
-                            x1, y1, x2, y2 = map(int, bbox)
-                            roi = gray[y1:y2, x1:x2]
-                            detected = pyzbar.decode(roi)
-                            if detected:
-                                for bc in detected:
-                                    x, y, w, h = bc.rect
-                                    cv2.rectangle(
-                                        display_frame,
-                                        (x1 + x, y1 + y),
-                                        (x1 + x + w, y1 + y + h),
-                                        (0, 255, 0),
-                                        2,
-                                    )
-                                    barcode_data = bc.data.decode("utf-8")
-                                    cv2.putText(
-                                        display_frame,
-                                        barcode_data,
-                                        (x1 + x, y1 + y - 10),
-                                        cv2.FONT_HERSHEY_SIMPLEX,
-                                        0.6,
-                                        (0, 255, 0),
-                                        2,
-                                    )
-                                    result = send_barcode(barcode_data, camera_info, last_scanned)
-                                    if result is not None:
-                                        flash_color = (0, 255, 0) if result else (0, 0, 255)
-                                        flash_end = time.time() + 1.5
-                            else:
-                                cv2.rectangle(display_frame, (x1, y1), (x2, y2), (0, 255, 255), 2)
-                    else:
-                        for barcode in barcodes:
-                            x, y, w, h = barcode.rect
-                            cv2.rectangle(display_frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
-                            barcode_data = barcode.data.decode("utf-8")
-                            cv2.putText(
-                                display_frame,
-                                barcode_data,
-                                (x, y - 10),
-                                cv2.FONT_HERSHEY_SIMPLEX,
-                                0.6,
-                                (0, 255, 0),
-                                2,
-                            )
-                            result = send_barcode(barcode_data, camera_info, last_scanned)
-                            if result is not None:
-                                flash_color = (0, 255, 0) if result else (0, 0, 255)
-                                flash_end = time.time() + 1.5
-
-        if flash_color is not None and time.time() < flash_end:
-            overlay = display_frame.copy()
-            overlay[:] = flash_color
-            cv2.addWeighted(overlay, 0.3, display_frame, 0.7, 0, display_frame)
-        else:
-            flash_color = None
 
-        small_frame = cv2.resize(display_frame, (250, 250))
-        cv2.imshow("Security Camera Stream", small_frame)
-        if cv2.waitKey(1) & 0xFF == ord("q"):
-            break
+def install_signal_handlers(stop: threading.Event) -> None:
+    """Stop the stream gracefully on SIGINT/SIGTERM."""
 
+    def handler(signum, _frame) -> None:
+        log.info("Received signal %s, shutting down", signum)
+        stop.set()
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, handler)
+
+
+def run_stream(cap: cv2.VideoCapture, camera_info: Dict[str, str], args) -> None:
+    """Display ``cap`` frames and detect barcodes/QR codes.
+
+    Capture, decoding and display run as separate stages connected by
+    drop-oldest queues, so a slow decoder never delays ``cap.read()``.
+    With ``args.headless`` nothing is drawn or shown; the loop runs until
+    SIGINT/SIGTERM and reports its status through logging only.
+    """
+    dedup = make_deduper(camera_info, args)
+    flash: Dict[str, Any] = {"color": None, "end": 0.0}
+    stop = threading.Event()
+
+    def on_result(payload: Dict[str, str], valid: Optional[bool]) -> None:
+        flash["color"] = (0, 255, 0) if valid else (0, 0, 255)
+        flash["end"] = time.time() + 1.5
+
+    def log_result(payload: Dict[str, str], valid: Optional[bool]) -> None:
+        if valid:
+            log.info("Scan %s valid at %s", payload["barcode"], payload["area"])
+        else:
+            log.warning("Scan %s NOT valid at %s", payload["barcode"], payload["area"])
+
+    spool = ScanSpool(args.spool_path, max_bytes=int(args.spool_max_mb * 1024 * 1024))
+    sender = ScanSender(
+        utils.server_url(camera_info),
+        on_result=log_result if args.headless else on_result,
+        spool=spool,
+    ).start()
+
+    frames = DropOldestQueue(maxsize=1)
+    results = DropOldestQueue(maxsize=8)
+    gate = MotionGate(args.motion_threshold, args.force_decode_interval)
+    grabber = FrameGrabber(cap, frames, gate=gate).start()
+    if args.decode_workers > 0:
+        decoders = ProcessDecodePool(args, frames, results, workers=args.decode_workers).start()
+    else:
+        decoders = DecodePool(lambda: FrameDecoder(args), frames, results, workers=args.decode_threads).start()
+    display_stats = StageStats("display")
+    e2e_stats = StageStats("end-to-end")
+    stats_due = time.monotonic() + args.stats_interval
+
+    def handle(result: FrameResult) -> None:
+        e2e_stats.record(result.decoded_at - result.captured_at)
+        for det in result.detections:
+            if dedup(det.text, result.captured_at):
+                sender.submit(utils.build_payload(det.text, camera_info, result.captured_at))
+
+    if args.headless:
+        install_signal_handlers(stop)
+        log.info("Headless stream started for %s", camera_info.get("Camera Name", ""))
+    else:
+        renderer = DisplayRenderer((250, 250))
+        cv2.namedWindow(WINDOW_NAME, cv2.WINDOW_NORMAL)
+        cv2.resizeWindow(WINDOW_NAME, 250, 250)
+
+    shown_seq = 0
+    latest_result = None
+    while grabber.running and not stop.is_set():
+        if args.headless:
+            result = results.get(timeout=0.5)
+            if result is not None:
+                handle(result)
+        else:
+            frame = grabber.wait_latest(shown_seq, timeout=0.1)
+            for result in results.drain():
+                handle(result)
+                if latest_result is None or result.seq > latest_result.seq:
+                    latest_result = result
+
+            if frame is not None and frame.seq > shown_seq:
+                shown_seq = frame.seq
+                detections = []
+                if latest_result is not None and time.time() - latest_result.decoded_at < 0.5:
+                    detections = latest_result.detections
+                if flash["color"] is not None and time.time() >= flash["end"]:
+                    flash["color"] = None
+                cv2.imshow(WINDOW_NAME, renderer.render(frame.image, detections, flash["color"]))
+                display_stats.record(time.time() - frame.captured_at)
+
+            if cv2.waitKey(1) & 0xFF == ord("q"):
+                break
+
+        if args.stats_interval and time.monotonic() >= stats_due:
+            stats_due = time.monotonic() + args.stats_interval
+            stages = [grabber.stats, decoders.stats, e2e_stats]
+            if not args.headless:
+                stages.insert(2, display_stats)
+            log.info(
+                "%s | dropped frames: %d | %s | %s | scans sent: %d, replayed: %d, "
+                "spooled: %d, dropped: %d, rejected: %d",
+                " | ".join(str(s) for s in stages),
+                frames.dropped,
+                gate,
+                dedup,
+                sender.sent,
+                sender.replayed,
+                len(spool),
+                sender.dropped,
+                sender.rejected,
+            )
+            log.info("decoder cascade:\n%s", decoders.decoder_stats.report())
+            if yolo_service.current() is not None:
+                log.info("%s", yolo_service.current())
+
+    grabber.stop()
+    decoders.stop()
+    sender.close()
+    spool.close()
     cap.release()
-    cv2.destroyAllWindows()
+    if not args.headless:
+        cv2.destroyAllWindows()
+    log.info("Stream stopped")
@@ -0,0 +1,108 @@
+"""Decoder cascade: order, adaptive reordering, statistics and the crop retry."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+decoders = pytest.importorskip("decoders", exc_type=ImportError)  # needs OpenCV and ZBar
+from decoders import Cascade, Decoder, Detection  # noqa: E402
+
+FRAME = np.zeros((120, 160, 3), np.uint8)
+BOX = np.array([[40, 40], [80, 40], [80, 60], [40, 60]], np.float32)
+
+
+class StubDecoder(Decoder):
+    """Returns ``full`` on the whole frame and ``crop`` on anything smaller."""
+
+    def __init__(self, name, full=(), crop=(), crop_retry=True):
+        self.name = name
+        self.full = list(full)
+        self.crop = list(crop)
+        self.crop_retry = crop_retry
+        self.calls = []
+
+    def decode(self, gray, frame):
+        whole = frame.shape == FRAME.shape
+        self.calls.append("frame" if whole else "crop")
+        return self.full if whole else self.crop
+
+
+def calls(cascade):
+    return {name: stats.calls for name, stats in cascade.stats.decoders.items()}
+
+
+def test_crop_retry_reads_text_without_counting_as_a_pass():
+    locator = StubDecoder("yolo", full=[Detection("", BOX)], crop_retry=False)
+    reader = StubDecoder("pyzbar", crop=[Detection("OLPN1", BOX * 0 + 3)])
+    cascade = Cascade([reader, locator])
+
+    found = cascade(FRAME)
+
+    assert [det.text for det in found] == ["OLPN1"]
+    # crop coordinates map back into the frame around the located box
+    assert (found[0].points >= 30).all() and (found[0].points <= 90).all()
+    assert reader.calls == ["frame", "crop"]
+    assert locator.calls == ["frame"]  # not rerun on the crop
+    assert calls(cascade) == {"pyzbar": 1, "yolo": 1}
+    assert [name for name, _elapsed, _hit in cascade.pop_timings()] == ["pyzbar", "yolo"]
+
+
+def test_cascade_stops_at_the_first_hit_in_order():
+    miss = StubDecoder("qr")
+    hit = StubDecoder("barcode", full=[Detection("A1", BOX)])
+    unused = StubDecoder("pyzbar", full=[Detection("B2", BOX)])
+    cascade = Cascade([miss, hit, unused])
+
+    assert [det.text for det in cascade(FRAME)] == ["A1"]
+    assert (miss.calls, hit.calls, unused.calls) == (["frame"], ["frame"], [])
+    assert [(name, found) for name, _elapsed, found in cascade.pop_timings()] == [
+        ("qr", False),
+        ("barcode", True),
+    ]
+    assert cascade.pop_timings() == []  # cleared by the previous call
+    assert calls(cascade) == {"qr": 1, "barcode": 1}  # the stats keep counting
+
+
+def test_adaptive_cascade_reorders_by_hits_per_millisecond():
+    miss = StubDecoder("qr")
+    hit = StubDecoder("barcode", full=[Detection("A1", BOX)])
+    cascade = Cascade([miss, hit], adaptive=True, reorder_every=5)
+
+    for _ in range(4):
+        cascade(FRAME)
+    assert [d.name for d in cascade.decoders] == ["qr", "barcode"]
+    cascade(FRAME)
+    assert [d.name for d in cascade.decoders] == ["barcode", "qr"]
+    cascade(FRAME)
+    assert len(miss.calls) == 5  # skipped once the hitting decoder runs first
+
+    fixed = Cascade(
+        [StubDecoder("qr"), StubDecoder("barcode", full=[Detection("A1", BOX)])],
+        reorder_every=5,
+    )
+    for _ in range(10):
+        fixed(FRAME)
+    assert [d.name for d in fixed.decoders] == ["qr", "barcode"]
+
+
+def test_build_decoders_shares_instances_and_skips_broken_ones(monkeypatch, caplog):
+    class Working(StubDecoder):
+        def __init__(self, args):
+            super().__init__("qr")
+
+    class Broken(Decoder):
+        def __init__(self, args):
+            raise RuntimeError("model missing")
+
+    monkeypatch.setattr(decoders, "DECODERS", {"qr": Working, "yolo": Broken})
+    shared: dict = {}
+    first = decoders.build_decoders("yolo, QR", None, shared)
+    second = decoders.build_decoders("qr,yolo", None, shared)
+
+    assert [d.name for d in first] == ["qr"]
+    assert second[0] is first[0]
+    assert shared["yolo"] is None
+    assert caplog.text.count("Decoder 'yolo' disabled: model missing") == 1
+    with pytest.raises(ValueError, match="Unknown decoder 'nope'"):
+        decoders.build_decoders("qr,nope", None, shared)
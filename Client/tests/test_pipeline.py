@@ -0,0 +1,31 @@
+"""Decode thread pool: a failing decoder does not stop decoding."""
+
+from __future__ import annotations
+
+import time
+
+import pytest
+
+pipeline = pytest.importorskip("pipeline", exc_type=ImportError)  # needs OpenCV
+
+
+def flaky_decoder():
+    def decode(image, source):
+        if image == "bad":
+            raise RuntimeError("decoder blew up")
+        return [image]
+
+    return decode
+
+
+def test_decoder_exception_yields_empty_result_and_keeps_decoding(caplog):
+    frames, results = pipeline.DropOldestQueue(10), pipeline.DropOldestQueue(10)
+    pool = pipeline.DecodePool(flaky_decoder, frames, results).start()
+    try:
+        for seq, image in enumerate(["a", "bad", "b"], 1):
+            frames.put(pipeline.Frame(seq, time.time(), image))
+        done = [results.get(timeout=5) for _ in range(3)]
+    finally:
+        pool.stop()
+    assert [(r.seq, r.detections) for r in done] == [(1, ["a"]), (2, []), (3, ["b"])]
+    assert "decoder blew up" in caplog.text
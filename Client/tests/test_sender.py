@@ -0,0 +1,112 @@
+"""Scan sender: batching, splitting refused batches and spooling failures."""
+
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from sender import ScanSender
+from spool import ScanSpool
+
+
+class Response:
+    def __init__(self, status_code: int, body: dict) -> None:
+        self.status_code = status_code
+        self.body = body
+        self.text = str(body)
+        self.ok = status_code < 400
+
+    def json(self) -> dict:
+        return self.body
+
+
+class FakeSession:
+    """Stands in for ``requests.Session``; answers like the batch endpoint.
+
+    Batches over ``max_batch`` get 413, scans starting with "bad" get a 400
+    naming their index, and ``status`` overrides everything else.
+    """
+
+    def __init__(self, status: int = 200, max_batch: int = 1000) -> None:
+        self.status = status
+        self.max_batch = max_batch
+        self.posts = []
+
+    def post(self, url, json, timeout):
+        self.posts.append([p["barcode"] for p in json])
+        if self.status != 200:
+            return Response(self.status, {"error": "down"})
+        if len(json) > self.max_batch:
+            return Response(413, {"error": "too large"})
+        bad = [i for i, p in enumerate(json) if p["barcode"].startswith("bad")]
+        if bad:
+            return Response(400, {"errors": [{"index": i, "error": "x"} for i in bad]})
+        return Response(200, {"results": [{"valid": p["barcode"] != "x"} for p in json]})
+
+    def close(self) -> None:
+        pass
+
+
+def scans(*barcodes):
+    return [{"barcode": barcode} for barcode in barcodes]
+
+
+def make_sender(session, **kwargs):
+    seen = []
+    sender = ScanSender(
+        "http://server",
+        on_result=lambda payload, valid: seen.append((payload["barcode"], valid)),
+        **kwargs,
+    )
+    sender._session = session
+    return sender, seen
+
+
+def test_queued_scans_are_posted_in_batches():
+    session = FakeSession()
+    sender, seen = make_sender(session, max_batch=3, max_delay=0.05)
+    for payload in scans("a", "b", "c", "d", "x"):
+        sender.submit(payload)
+    sender.start().close()
+    assert session.posts == [["a", "b", "c"], ["d", "x"]]
+    assert seen == [("a", True), ("b", True), ("c", True), ("d", True), ("x", False)]
+    assert sender.sent == 5
+
+
+def test_too_large_batches_are_halved_until_accepted():
+    session = FakeSession(max_batch=2)
+    sender, seen = make_sender(session, retries=0)
+    sender._deliver(scans("a", "b", "c", "d", "e"))
+    assert session.posts == [
+        ["a", "b", "c", "d", "e"],
+        ["a", "b"],
+        ["c", "d", "e"],
+        ["c"],
+        ["d", "e"],
+    ]
+    assert [barcode for barcode, _valid in seen] == ["a", "b", "c", "d", "e"]
+    assert sender.sent == 5
+
+
+def test_only_the_rejected_indexes_are_dropped():
+    session = FakeSession()
+    sender, seen = make_sender(session, retries=0)
+    sender._deliver(scans("a", "bad-1", "b", "bad-2", "x"))
+    assert session.posts == [["a", "bad-1", "b", "bad-2", "x"], ["a", "b", "x"]]
+    assert seen == [("a", True), ("b", True), ("x", False)]
+    assert sender.rejected == 2
+
+
+@pytest.mark.parametrize("status", [404, 503])
+def test_first_failure_is_spooled_without_retrying_inline(tmp_path, status):
+    spool = ScanSpool(str(tmp_path / "spool.db"))
+    session = FakeSession(status)
+    sender, _seen = make_sender(session, retries=3, backoff=1.0, spool=spool)
+    start = time.monotonic()
+    sender._deliver(scans("a", "b"))
+    assert time.monotonic() - start < 0.5  # no backoff sleeps
+    assert session.posts == [["a", "b"]]
+    assert spool.peek(10)[1] == scans("a", "b")
+    assert sender.failed == 2
+    spool.close()
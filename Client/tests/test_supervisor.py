@@ -0,0 +1,85 @@
+"""Supervisor: camera config parsing and the per-camera reconnect loop."""
+
+from __future__ import annotations
+
+import os
+import time
+
+import numpy as np
+import pytest
+
+supervisor = pytest.importorskip("supervisor", exc_type=ImportError)  # needs OpenCV
+from pipeline import FairScheduler  # noqa: E402
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "cameras.example.ini")
+
+
+def test_load_cameras_applies_defaults_and_section_names():
+    cameras = supervisor.load_cameras(EXAMPLE)
+    assert list(cameras) == ["dock-door-26", "dock-door-27", "aisle-3"]
+    aisle = cameras["aisle-3"]
+    assert aisle["Camera Name"] == "aisle-3"
+    assert aisle["Camera Area"] == "A3"
+    assert (aisle["Server IP"], aisle["Port"]) == ("127.0.0.1", "5000")  # from [DEFAULT]
+    assert aisle["Camera Type"] == "rtsp"
+    assert aisle["Dedup Window"] == "5"
+    assert cameras["dock-door-26"]["Decoders"] == "qr,wechat"
+
+
+def test_load_cameras_rejects_duplicate_names_and_missing_files(tmp_path):
+    path = tmp_path / "cameras.ini"
+    path.write_text("[a]\nCamera Name = cam\n[b]\nCamera Name = cam\n")
+    with pytest.raises(ValueError, match="Duplicate camera name 'cam'"):
+        supervisor.load_cameras(str(path))
+    with pytest.raises(FileNotFoundError):
+        supervisor.load_cameras(str(tmp_path / "missing.ini"))
+
+
+class FakeCapture:
+    """Yields ``frames`` frames, then fails like a dropped stream."""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.released = False
+
+    def read(self):
+        if self.frames <= 0:
+            return False, None
+        self.frames -= 1
+        time.sleep(0.01)
+        return True, np.zeros((4, 4, 3), np.uint8)
+
+    def release(self):
+        self.released = True
+
+
+def test_camera_stream_reconnects_with_backoff(monkeypatch):
+    opened = []
+    captures = [None, None, FakeCapture(2), FakeCapture(1000)]
+
+    def open_capture(url):
+        opened.append((url, time.monotonic()))
+        return captures.pop(0) if len(captures) > 1 else captures[0]
+
+    monkeypatch.setattr(supervisor.utils, "open_capture", open_capture)
+    frames = FairScheduler()
+    stream = supervisor.CameraStream(
+        {"Camera Name": "cam-1", "Camera URL": "rtsp://cam"},
+        frames,
+        min_backoff=0.05,
+        max_backoff=1.0,
+    ).start()
+    try:
+        deadline = time.monotonic() + 10
+        while not (stream.restarts and stream.connected) and time.monotonic() < deadline:
+            time.sleep(0.02)
+        frame = frames.get(timeout=5)
+    finally:
+        stream.stop()
+
+    assert stream.restarts == 1  # the stream that dropped after two frames
+    assert [url for url, _ in opened] == ["rtsp://cam"] * 4
+    waits = [later - earlier for (_, earlier), (_, later) in zip(opened, opened[1:])]
+    assert waits[0] >= 0.05 and waits[1] >= 0.1  # doubled while the camera stays down
+    assert frame.source == "cam-1"
+    assert captures[0].released
@@ -1,24 +1,34 @@
 """Simple Flask application for barcode scan ingestion and CRUD UI."""
 
+import os
+
 from flask import Flask # type: ignore
 from flask_cors import CORS # type: ignore
-from models import db  # type: ignore
+from db_config import configure_database
+from models import upgrade_schema  # type: ignore
+from scan_search import create_search_index
 from routes import bp
 from facility_routes import facility_bp
 from operations_routes import operations_bp
+from retention import init_retention
+from writer import init_scan_writer
 
 app = Flask(__name__)
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///app.db"
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 app.config["SECRET_KEY"] = "dev"# This should be changed in production
-db.init_app(app)
+configure_database(app)
 CORS(app)
 
 app.register_blueprint(bp)
 app.register_blueprint(facility_bp)
 app.register_blueprint(operations_bp)
 
+if os.getenv("SCAN_WRITER", "1") != "0":
+    init_scan_writer(app)
+init_retention(app)
+
 if __name__ == "__main__":
     with app.app_context():
-        db.create_all()
+        upgrade_schema()
+        if os.getenv("SCAN_SEARCH_INDEX") == "1":
+            create_search_index()
     app.run(host="0.0.0.0", port=5000)
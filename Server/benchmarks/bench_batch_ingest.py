@@ -0,0 +1,56 @@
+"""Compare scans/second of ``/api/scan`` against ``/api/scans/batch``."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+
+from common import make_app, scan_payload, seed_dock
+
+
+def bench_single(client, payloads: list) -> float:
+    start = time.perf_counter()
+    for payload in payloads:
+        resp = client.post("/api/scan", json=payload)
+        assert resp.status_code == 200, resp.data
+    return len(payloads) / (time.perf_counter() - start)
+
+
+def bench_batch(client, payloads: list, size: int, ndjson: bool = False) -> float:
+    start = time.perf_counter()
+    for i in range(0, len(payloads), size):
+        chunk = payloads[i : i + size]
+        if ndjson:
+            body = "\n".join(json.dumps(p) for p in chunk)
+            resp = client.post(
+                "/api/scans/batch", data=body, content_type="application/x-ndjson"
+            )
+        else:
+            resp = client.post("/api/scans/batch", json=chunk)
+        assert resp.status_code == 200, resp.data
+    return len(payloads) / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scans", type=int, default=2000)
+    parser.add_argument("--sizes", default="8,64,256")
+    args = parser.parse_args()
+
+    app = make_app()
+    barcodes = seed_dock(app, labels=args.scans)
+    payloads = [scan_payload(b) for b in barcodes]
+    client = app.test_client()
+
+    print(f"{'mode':<20}{'scans/s':>12}")
+    print(f"{'single':<20}{bench_single(client, payloads):>12.0f}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        print(f"{f'batch x{size}':<20}{bench_batch(client, payloads, size):>12.0f}")
+    size = int(args.sizes.split(",")[-1])
+    rate = bench_batch(client, payloads, size, ndjson=True)
+    print(f"{f'ndjson x{size}':<20}{rate:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Ingest throughput while ``/facility/scans`` is hammered, untuned vs. tuned SQLite.
+
+Writer threads post single scans to ``/api/scan`` while reader threads
+page through the scans list. "untuned" opens SQLite without pragmas
+(rollback journal, synchronous=FULL); "tuned" uses ``db_config.SQLITE_PRAGMAS``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from common import make_app, scan_payload, seed_dock
+
+from models import db, Scan
+
+
+def seed_scans(app, count: int) -> None:
+    start = datetime.utcnow() - timedelta(days=30)
+    rows = [
+        {
+            **scan_payload(f"OLPN{i % 1000:08d}", area=f"DD-{i % 40:02d}"),
+            "timestamp": start + timedelta(seconds=i),
+        }
+        for i in range(count)
+    ]
+    with app.app_context():
+        db.session.execute(db.insert(Scan), rows)
+        db.session.commit()
+
+
+def run(app, barcodes: list, writers: int, readers: int, seconds: float) -> dict:
+    stop = threading.Event()
+    latencies: list = []
+    reads = [0]
+    errors = [0]
+    lock = threading.Lock()
+
+    def write() -> None:
+        client = app.test_client()
+        while not stop.is_set():
+            payload = dict(scan_payload(random.choice(barcodes)), scan_id=str(uuid.uuid4()))
+            start = time.perf_counter()
+            resp = client.post("/api/scan", json=payload)
+            with lock:
+                if resp.status_code == 200:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors[0] += 1
+
+    def read() -> None:
+        client = app.test_client()
+        while not stop.is_set():
+            resp = client.get(f"/facility/scans?area=DD-{random.randint(0, 39):02d}&match=exact")
+            with lock:
+                if resp.status_code == 200:
+                    reads[0] += 1
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=write) for _ in range(writers)]
+    threads += [threading.Thread(target=read) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    return {
+        "scans/s": len(latencies) / seconds,
+        "p99 ms": 1000 * latencies[int(0.99 * (len(latencies) - 1))] if latencies else 0.0,
+        "reads/s": reads[0] / seconds,
+        "errors": errors[0],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seed", type=int, default=100_000, help="Scans stored beforehand")
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    print(f"{'config':<10}{'scans/s':>10}{'p99 ms':>10}{'reads/s':>10}{'errors':>8}")
+    for name, pragmas in (("untuned", {}), ("tuned", None)):
+        app = make_app(sqlite_pragmas=pragmas)
+        app.logger.setLevel(logging.CRITICAL)  # failed requests are counted instead
+        barcodes = seed_dock(app)
+        seed_scans(app, args.seed)
+        result = run(app, barcodes, args.writers, args.readers, args.seconds)
+        print(
+            f"{name:<10}{result['scans/s']:>10.0f}{result['p99 ms']:>10.1f}"
+            f"{result['reads/s']:>10.1f}{result['errors']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
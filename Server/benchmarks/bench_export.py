@@ -0,0 +1,68 @@
+"""Time to first byte, throughput and memory of ``/facility/scans/export``.
+
+Exports slices of a generated table of growing size; the peak RSS column
+should stay flat however many rows are exported. Reuses
+``bench_scan_list.generate``, and ``--db`` reuses its database.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import resource
+import time
+
+from common import make_app
+
+from bench_scan_list import generate
+from models import Scan
+
+
+def export(client, query: str) -> tuple:
+    start = time.perf_counter()
+    resp = client.get(f"/facility/scans/export?{query}", buffered=False)
+    chunks = iter(resp.response)
+    size = len(next(chunks))
+    first_byte = time.perf_counter() - start
+    for chunk in chunks:
+        size += len(chunk)
+    resp.close()
+    return first_byte, time.perf_counter() - start, size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--labels", type=int, default=200_000)
+    parser.add_argument("--db", default="", help="SQLite file to create or reuse")
+    args = parser.parse_args()
+
+    app = make_app(args.db, keep=bool(args.db))
+    with app.app_context():
+        if not Scan.query.limit(1).count():
+            generate(args.rows, args.labels)
+        first = Scan.query.order_by(Scan.timestamp.asc()).first().timestamp
+        last = Scan.query.order_by(Scan.timestamp.desc()).first().timestamp
+        slices = []
+        for fraction in (100, 10, 1):
+            start = last - (last - first) / fraction
+            slices.append((start, Scan.query.filter(Scan.timestamp >= start).count()))
+
+    client = app.test_client()
+    print(f"{'rows':>10} {'format':<12}{'first byte ms':>14}{'rows/s':>10}{'MB':>8}{'peak RSS MB':>13}")
+    for start, rows in slices:
+        for fmt in ("csv", "ndjson", "csv&gzip=1"):
+            query = f"start_date={start.isoformat()}&format={fmt}"
+            first_byte, elapsed, size = export(client, query)
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            print(
+                f"{rows:>10} {fmt:<12}{1000 * first_byte:>14.1f}{rows / elapsed:>10.0f}"
+                f"{size / 1e6:>8.1f}{peak:>13.0f}"
+            )
+
+    if not args.db:
+        os.remove(app.config["SQLALCHEMY_DATABASE_URI"][len("sqlite:///"):])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""OLPN label list time on a large table: load everything vs. keyset pages.
+
+"all rows" is the former ``list_olpn_labels`` query, ``.all()`` plus the
+per-row ``label.destination`` the template touches. The keyset rows time
+the full ``/facility/olpn-labels`` request, including rendering.
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import time
+from datetime import datetime, timedelta
+from html import unescape
+
+from sqlalchemy import event
+
+from common import make_app
+
+from models import db, DestinationCode, OLPNLabel
+
+
+OLDER_LINK = re.compile(r'<li class="page-item ">\s*<a class="page-link" href="([^"]*after=[^"]*)"')
+
+
+def seed(app, labels: int, destinations: int) -> None:
+    start = datetime.utcnow() - timedelta(days=90)
+    with app.app_context():
+        db.session.execute(
+            db.insert(DestinationCode),
+            [{"code": f"D{i:02d}", "name": f"Carrier {i}"} for i in range(destinations)],
+        )
+        db.session.execute(
+            db.insert(OLPNLabel),
+            [
+                {
+                    "barcode": f"OLPN{i:08d}",
+                    "destination_code_id": 1 + i % destinations,
+                    "status": "shipped" if i % 4 else "pending",
+                    "created_at": start + timedelta(seconds=i),
+                    "updated_at": start + timedelta(seconds=i),
+                }
+                for i in range(labels)
+            ],
+        )
+        db.session.commit()
+
+
+def all_rows() -> int:
+    labels = OLPNLabel.query.order_by(OLPNLabel.created_at.desc()).all()
+    return len({label.destination.code for label in labels})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--labels", type=int, default=200_000)
+    parser.add_argument("--destinations", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=100, help="Pages to click through")
+    args = parser.parse_args()
+
+    app = make_app()
+    seed(app, args.labels, args.destinations)
+    client = app.test_client()
+    queries = [0]
+    with app.app_context():
+        def count(*_args) -> None:
+            queries[0] += 1
+
+        event.listen(db.engine, "before_cursor_execute", count)
+        start = time.perf_counter()
+        all_rows()
+        print(f"{'all rows':<30}{1000 * (time.perf_counter() - start):>10.0f} ms"
+              f"{queries[0]:>8} queries")
+
+    for name, url in (
+        ("keyset, first page", "/facility/olpn-labels"),
+        ("keyset, status filter", "/facility/olpn-labels?status=pending"),
+        ("keyset, destination filter", "/facility/olpn-labels?destination=D07"),
+    ):
+        queries[0] = 0
+        start = time.perf_counter()
+        client.get(url)
+        print(f"{name:<30}{1000 * (time.perf_counter() - start):>10.1f} ms{queries[0]:>8} queries")
+
+    url, times = "/facility/olpn-labels", []
+    for _ in range(args.pages):
+        start = time.perf_counter()
+        page = client.get(url).get_data(as_text=True)
+        times.append(time.perf_counter() - start)
+        match = OLDER_LINK.search(page)
+        if not match:
+            break
+        url = unescape(match.group(1))
+    print(f"{f'keyset, page {len(times)}':<30}{1000 * times[-1]:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Single-scan ingest from many cameras, a commit per request vs. the scan writer.
+
+Every camera thread posts one scan at a time to ``/api/scan`` and waits for
+the response, like ``ScanSender`` with batching disabled.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import random
+import threading
+import time
+import uuid
+
+from common import make_app, scan_payload, seed_dock
+
+from writer import init_scan_writer
+
+
+def run(app, barcodes: list, cameras: int, seconds: float) -> dict:
+    stop = threading.Event()
+    latencies: list = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def camera(index: int) -> None:
+        client = app.test_client()
+        while not stop.is_set():
+            payload = dict(
+                scan_payload(random.choice(barcodes)),
+                camera_name=f"cam-{index}",
+                scan_id=str(uuid.uuid4()),
+            )
+            start = time.perf_counter()
+            resp = client.post("/api/scan", json=payload)
+            with lock:
+                if resp.status_code == 200:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=camera, args=(i,)) for i in range(cameras)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    return {
+        "scans/s": len(latencies) / seconds,
+        "p50 ms": 1000 * latencies[len(latencies) // 2] if latencies else 0.0,
+        "p99 ms": 1000 * latencies[int(0.99 * (len(latencies) - 1))] if latencies else 0.0,
+        "errors": errors[0],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cameras", default="8,32")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{'cameras':>8} {'mode':<8}{'scans/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for cameras in (int(c) for c in args.cameras.split(",")):
+        for mode in ("direct", "writer"):
+            app = make_app()
+            app.logger.setLevel(logging.CRITICAL)  # failed requests are counted instead
+            barcodes = seed_dock(app)
+            writer = init_scan_writer(app) if mode == "writer" else None
+            result = run(app, barcodes, cameras, args.seconds)
+            print(
+                f"{cameras:>8} {mode:<8}{result['scans/s']:>10.0f}{result['p50 ms']:>9.1f}"
+                f"{result['p99 ms']:>9.1f}{result['errors']:>8}"
+            )
+            if writer is not None:
+                print(f"{'':>9}{writer.stats()}")
+                writer.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Labels/second of the bulk import vs. adding labels one form POST at a time."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import time
+
+from common import make_app, seed_dock
+
+from models import DestinationCode
+
+
+def csv_body(count: int, prefix: str, status: str = "") -> bytes:
+    lines = ["barcode,destination,status"]
+    lines += [f"{prefix}{i:08d},BEN,{status}" for i in range(count)]
+    return ("\n".join(lines) + "\n").encode()
+
+
+def bulk(client, body: bytes) -> tuple:
+    start = time.perf_counter()
+    resp = client.post("/facility/olpn-labels/import", data=body, content_type="text/csv")
+    events = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    elapsed = time.perf_counter() - start
+    assert events[-1]["event"] == "done", events[-1]
+    return elapsed, events[-1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--labels", type=int, default=100_000)
+    parser.add_argument("--form-labels", type=int, default=500, help="Labels added via the form")
+    args = parser.parse_args()
+
+    app = make_app()
+    app.logger.setLevel(logging.CRITICAL)
+    seed_dock(app, labels=0)
+    with app.app_context():
+        dest_id = DestinationCode.query.filter_by(code="BEN").one().id
+    client = app.test_client()
+
+    start = time.perf_counter()
+    for i in range(args.form_labels):
+        client.post(
+            "/facility/olpn-labels",
+            data={"barcode": f"FORM{i:08d}", "destination_code_id": dest_id},
+        )
+    form_rate = args.form_labels / (time.perf_counter() - start)
+    print(f"{'form POST, one label each':<34}{form_rate:>10.0f} labels/s")
+
+    elapsed, done = bulk(client, csv_body(args.labels, "OLPN"))
+    print(f"{'bulk import, new labels':<34}{args.labels / elapsed:>10.0f} labels/s"
+          f"  ({done['inserted']} new in {elapsed:.1f} s)")
+    elapsed, done = bulk(client, csv_body(args.labels, "OLPN", "shipped"))
+    print(f"{'bulk import, all existing':<34}{args.labels / elapsed:>10.0f} labels/s"
+          f"  ({done['updated']} updated in {elapsed:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Labels/second when printing 1k OLPN labels.
+
+"per label" repeats the former ``olpn_label_pdf`` body once per label;
+the batch rows render all labels into one PDF with a cold QR cache,
+a cold cache with a process pool, and a warm cache.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import os
+import time
+
+from common import make_app, seed_dock
+
+import cache
+import labels_pdf
+from models import db, OLPNLabel
+
+
+def legacy_pdf(label) -> bytes:
+    import qrcode  # type: ignore
+    from reportlab.lib.pagesizes import letter, landscape  # type: ignore
+    from reportlab.pdfgen import canvas  # type: ignore
+    from reportlab.lib.utils import ImageReader  # type: ignore
+
+    qr_img = qrcode.make(label.barcode)
+    img_buffer = io.BytesIO()
+    qr_img.save(img_buffer, format="PNG")
+    img_buffer.seek(0)
+    pdf_buffer = io.BytesIO()
+    c = canvas.Canvas(pdf_buffer, pagesize=landscape(letter))
+    width, height = landscape(letter)
+    y_img = (height - 200) / 2
+    for offset in (36, width / 2 + 36):
+        c.drawImage(ImageReader(img_buffer), offset, y_img, width=200, height=200)
+        c.setFont("Helvetica", 14)
+        c.drawCentredString(offset + 100, y_img - 20, label.barcode)
+        c.setFont("Helvetica", 12)
+        c.drawCentredString(offset + 100, y_img - 38, f"Destination: {label.destination.code}")
+        c.setFont("Helvetica", 8)
+        c.drawCentredString(offset + 100, 36, f'Created: {label.created_at:%Y-%m-%d %H:%M}')
+    c.showPage()
+    c.save()
+    return pdf_buffer.getvalue()
+
+
+def timed(fn) -> tuple:
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--labels", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    app = make_app()
+    seed_dock(app, labels=args.labels)
+    with app.app_context():
+        labels = OLPNLabel.query.options(db.joinedload(OLPNLabel.destination)).all()
+        # start the pool outside the timings, as a running server would have
+        labels_pdf.qr_images(["warm-up", "pool"], workers=args.workers)
+
+        runs = [("per label", lambda: sum(len(legacy_pdf(label)) for label in labels))]
+        runs.append(("batch, cold cache", lambda: len(labels_pdf.labels_pdf(labels, workers=0))))
+        runs.append(
+            (
+                f"batch, cold, {args.workers} workers",
+                lambda: len(labels_pdf.labels_pdf(labels, workers=args.workers)),
+            )
+        )
+        runs.append(("batch, warm cache", lambda: len(labels_pdf.labels_pdf(labels, workers=0))))
+
+        print(f"{'mode':<28}{'labels/s':>10}{'MB':>8}")
+        for name, fn in runs:
+            if "cold" in name:
+                cache.qr_images.clear()
+            elapsed, size = timed(fn)
+            print(f"{name:<28}{len(labels) / elapsed:>10.0f}{size / 1e6:>8.1f}")
+        print(f"qr cache: {cache.qr_images.stats()}")
+
+
+if __name__ == "__main__":
+    main()
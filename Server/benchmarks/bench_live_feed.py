@@ -0,0 +1,89 @@
+"""Database queries and ingest rate while more and more dashboards watch the live feed.
+
+Each viewer holds an open ``/ops/stream`` connection and must receive every
+ingested scan. Queries are counted on the engine, so a flat
+``queries/scan`` column shows viewers cost no database work.
+"""
+
+from __future__ import annotations
+
+import argparse
+import threading
+import time
+import uuid
+
+from sqlalchemy import event
+
+from common import make_app, scan_payload, seed_dock
+
+import broker
+from models import db
+
+
+def viewer(client, expected: int, ready: threading.Barrier, done: list) -> None:
+    resp = client.get("/ops/stream?area=DD-01", buffered=False)
+    ready.wait()
+    received = 0
+    for chunk in resp.response:
+        received += chunk.count("event: scan") if isinstance(chunk, str) else chunk.count(b"event: scan")
+        if received >= expected:
+            break
+    resp.close()
+    done.append(time.perf_counter())
+
+
+def run(app, barcodes: list, viewers: int, batch: int) -> tuple:
+    client = app.test_client()
+    ready = threading.Barrier(viewers + 1)
+    done: list = []
+    threads = [
+        threading.Thread(target=viewer, args=(client, len(barcodes), ready, done), daemon=True)
+        for _ in range(viewers)
+    ]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+
+    queries = [0]
+
+    def count(*_args) -> None:
+        queries[0] += 1
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", count)
+    start = time.perf_counter()
+    for i in range(0, len(barcodes), batch):
+        chunk = [
+            dict(scan_payload(b), scan_id=str(uuid.uuid4())) for b in barcodes[i : i + batch]
+        ]
+        resp = client.post("/api/scans/batch", json=chunk)
+        assert resp.status_code == 200, resp.data
+    ingest_time = time.perf_counter() - start
+    event.remove(engine, "before_cursor_execute", count)
+    for thread in threads:
+        thread.join(60)
+    assert len(done) == viewers, "viewers did not receive every scan"
+    delivered = (max(done) - start) if done else ingest_time
+    return queries[0] / len(barcodes), len(barcodes) / ingest_time, delivered
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scans", type=int, default=500)
+    parser.add_argument("--batch", type=int, default=10)
+    parser.add_argument("--viewers", default="0,10,50,200")
+    args = parser.parse_args()
+
+    app = make_app()
+    barcodes = seed_dock(app, labels=args.scans)
+    run(app, barcodes, 0, args.batch)  # warm up the validation caches
+    print(f"{'viewers':>8}{'queries/scan':>14}{'scans/s':>10}{'all delivered s':>17}")
+    for viewers in (int(v) for v in args.viewers.split(",")):
+        per_scan, rate, delivered = run(app, barcodes, viewers, args.batch)
+        print(f"{viewers:>8}{per_scan:>14.2f}{rate:>10.0f}{delivered:>17.2f}")
+    print(f"broker: {broker.scans.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Retention job throughput, and scan ingest latency while it runs.
+
+Generates ``--rows`` old scans (via ``bench_scan_list.generate``), then
+runs the retention job while camera threads keep posting new scans.
+Smaller ``--batch`` values hold the write lock for less time per batch.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+from sqlalchemy import func
+
+from common import make_app, scan_payload, seed_dock
+
+from bench_scan_list import generate
+from models import db, Scan, ScanRollup
+from retention import run_retention
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--labels", type=int, default=2_000, help="Distinct barcodes")
+    parser.add_argument("--batch", type=int, default=2000)
+    parser.add_argument("--cameras", type=int, default=4)
+    args = parser.parse_args()
+
+    app = make_app()
+    app.logger.setLevel(logging.CRITICAL)
+    barcodes = seed_dock(app)
+    with app.app_context():
+        generate(args.rows, args.labels)  # all dated 2024, so all expired
+    archive = tempfile.mkdtemp(prefix="wareeye-archive-")
+
+    done = threading.Event()
+    latencies: list = []
+
+    def camera() -> None:
+        client = app.test_client()
+        while not done.is_set():
+            payload = dict(scan_payload(barcodes[0]), scan_id=str(uuid.uuid4()))
+            start = time.perf_counter()
+            client.post("/api/scan", json=payload)
+            latencies.append(time.perf_counter() - start)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=camera) for _ in range(args.cameras)]
+    for thread in threads:
+        thread.start()
+    start = time.perf_counter()
+    with app.app_context():
+        stats = run_retention(days=1, directory=archive, batch=args.batch)
+        rollups = db.session.query(func.count(ScanRollup.id)).scalar()
+        left = Scan.query.count()
+    elapsed = time.perf_counter() - start
+    done.set()
+    for thread in threads:
+        thread.join()
+
+    archived = sum(os.path.getsize(os.path.join(archive, f)) for f in os.listdir(archive))
+    latencies.sort()
+    print(f"deleted {stats['deleted']} scans in {elapsed:.1f} s "
+          f"({stats['deleted'] / elapsed:.0f}/s, {stats['batches']} batches)")
+    print(f"{rollups} hourly rollup rows, {len(os.listdir(archive))} archive files, "
+          f"{archived / 1e6:.1f} MB ({archived / stats['deleted']:.0f} B/scan)")
+    print(f"ingest during the run: {len(latencies)} scans, "
+          f"p50 {1000 * latencies[len(latencies) // 2]:.1f} ms, "
+          f"p99 {1000 * latencies[int(0.99 * (len(latencies) - 1))]:.1f} ms, "
+          f"max {1000 * latencies[-1]:.1f} ms; {left} scans left")
+    shutil.rmtree(archive)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Scans list query time, OFFSET/COUNT + ILIKE vs. keyset pagination and indexed matches.
+
+Generates ``--rows`` scans (default 10M) inside SQLite with a recursive
+CTE. Pass ``--db`` to keep the file and reuse it on the next run; the
+10M-row table takes a few minutes to build.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import time
+
+from sqlalchemy import text
+
+from common import make_app
+
+from models import db, Scan
+from pagination import encode_cursor, keyset_page
+from scan_search import create_search_index, filtered_scans
+
+PER_PAGE = 50
+
+GENERATE = """
+INSERT INTO scan (camera_name, area, camera_type, client_ip, camera_url, barcode, timestamp)
+WITH RECURSIVE n(x) AS (SELECT 0 UNION ALL SELECT x + 1 FROM n WHERE x < :rows - 1)
+SELECT printf('cam-%02d', x % 64), printf('DD-%02d', x % 40), 'usb', '127.0.0.1', '0',
+       printf('OLPN%08d', (x * 7919) % :labels),
+       strftime('%Y-%m-%d %H:%M:%S.000000', '2024-01-01', '+' || x || ' seconds')
+FROM n
+"""
+
+
+def generate(rows: int, labels: int) -> None:
+    indexes = list(Scan.__table__.indexes)
+    with db.engine.begin() as conn:
+        for index in indexes:
+            index.drop(conn)
+        conn.execute(text(GENERATE), {"rows": rows, "labels": labels})
+        for index in indexes:
+            index.create(conn)
+        conn.execute(text("ANALYZE"))
+
+
+def timed(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return 1000 * statistics.median(times)
+
+
+def offset_page(filters: dict, page: int):
+    """The previous list_scans: ILIKE filters, COUNT(*) and OFFSET."""
+    q = Scan.query
+    for name, value in filters.items():
+        q = q.filter(getattr(Scan, name).ilike(f"%{value}%"))
+    return q.order_by(Scan.timestamp.desc()).paginate(page=page, per_page=PER_PAGE, error_out=False)
+
+
+def cursor_at(query, offset: int):
+    """Cursor continuing after ``offset`` rows, as reached by clicking "Older"."""
+    if offset == 0:
+        return None
+    row = (
+        query.order_by(Scan.timestamp.desc(), Scan.id.desc())
+        .offset(offset - 1)
+        .with_entities(Scan.timestamp, Scan.id)
+        .first()
+    )
+    return encode_cursor(list(row)) if row else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--labels", type=int, default=200_000, help="Distinct barcodes")
+    parser.add_argument("--page", type=int, default=500, help="Deep page to compare")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--db", default="", help="SQLite file to create or reuse")
+    parser.add_argument("--fts", action="store_true", help="Also build the trigram index")
+    args = parser.parse_args()
+
+    app = make_app(args.db, keep=bool(args.db))
+    with app.app_context():
+        if not Scan.query.limit(1).count():
+            start = time.perf_counter()
+            generate(args.rows, args.labels)
+            print(f"generated {args.rows} rows in {time.perf_counter() - start:.0f}s")
+        if args.fts:
+            start = time.perf_counter()
+            create_search_index()
+            print(f"built search index in {time.perf_counter() - start:.0f}s")
+
+        barcode = f"OLPN{(1234 * 7919) % args.labels:08d}"
+        cases = [
+            ("no filter", {}, "prefix"),
+            ("area exact", {"area": "DD-07"}, "exact"),
+            ("barcode exact", {"barcode": barcode}, "exact"),
+            ("barcode prefix", {"barcode": barcode[:-2]}, "prefix"),
+            ("barcode contains", {"barcode": barcode[-6:]}, "contains"),
+        ]
+        print(f"{'filter':<18}{'page':>6}{'offset ms':>11}{'keyset ms':>11}")
+        for name, filters, match in cases:
+            query = filtered_scans(filters, match)
+            for page in (1, args.page):
+                after = cursor_at(query, (page - 1) * PER_PAGE)
+                if page > 1 and after is None:
+                    continue  # fewer matches than the deep page needs
+                offset = timed(lambda: offset_page(filters, page).items, args.repeat)
+                keyset = timed(
+                    lambda: keyset_page(query, [Scan.timestamp, Scan.id], after=after),
+                    args.repeat,
+                )
+                print(f"{name:<18}{page:>6}{offset:>11.1f}{keyset:>11.1f}")
+
+    if not args.db:
+        os.remove(app.config["SQLALCHEMY_DATABASE_URI"][len("sqlite:///"):])
+
+
+if __name__ == "__main__":
+    main()
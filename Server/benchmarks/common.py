@@ -0,0 +1,74 @@
+"""Shared helpers for the server benchmarks.
+
+Run the scripts from the ``Server`` folder, e.g.
+``python benchmarks/bench_batch_ingest.py``.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # type: ignore  # noqa: E402
+
+from db_config import configure_database  # noqa: E402
+from models import db, DestinationCode, DockDoor, OLPNLabel  # noqa: E402
+from routes import bp  # noqa: E402
+from facility_routes import facility_bp  # noqa: E402
+from operations_routes import operations_bp  # noqa: E402
+
+
+def make_app(
+    db_path: str = "", sqlite_pragmas: Optional[dict] = None, keep: bool = False
+) -> Flask:
+    """Create an app bound to a throwaway SQLite file.
+
+    ``sqlite_pragmas`` is passed to :func:`db_config.configure_database`;
+    ``{}`` benchmarks an untuned connection. ``keep`` reuses the tables
+    already in ``db_path`` instead of recreating them.
+    """
+    if not db_path:
+        fd, db_path = tempfile.mkstemp(suffix=".db", prefix="wareeye-bench-")
+        os.close(fd)
+    app = Flask(__name__, root_path=bp.root_path)
+    app.config["SECRET_KEY"] = "bench"
+    configure_database(app, f"sqlite:///{db_path}", sqlite_pragmas)
+    app.register_blueprint(bp)
+    app.register_blueprint(facility_bp)
+    app.register_blueprint(operations_bp)
+    with app.app_context():
+        if not keep:
+            db.drop_all()
+        db.create_all()
+    return app
+
+
+def seed_dock(app: Flask, door: str = "DD-01", labels: int = 1000) -> list:
+    """Create a destination, one dock door and ``labels`` OLPN labels."""
+    with app.app_context():
+        code = DestinationCode(code="BEN", name="Bench Carrier")  # type: ignore
+        db.session.add(code)
+        db.session.flush()
+        db.session.add(DockDoor(name=door, destination_code_id=code.id))  # type: ignore
+        barcodes = [f"OLPN{i:08d}" for i in range(labels)]
+        db.session.add_all(
+            OLPNLabel(barcode=b, destination_code_id=code.id)  # type: ignore
+            for b in barcodes
+        )
+        db.session.commit()
+    return barcodes
+
+
+def scan_payload(barcode: str, area: str = "DD-01") -> dict:
+    return {
+        "camera_name": "bench",
+        "area": area,
+        "camera_type": "usb",
+        "client_ip": "127.0.0.1",
+        "camera_url": "0",
+        "barcode": barcode,
+    }
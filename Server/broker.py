@@ -0,0 +1,94 @@
+"""In-memory fan-out of live scan events to dashboard subscribers.
+
+Events are published once by the ingest path and copied to every
+subscriber queue, so the number of open dashboards never adds database
+work. Each event is serialised once, as a ready-to-send SSE message.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Set
+
+
+def sse_message(event: str, data: Any) -> str:
+    """Format ``data`` as one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class Subscription:
+    """Bounded message queue of one subscriber.
+
+    A slow client loses its oldest messages rather than making the
+    publisher wait; ``dropped`` counts them.
+    """
+
+    def __init__(self, topic: Optional[str], maxsize: int) -> None:
+        self.topic = topic
+        self.dropped = 0
+        self._messages: Deque[str] = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+
+    def put(self, message: str) -> None:
+        with self._cond:
+            if len(self._messages) == self._messages.maxlen:
+                self.dropped += 1
+            self._messages.append(message)
+            self._cond.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[str]:
+        """Return the next message, or ``None`` after ``timeout`` seconds."""
+        with self._cond:
+            if not self._messages and not self._cond.wait_for(lambda: self._messages, timeout):
+                return None
+            return self._messages.popleft()
+
+
+class Broker:
+    """Thread-safe publish/subscribe by topic (the scan area).
+
+    Subscribers of topic ``None`` receive every event.
+    """
+
+    def __init__(self, maxsize: int = 256) -> None:
+        self.maxsize = maxsize
+        self.published = 0
+        self._topics: Dict[Optional[str], Set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, topic: Optional[str] = None) -> Subscription:
+        sub = Subscription(topic, self.maxsize)
+        with self._lock:
+            self._topics.setdefault(topic, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            subs = self._topics.get(sub.topic)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._topics[sub.topic]
+
+    def publish(self, topic: str, event: str, data: Any) -> None:
+        with self._lock:
+            subs = list(self._topics.get(topic, ())) + list(self._topics.get(None, ()))
+            self.published += 1
+        if subs:
+            message = sse_message(event, data)
+            for sub in subs:
+                sub.put(message)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            subs = [sub for topic_subs in self._topics.values() for sub in topic_subs]
+        return {
+            "subscribers": len(subs),
+            "published": self.published,
+            "dropped": sum(sub.dropped for sub in subs),
+        }
+
+
+scans = Broker()
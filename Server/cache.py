@@ -0,0 +1,109 @@
+"""In-memory LRU caches for the scan validation hot path and label printing.
+
+The caches live in the server process; the facility CRUD routes invalidate
+entries whenever dock doors or OLPN labels change. Nothing tells other
+processes, so the server must run as one (threaded) process. Readers that fill the
+cache from the database pass the :attr:`LRUCache.generation` they saw before
+the read to :meth:`LRUCache.put`, so a value read before a concurrent
+invalidation is not cached.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU mapping with hit/miss counters.
+
+    ``maxsize`` counts entries, or the sum of ``sizeof(value)`` if given
+    (e.g. ``sizeof=len`` for a byte budget). ``generation`` goes up on every
+    invalidation.
+    """
+
+    def __init__(self, maxsize: int, sizeof: Optional[Callable[[Any], int]] = None) -> None:
+        self.maxsize = maxsize
+        self.sizeof = sizeof or (lambda _value: 1)
+        self.size = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.generation = 0
+        self.stale_puts = 0
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        """Store ``value``, unless ``generation`` is given and outdated."""
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                self.stale_puts += 1
+                return
+            if key in self._data:
+                self.size -= self.sizeof(self._data[key])
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self.size += self.sizeof(value)
+            while self.size > self.maxsize and self._data:
+                _key, evicted = self._data.popitem(last=False)
+                self.size -= self.sizeof(evicted)
+                self.evictions += 1
+
+    def invalidate(self, *keys: Hashable) -> None:
+        """Drop ``keys`` from the cache."""
+        with self._lock:
+            self.generation += 1
+            for key in keys:
+                if key in self._data:
+                    self.size -= self.sizeof(self._data.pop(key))
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+            self.size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": self.size,
+                "entries": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "stale_puts": self.stale_puts,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# dock door name -> destination_code_id (``None`` when the door is unknown)
+dock_doors = LRUCache(maxsize=1024)
+# OLPN barcode -> (destination_code_id, status) (``None`` when unknown)
+olpn_labels = LRUCache(maxsize=100_000)
+# OLPN barcode -> rendered QR code PNG, bounded to 32 MiB
+qr_images = LRUCache(maxsize=32 * 1024 * 1024, sizeof=len)
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    return {
+        "dock_doors": dock_doors.stats(),
+        "olpn_labels": olpn_labels.stats(),
+        "qr_images": qr_images.stats(),
+    }
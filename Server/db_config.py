@@ -0,0 +1,84 @@
+"""Database URI, connection pool and SQLite pragma configuration."""
+
+from __future__ import annotations
+
+import os
+from typing import Dict, Optional, Union
+
+from flask import Flask  # type: ignore
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from models import db
+
+DEFAULT_URI = "sqlite:///app.db"
+
+# WAL lets readers run alongside the single writer; NORMAL is durable in
+# WAL mode except for the last transactions on power loss.
+SQLITE_PRAGMAS: Dict[str, Union[str, int]] = {
+    "journal_mode": "WAL",
+    "busy_timeout": 5000,  # ms to wait for the write lock instead of failing
+    "synchronous": "NORMAL",
+    "cache_size": -65536,  # KiB, i.e. 64 MiB of page cache per connection
+    "temp_store": "MEMORY",
+}
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+def _in_memory(uri: str) -> bool:
+    """Whether ``uri`` is an in-memory SQLite database.
+
+    Flask-SQLAlchemy gives those a single shared connection (``StaticPool``),
+    which takes no pool sizing.
+    """
+    url = make_url(uri)
+    return url.drivername.startswith("sqlite") and url.database in (None, "", ":memory:")
+
+
+def configure_database(
+    app: Flask,
+    uri: Optional[str] = None,
+    sqlite_pragmas: Optional[Dict[str, Union[str, int]]] = None,
+) -> None:
+    """Point ``db`` at ``uri``, ``$DATABASE_URL`` or ``app.db``, and tune it.
+
+    SQLite connections get ``sqlite_pragmas`` (default :data:`SQLITE_PRAGMAS`,
+    ``{}`` for none) when they are opened. The pool holds
+    ``$DB_POOL_SIZE`` connections plus ``$DB_MAX_OVERFLOW`` temporary ones,
+    unless the database is in memory or the app's
+    ``SQLALCHEMY_ENGINE_OPTIONS`` pick another ``poolclass``. Other
+    databases also get ``pool_pre_ping`` and a recycle period.
+    """
+    uri = uri or os.getenv("DATABASE_URL") or DEFAULT_URI
+    if uri.startswith("postgres://"):
+        uri = "postgresql://" + uri[len("postgres://"):]
+    sqlite = uri.startswith("sqlite")
+    explicit = app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})
+    options = {}
+    if not _in_memory(uri) and "poolclass" not in explicit:
+        options.update(
+            pool_size=_env_int("DB_POOL_SIZE", 10),
+            max_overflow=_env_int("DB_MAX_OVERFLOW", 20),
+            pool_timeout=_env_int("DB_POOL_TIMEOUT", 30),
+        )
+    if not sqlite:
+        options.update(pool_pre_ping=True, pool_recycle=_env_int("DB_POOL_RECYCLE", 1800))
+    app.config["SQLALCHEMY_DATABASE_URI"] = uri
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {**options, **explicit}
+    app.config.setdefault("SQLALCHEMY_TRACK_MODIFICATIONS", False)
+    db.init_app(app)
+
+    pragmas = SQLITE_PRAGMAS if sqlite_pragmas is None else sqlite_pragmas
+    if sqlite and pragmas:
+        with app.app_context():
+            engine = db.engine
+
+        @event.listens_for(engine, "connect")
+        def set_pragmas(dbapi_connection, _record) -> None:
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
@@ -1,6 +1,9 @@
+import io
+import json
 from datetime import datetime
 from flask import (
     Blueprint,
+    Response,
     render_template,
     redirect,
     request,
@@ -8,40 +11,65 @@ from flask import (
     flash,
     jsonify,
     send_file,
+    stream_with_context,
 )
 
+import cache
+import labels_pdf
+import load_state
+from label_import import LABEL_STATUSES, import_labels, read_rows, spool_upload, upload_format
 from models import db, Scan, DestinationCode, DockDoor, OLPNLabel
+from pagination import Page, keyset_page
+from scan_export import FORMATS, export_chunks
+from scan_search import DEFAULT_MATCH, MATCH_MODES, filtered_scans
 
 facility_bp = Blueprint("facility", __name__, url_prefix="/facility")
 
 
 @facility_bp.route("/scans")
 def list_scans() -> str:
-    """Render a table of scans with optional filtering and pagination."""
-    barcode = request.args.get("barcode")
-    area = request.args.get("area")
-    camera = request.args.get("camera_name")
-    start_date = request.args.get("start_date")
-    end_date = request.args.get("end_date")
-    page = int(request.args.get("page", 1))
-
-    q = Scan.query
-    if barcode:
-        q = q.filter(Scan.barcode.ilike(f"%{barcode}%"))
-    if area:
-        q = q.filter(Scan.area.ilike(f"%{area}%"))
-    if camera:
-        q = q.filter(Scan.camera_name.ilike(f"%{camera}%"))
-    if start_date:
-        q = q.filter(Scan.timestamp >= start_date)
-    if end_date:
-        q = q.filter(Scan.timestamp <= end_date)
-
-    scans = q.order_by(Scan.timestamp.desc()).paginate(page=page, per_page=50)
+    """Render a table of scans with optional filtering and keyset pagination."""
+    args = request.args.to_dict()
+    after = args.pop("after", None)
+    before = args.pop("before", None)
+    try:
+        q = filtered_scans(args)
+        scans = keyset_page(q, [Scan.timestamp, Scan.id], after=after, before=before)
+    except ValueError as exc:
+        flash(str(exc), "danger")
+        scans = Page([], None, None)
+    return render_template(
+        "facility/scans.html",
+        scans=scans,
+        args=args,
+        match_modes=MATCH_MODES,
+        default_match=DEFAULT_MATCH,
+    )
+
+
+@facility_bp.route("/scans/export")
+def export_scans():
+    """Stream the scans matching the list filters as CSV or NDJSON.
 
+    ``format`` is ``csv`` (default) or ``ndjson``; ``gzip=1`` compresses
+    the download.
+    """
     args = request.args.to_dict()
-    args.pop("page", None)
-    return render_template("facility/scans.html", scans=scans, args=args)
+    fmt = args.pop("format", "csv")
+    compress = args.pop("gzip", "") in ("1", "true", "yes")
+    if fmt not in FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(FORMATS)}"}), 400
+    try:
+        q = filtered_scans(args)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    filename = f"scans-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}" + (".gz" if compress else "")
+    return Response(
+        stream_with_context(export_chunks(q, fmt, compress)),
+        mimetype="application/gzip" if compress else FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
 
 
 @facility_bp.route("/scans/<int:scan_id>/edit", methods=["GET", "POST"])
@@ -60,6 +88,7 @@ def edit_scan(scan_id: int):
                 request.form["timestamp"].replace("Z", "+00:00")
             )
             db.session.commit()
+            load_state.state.invalidate()  # it may be one of a door's recent scans
             flash("Scan updated", "success")
             return redirect(url_for("facility.list_scans"))
         except Exception as exc:  # pragma: no cover - input errors
@@ -73,6 +102,7 @@ def delete_scan(scan_id: int):
     scan = Scan.query.get_or_404(scan_id)
     db.session.delete(scan)
     db.session.commit()
+    load_state.state.invalidate()
     flash("Scan deleted", "success")
     return redirect(url_for("facility.list_scans"))
 
@@ -113,6 +143,7 @@ def edit_destination_code(code_id: int):
             code_obj.code = code
             code_obj.name = name
             db.session.commit()
+            load_state.state.invalidate()
             flash("Destination code updated", "success")
             return redirect(url_for("facility.list_destination_codes"))
     return render_template("facility/destination_code_edit.html", code=code_obj)
@@ -124,13 +155,14 @@ def delete_destination_code(code_id: int):
     code_obj = DestinationCode.query.get_or_404(code_id)
     db.session.delete(code_obj)
     db.session.commit()
+    load_state.state.invalidate()
     flash("Destination code deleted", "success")
     return redirect(url_for("facility.list_destination_codes"))
 
 
 @facility_bp.route("/dock-doors", methods=["GET", "POST"])
 def list_dock_doors() -> str:
-    """List dock doors and handle creation."""
+    """List dock doors, filtered by destination and active flag, and handle creation."""
     codes = DestinationCode.query.order_by(DestinationCode.code).all()
     if request.method == "POST":
         name = request.form.get("name", "").strip()
@@ -143,11 +175,25 @@ def list_dock_doors() -> str:
             dock = DockDoor(name=name, destination_code_id=int(destination_id))
             db.session.add(dock)
             db.session.commit()
+            cache.dock_doors.invalidate(name)
+            load_state.state.invalidate()
             flash("Dock door added", "success")
             return redirect(url_for("facility.list_dock_doors"))
 
-    doors = DockDoor.query.order_by(DockDoor.created_at.desc()).all()
-    return render_template("facility/dock_doors.html", doors=doors, codes=codes)
+    args = request.args.to_dict()
+    after = args.pop("after", None)
+    before = args.pop("before", None)
+    q = DockDoor.query.options(db.joinedload(DockDoor.destination_code))
+    if args.get("destination"):
+        q = q.join(DockDoor.destination_code).filter(DestinationCode.code == args["destination"])
+    if args.get("active") in ("0", "1"):
+        q = q.filter(DockDoor.is_active == (args["active"] == "1"))
+    try:
+        doors = keyset_page(q, [DockDoor.created_at, DockDoor.id], after=after, before=before)
+    except ValueError as exc:
+        flash(str(exc), "danger")
+        doors = Page([], None, None)
+    return render_template("facility/dock_doors.html", doors=doors, codes=codes, args=args)
 
 
 @facility_bp.route("/dock-doors/<int:door_id>/edit", methods=["GET", "POST"])
@@ -165,11 +211,14 @@ def edit_dock_door(door_id: int):
         ).first():
             flash("Name already exists", "danger")
         else:
+            old_name = door.name
             door.name = name
             door.destination_code_id = int(destination_id)
             door.is_active = bool(request.form.get("is_active"))
             door.description = request.form.get("description") or None
             db.session.commit()
+            cache.dock_doors.invalidate(old_name, name)
+            load_state.state.invalidate()
             flash("Dock door updated", "success")
             return redirect(url_for("facility.list_dock_doors"))
     return render_template("facility/dock_door_edit.html", door=door, codes=codes)
@@ -179,15 +228,18 @@ def edit_dock_door(door_id: int):
 def delete_dock_door(door_id: int):
     """Delete a dock door."""
     door = DockDoor.query.get_or_404(door_id)
+    name = door.name
     db.session.delete(door)
     db.session.commit()
+    cache.dock_doors.invalidate(name)
+    load_state.state.invalidate()
     flash("Dock door deleted", "success")
     return redirect(url_for("facility.list_dock_doors"))
 
 
 @facility_bp.route("/olpn-labels", methods=["GET", "POST"])
 def list_olpn_labels() -> str:
-    """List OLPN labels and handle creation."""
+    """List OLPN labels, filtered by destination and status, and handle creation."""
     codes = DestinationCode.query.order_by(DestinationCode.code).all()
     if request.method == "POST":
         barcode = request.form.get("barcode", "").strip()
@@ -199,69 +251,147 @@ def list_olpn_labels() -> str:
         else:
             label = OLPNLabel(barcode=barcode, destination_code_id=int(destination_id))
             db.session.add(label)
-            db.session.commit()
+            db.session.flush()  # take the write lock before the state lock, as ingest does
+            with load_state.state.updating() as state:
+                db.session.commit()
+                state.label_added(label.destination_code_id, label.status)
+            cache.olpn_labels.invalidate(barcode)
             flash("Label added", "success")
             return redirect(url_for("facility.list_olpn_labels"))
-    labels = OLPNLabel.query.order_by(OLPNLabel.created_at.desc()).all()
-    return render_template("facility/olpn_labels.html", labels=labels, codes=codes)
-
+    args = request.args.to_dict()
+    after = args.pop("after", None)
+    before = args.pop("before", None)
+    q = OLPNLabel.query.options(db.joinedload(OLPNLabel.destination))
+    if args.get("destination"):
+        q = q.join(OLPNLabel.destination).filter(DestinationCode.code == args["destination"])
+    if args.get("status"):
+        q = q.filter(OLPNLabel.status == args["status"])
+    try:
+        labels = keyset_page(q, [OLPNLabel.created_at, OLPNLabel.id], after=after, before=before)
+    except ValueError as exc:
+        flash(str(exc), "danger")
+        labels = Page([], None, None)
+    return render_template(
+        "facility/olpn_labels.html",
+        labels=labels,
+        codes=codes,
+        args=args,
+        statuses=LABEL_STATUSES,
+    )
 
-@facility_bp.route("/olpn-labels/<int:label_id>/pdf")
-def olpn_label_pdf(label_id: int):
-    """Generate a PDF with the label's QR code."""
-    label = OLPNLabel.query.get_or_404(label_id)
 
-    import io
-    import qrcode
-    from reportlab.lib.pagesizes import letter, landscape
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.utils import ImageReader
-
-    qr_img = qrcode.make(label.barcode)
-    img_buffer = io.BytesIO()
-    qr_img.save(img_buffer, format="PNG")
-    img_buffer.seek(0)
-
-    pdf_buffer = io.BytesIO()
-    c = canvas.Canvas(pdf_buffer, pagesize=landscape(letter))
-
-    width, height = landscape(letter)
-    half_width = width / 2
-    margin = 36
-    barcode_size = 200
-    y_img = (height - barcode_size) / 2
-
-    for offset in (margin, half_width + margin):
-        c.drawImage(
-            ImageReader(img_buffer),
-            offset,
-            y_img,
-            width=barcode_size,
-            height=barcode_size,
+@facility_bp.route("/olpn-labels/import", methods=["POST"])
+def import_olpn_labels():
+    """Bulk upsert OLPN labels from an uploaded CSV or JSON file.
+
+    Accepts a multipart ``file`` field or the raw request body and streams
+    NDJSON progress events. The upload form (which sends ``summary=1``) gets
+    a flashed summary instead. A raw body is read as is whatever its
+    ``Content-Type`` (``curl --data-binary`` says it is a form).
+    """
+    upload = None
+    if request.mimetype == "multipart/form-data":
+        upload = request.files.get("file")
+        if upload is None:
+            return jsonify({"error": "multipart uploads need a 'file' field"}), 400
+        body = spool_upload(upload.stream)
+    else:
+        body = spool_upload(request.stream)  # before request.form parses it away
+    if not body.read(1):
+        body.close()
+        return jsonify({"error": "the upload is empty"}), 400
+    body.seek(0)
+    mimetype = upload.mimetype if upload else request.mimetype
+    if mimetype == "application/x-www-form-urlencoded":
+        mimetype = ""  # no type given
+    try:
+        fmt = upload_format(
+            upload.filename if upload else None,
+            mimetype,
+            request.args.get("format") or request.form.get("format"),
+        )
+    except ValueError as exc:
+        body.close()
+        return jsonify({"error": str(exc)}), 400
+    events = import_labels(read_rows(body, fmt))
+
+    if not request.form.get("summary"):
+        resp = Response(
+            stream_with_context(json.dumps(event) + "\n" for event in events),
+            mimetype="application/x-ndjson",
         )
-        c.setFont("Helvetica", 14)
-        text_y = y_img - 20
-        c.drawCentredString(offset + barcode_size / 2, text_y, label.barcode)
-        c.setFont("Helvetica", 12)
-        c.drawCentredString(
-            offset + barcode_size / 2,
-            text_y - 18,
-            f"Destination: {label.destination.code}",
+        resp.call_on_close(body.close)
+        return resp
+    errors = []
+    with body:
+        for event in events:
+            if event["event"] == "error":
+                errors.append(event)
+    if event["event"] == "failed":
+        flash(
+            f"Import stopped: {event['error']}. "
+            f"{event['inserted'] + event['updated']} labels were saved before the error; "
+            "importing the file again is safe.",
+            "danger",
         )
-        c.setFont("Helvetica", 8)
-        c.drawCentredString(
-            offset + barcode_size / 2,
-            margin,
-            f'Created: {label.created_at.strftime("%Y-%m-%d %H:%M")}',
+    else:
+        flash(
+            f"Imported {event['inserted'] + event['updated']} labels "
+            f"({event['inserted']} new, {event['updated']} updated) "
+            f"in {event['seconds']} s",
+            "success",
         )
+    for error in errors[:10]:
+        flash(f"Row {error['row']} ({error['barcode']}): {error['error']}", "danger")
+    if len(errors) > 10:
+        flash(f"... and {len(errors) - 10} more rejected rows", "danger")
+    return redirect(url_for("facility.list_olpn_labels"))
+
+
+MAX_PDF_LABELS = 5000
+
 
-    c.showPage()
-    c.save()
-    pdf_buffer.seek(0)
+@facility_bp.route("/olpn-labels/pdf")
+def olpn_labels_pdf():
+    """Print many labels into one PDF, one page per label.
+
+    Select labels with ``ids`` (comma separated) or the ``destination`` code
+    and ``status`` filters; at most ``MAX_PDF_LABELS`` labels per PDF.
+    """
+    q = OLPNLabel.query.options(db.joinedload(OLPNLabel.destination))
+    ids = request.args.get("ids")
+    destination = request.args.get("destination")
+    status = request.args.get("status")
+    if ids:
+        try:
+            q = q.filter(OLPNLabel.id.in_([int(i) for i in ids.split(",") if i.strip()]))
+        except ValueError:
+            return jsonify({"error": "ids must be comma separated integers"}), 400
+    if destination:
+        q = q.join(OLPNLabel.destination).filter(DestinationCode.code == destination)
+    if status:
+        q = q.filter(OLPNLabel.status == status)
+    labels = q.order_by(OLPNLabel.barcode).limit(MAX_PDF_LABELS + 1).all()
+    if not labels:
+        return jsonify({"error": "No labels match"}), 404
+    if len(labels) > MAX_PDF_LABELS:
+        return jsonify({"error": f"More than {MAX_PDF_LABELS} labels match"}), 413
+
+    filename = f"labels_{destination or 'batch'}_{datetime.utcnow():%Y%m%d-%H%M%S}.pdf"
+    return Response(
+        stream_with_context(labels_pdf.pdf_chunks(labels)),
+        mimetype="application/pdf",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
 
+
+@facility_bp.route("/olpn-labels/<int:label_id>/pdf")
+def olpn_label_pdf(label_id: int):
+    """Generate a PDF with the label's QR code."""
+    label = OLPNLabel.query.get_or_404(label_id)
     filename = f"label_{label.barcode}.pdf"
     return send_file(
-        pdf_buffer,
+        io.BytesIO(labels_pdf.labels_pdf([label], workers=0)),
         mimetype="application/pdf",
         as_attachment=True,
         download_name=filename,
@@ -284,11 +414,19 @@ def edit_olpn_label(label_id: int):
         ).first():
             flash("Barcode already exists", "danger")
         else:
+            old_barcode = label.barcode
+            old_state = (label.destination_code_id, label.status)
             label.barcode = barcode
             label.destination_code_id = int(destination_id)
             if status in ("pending", "shipped"):
                 label.status = status
-            db.session.commit()
+            new_state = (label.destination_code_id, label.status)
+            db.session.flush()
+            with load_state.state.updating() as state:
+                db.session.commit()
+                state.label_removed(*old_state)
+                state.label_added(*new_state)
+            cache.olpn_labels.invalidate(old_barcode, barcode)
             flash("Label updated", "success")
             return redirect(url_for("facility.list_olpn_labels"))
     return render_template("facility/olpn_label_edit.html", label=label, codes=codes)
@@ -298,7 +436,13 @@ def edit_olpn_label(label_id: int):
 def delete_olpn_label(label_id: int):
     """Delete an OLPN label."""
     label = OLPNLabel.query.get_or_404(label_id)
+    barcode = label.barcode
+    old_state = (label.destination_code_id, label.status)
     db.session.delete(label)
-    db.session.commit()
+    db.session.flush()
+    with load_state.state.updating() as state:
+        db.session.commit()
+        state.label_removed(*old_state)
+    cache.olpn_labels.invalidate(barcode)
     flash("Label deleted", "success")
     return redirect(url_for("facility.list_olpn_labels"))
@@ -0,0 +1,241 @@
+"""Helpers shared by the scan ingestion endpoints."""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+import broker
+import cache
+import load_state
+from cache import MISSING
+from models import db, dialect_insert, Scan, DockDoor, OLPNLabel
+
+SCAN_FIELDS = ("camera_name", "area", "camera_type", "client_ip", "camera_url", "barcode")
+NON_EMPTY_FIELDS = ("camera_name", "area", "barcode")
+MAX_SCAN_ID_LENGTH = 64
+
+
+class IngestResult(NamedTuple):
+    """Outcome of one ingested scan.
+
+    ``duplicate`` scans were already stored under the same ``scan_id``;
+    ``id`` is then the id of the stored row.
+    """
+
+    id: int
+    valid: Optional[bool]
+    duplicate: bool = False
+
+
+def scan_from_payload(data: Dict) -> Scan:
+    """Build a :class:`Scan` from a JSON payload.
+
+    Raises ``KeyError``/``ValueError``/``TypeError`` for malformed input.
+    """
+    if not isinstance(data, dict):
+        raise TypeError("scan must be a JSON object")
+    timestamp = data.get("timestamp")
+    if timestamp:
+        timestamp = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    else:
+        timestamp = datetime.utcnow()
+    scan_id = data.get("scan_id")
+    if scan_id == "":
+        scan_id = None
+    if scan_id is not None and (
+        not isinstance(scan_id, str) or len(scan_id) > MAX_SCAN_ID_LENGTH
+    ):
+        raise ValueError(f"scan_id must be a string of at most {MAX_SCAN_ID_LENGTH} characters")
+    values = {field: data[field] for field in SCAN_FIELDS}
+    for field, value in values.items():
+        if not isinstance(value, str):
+            raise TypeError(f"{field} must be a string")
+        if field in NON_EMPTY_FIELDS and not value.strip():
+            raise ValueError(f"{field} must not be empty")
+    return Scan(timestamp=timestamp, scan_id=scan_id, **values)  # type: ignore
+
+
+def is_dock_door(area: str) -> bool:
+    """Return ``True`` if scans from ``area`` must be validated."""
+    return area.startswith("DD")
+
+
+def _dock_destinations(areas: Set[str], generation: int) -> Dict[str, Optional[int]]:
+    """Map dock door names to destination ids, using the cache first.
+
+    Rows are cached only if the cache is still at ``generation``.
+    """
+    found: Dict[str, Optional[int]] = {}
+    missing = set()
+    for area in areas:
+        dest_id = cache.dock_doors.get(area)
+        if dest_id is MISSING:
+            missing.add(area)
+        else:
+            found[area] = dest_id
+    if missing:
+        rows = dict(
+            db.session.query(DockDoor.name, DockDoor.destination_code_id).filter(
+                DockDoor.name.in_(missing)
+            )
+        )
+        for area in missing:
+            found[area] = rows.get(area)
+            cache.dock_doors.put(area, found[area], generation)
+    return found
+
+
+def _label_states(
+    barcodes: Set[str], generation: int
+) -> Dict[str, Optional[Tuple[int, str]]]:
+    """Map barcodes to ``(destination_code_id, status)``, using the cache first.
+
+    Rows are cached only if the cache is still at ``generation``.
+    """
+    found: Dict[str, Optional[Tuple[int, str]]] = {}
+    missing = set()
+    for barcode in barcodes:
+        state = cache.olpn_labels.get(barcode)
+        if state is MISSING:
+            missing.add(barcode)
+        else:
+            found[barcode] = state
+    if missing:
+        rows = {
+            barcode: (dest_id, status)
+            for barcode, dest_id, status in db.session.query(
+                OLPNLabel.barcode, OLPNLabel.destination_code_id, OLPNLabel.status
+            ).filter(OLPNLabel.barcode.in_(missing))
+        }
+        for barcode in missing:
+            found[barcode] = rows.get(barcode)
+            cache.olpn_labels.put(barcode, found[barcode], generation)
+    return found
+
+
+def cache_generations() -> Tuple[int, int]:
+    """Generations of the dock door and label caches, for :func:`validate_scans`."""
+    return cache.dock_doors.generation, cache.olpn_labels.generation
+
+
+def validate_scans(
+    scans: List[Scan], generations: Optional[Tuple[int, int]] = None
+) -> Tuple[List[Optional[bool]], Dict[str, int]]:
+    """Validate dock door scans against dock doors and OLPN labels.
+
+    Returns one entry per scan (``None`` for non dock door areas, otherwise
+    whether the label belongs to the door's destination) and the labels that
+    must be marked as shipped, as ``barcode -> destination_code_id``.
+    ``generations`` should come from :func:`cache_generations` before the
+    transaction started, so rows read before a concurrent CRUD commit are
+    not cached after its invalidation.
+    """
+    if generations is None:
+        generations = cache_generations()
+    dock_scans = [s for s in scans if is_dock_door(s.area)]
+    if not dock_scans:
+        return [None] * len(scans), {}
+
+    doors = _dock_destinations({s.area for s in dock_scans}, generations[0])
+    labels = _label_states({s.barcode for s in dock_scans}, generations[1])
+
+    results: List[Optional[bool]] = []
+    to_ship: Dict[str, int] = {}
+    for scan in scans:
+        if not is_dock_door(scan.area):
+            results.append(None)
+            continue
+        dest_id = doors.get(scan.area)
+        state = labels.get(scan.barcode)
+        valid = dest_id is not None and state is not None and state[0] == dest_id
+        if valid and state[1] != "shipped":  # type: ignore[index]
+            to_ship[scan.barcode] = dest_id  # type: ignore[assignment]
+        results.append(valid)
+    return results, to_ship
+
+
+def _insert_or_ignore(scans: List[Scan]) -> List[bool]:
+    """Insert scans carrying a ``scan_id``, skipping ids already stored.
+
+    Sets ``id`` on every scan and returns, per scan, whether it duplicates a
+    stored row or an earlier scan in ``scans``.
+    """
+    columns = SCAN_FIELDS + ("timestamp", "scan_id")
+    stmt = (
+        dialect_insert(Scan.__table__)
+        .on_conflict_do_nothing(index_elements=["scan_id"])
+        .returning(Scan.id, Scan.scan_id)
+    )
+    rows = [{column: getattr(scan, column) for column in columns} for scan in scans]
+    inserted = {scan_id: id_ for id_, scan_id in db.session.execute(stmt, rows)}
+    stored = {}
+    missing = {scan.scan_id for scan in scans} - inserted.keys()
+    if missing:
+        stored = dict(
+            db.session.query(Scan.scan_id, Scan.id).filter(Scan.scan_id.in_(missing))
+        )
+    duplicates = []
+    seen: Set[str] = set()
+    for scan in scans:
+        scan.id = inserted.get(scan.scan_id) or stored[scan.scan_id]
+        duplicates.append(scan.scan_id in stored or scan.scan_id in seen)
+        seen.add(scan.scan_id)
+    return duplicates
+
+
+def _scan_event(scan: Scan, result: IngestResult) -> Dict:
+    """Live feed event for a newly stored scan."""
+    return {
+        "id": result.id,
+        "barcode": scan.barcode,
+        "area": scan.area,
+        "camera_name": scan.camera_name,
+        "timestamp": scan.timestamp.isoformat() + "Z",
+        "valid": result.valid,
+    }
+
+
+def ingest_scans(scans: List[Scan]) -> List[IngestResult]:
+    """Store ``scans`` in one transaction and return their ids and validation results.
+
+    Scans with a ``scan_id`` are inserted with insert-or-ignore, so retried
+    and replayed deliveries are acknowledged without storing them twice.
+    New scans are published to the live feed after the commit.
+    """
+    generations = cache_generations()  # before the first read of the transaction
+    keyed = [scan for scan in scans if scan.scan_id]
+    db.session.add_all(scan for scan in scans if not scan.scan_id)
+    duplicates = dict(zip(map(id, keyed), _insert_or_ignore(keyed))) if keyed else {}
+    results, to_ship = validate_scans(scans, generations)
+    shipped = 0
+    if to_ship:
+        shipped = OLPNLabel.query.filter(
+            OLPNLabel.barcode.in_(to_ship), OLPNLabel.status != "shipped"
+        ).update(
+            {"status": "shipped", "updated_at": datetime.utcnow()},
+            synchronize_session=False,
+        )
+    db.session.flush()
+    # read everything needed before the commit expires the ORM objects
+    ingested = [
+        IngestResult(scan.id, valid, duplicates.get(id(scan), False))
+        for scan, valid in zip(scans, results)
+    ]
+    events = [
+        _scan_event(scan, result) for scan, result in zip(scans, ingested) if not result.duplicate
+    ]
+    with load_state.state.updating() as state:
+        db.session.commit()
+        if shipped == len(to_ship):
+            state.labels_shipped(to_ship.values())
+        else:  # the cache thought some labels were still pending
+            state.invalidate()
+        state.scans_added(events)
+    for barcode, dest_id in to_ship.items():
+        cache.olpn_labels.put(barcode, (dest_id, "shipped"), generations[1])
+    for event in events:
+        broker.scans.publish(event["area"], "scan", event)
+    return ingested
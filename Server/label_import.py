@@ -0,0 +1,188 @@
+"""Bulk import and upsert of OLPN labels from CSV or JSON.
+
+Each row needs a ``barcode`` and a ``destination`` (the destination code,
+e.g. ``BEN``); ``status`` is optional. New barcodes are inserted and
+existing ones get the new destination (and status, if given). Labels are
+written in chunked ``INSERT ... ON CONFLICT DO UPDATE`` statements, one
+transaction per chunk, and :func:`import_labels` yields progress events so
+the caller can stream them.
+
+Committing per chunk holds the SQLite write lock for one chunk at a time
+(tens of milliseconds) rather than for the whole upload, so scan ingest
+keeps going during a large import and a slow client cannot stall it. The
+price is that a failed import keeps the chunks committed before the
+error; upserts are idempotent, so the file can simply be imported again.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+import shutil
+import tempfile
+import time
+from datetime import datetime
+from typing import IO, Dict, Iterable, Iterator, List, Optional
+
+import cache
+import load_state
+from models import db, dialect_insert, DestinationCode, OLPNLabel
+
+LABEL_STATUSES = ("pending", "shipped")
+CHUNK_ROWS = 1000
+UPLOAD_MEMORY_BYTES = 8 * 1024 * 1024  # larger uploads are spooled to disk
+
+
+def spool_upload(stream: IO[bytes]) -> IO[bytes]:
+    """Copy ``stream`` into a temporary file and return it rewound.
+
+    The request's upload stream may be closed once the view returns, before
+    a streamed response has read it; the copy lives until it is closed.
+    """
+    upload = tempfile.SpooledTemporaryFile(max_size=UPLOAD_MEMORY_BYTES)
+    shutil.copyfileobj(stream, upload)
+    upload.seek(0)
+    return upload  # type: ignore[return-value]
+
+
+def read_rows(stream: IO[bytes], fmt: str) -> Iterator[Dict]:
+    """Yield label rows from a CSV (with a header line) or JSON upload.
+
+    JSON is a list of objects or ``{"labels": [...]}``.
+    """
+    if fmt == "csv":
+        text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+        for row in csv.DictReader(text):
+            yield {key.strip().lower(): value for key, value in row.items() if key}
+        return
+    data = json.load(stream)
+    if isinstance(data, dict):
+        data = data.get("labels")
+    if not isinstance(data, list):
+        raise ValueError("expected a list of labels")
+    for row in data:
+        yield row if isinstance(row, dict) else {}
+
+
+def _clean(row: Dict, destinations: Dict[str, int]) -> Dict:
+    """Return the insert values for ``row``; raises ``ValueError`` if invalid."""
+    barcode = str(row.get("barcode") or "").strip()
+    code = str(row.get("destination") or row.get("destination_code") or "").strip()
+    status = str(row.get("status") or "").strip().lower()
+    if not barcode:
+        raise ValueError("barcode is required")
+    if not code:
+        raise ValueError("destination is required")
+    if code not in destinations:
+        raise ValueError(f"unknown destination {code!r}")
+    if status and status not in LABEL_STATUSES:
+        raise ValueError(f"status must be one of {', '.join(LABEL_STATUSES)}")
+    values = {"barcode": barcode, "destination_code_id": destinations[code]}
+    if status:
+        values["status"] = status
+    return values
+
+
+def _upsert(rows: List[Dict], now: datetime) -> int:
+    """Write ``rows`` and return how many of them were new labels."""
+    barcodes = [row["barcode"] for row in rows]
+    existing = {
+        barcode
+        for (barcode,) in db.session.query(OLPNLabel.barcode).filter(
+            OLPNLabel.barcode.in_(barcodes)
+        )
+    }
+    # rows without a status keep the stored one, so they need their own statement
+    for with_status in (True, False):
+        group = [
+            {"status": "pending", **row, "created_at": now, "updated_at": now}
+            for row in rows
+            if ("status" in row) == with_status
+        ]
+        if not group:
+            continue
+        stmt = dialect_insert(OLPNLabel.__table__)
+        update = {
+            "destination_code_id": stmt.excluded.destination_code_id,
+            "updated_at": stmt.excluded.updated_at,
+        }
+        if with_status:
+            update["status"] = stmt.excluded.status
+        # executemany: one cached statement, batched into multi-row VALUES
+        db.session.execute(
+            stmt.on_conflict_do_update(index_elements=["barcode"], set_=update), group
+        )
+    return len(rows) - len(existing)
+
+
+def import_labels(rows: Iterable[Dict], chunk_rows: int = CHUNK_ROWS) -> Iterator[Dict]:
+    """Upsert ``rows`` one committed chunk at a time, yielding progress events.
+
+    Events are ``{"event": "error", "row": n, ...}`` for each rejected row
+    (rows are numbered from 1), ``{"event": "progress", ...}`` after each
+    committed chunk and a final ``{"event": "done", ...}`` or
+    ``{"event": "failed", ...}``. Rejected rows are skipped; a database
+    error rolls back the current chunk and stops the import, whose counts
+    then cover the chunks already saved. A barcode listed twice keeps its
+    first row.
+    """
+    start = time.perf_counter()
+    now = datetime.utcnow()
+    destinations = dict(db.session.query(DestinationCode.code, DestinationCode.id))
+    db.session.commit()  # don't keep the read transaction open while parsing
+    seen: Dict[str, int] = {}
+    counts = {"rows": 0, "inserted": 0, "updated": 0, "errors": 0}
+    chunk: List[Dict] = []
+
+    def flush() -> Dict:
+        inserted = _upsert(chunk, now)
+        with load_state.state.updating() as state:
+            db.session.commit()
+            state.invalidate()
+        cache.olpn_labels.invalidate(*(row["barcode"] for row in chunk))
+        counts["inserted"] += inserted
+        counts["updated"] += len(chunk) - inserted
+        chunk.clear()
+        return {"event": "progress", **counts}
+
+    try:
+        for number, row in enumerate(rows, 1):
+            counts["rows"] = number
+            try:
+                values = _clean(row, destinations)
+                first = seen.setdefault(values["barcode"], number)
+                if first != number:
+                    raise ValueError(f"duplicate of row {first}")
+            except ValueError as exc:
+                counts["errors"] += 1
+                yield {
+                    "event": "error",
+                    "row": number,
+                    "barcode": row.get("barcode"),
+                    "error": str(exc),
+                }
+                continue
+            chunk.append(values)
+            if len(chunk) >= chunk_rows:
+                yield flush()
+        if chunk:
+            yield flush()
+    except Exception as exc:
+        db.session.rollback()
+        yield {"event": "failed", "error": str(exc), **counts}
+        return
+    yield {"event": "done", "seconds": round(time.perf_counter() - start, 3), **counts}
+
+
+def upload_format(filename: Optional[str], mimetype: str, requested: Optional[str]) -> str:
+    """Pick "csv" or "json" from the explicit format, file name or MIME type."""
+    if requested:
+        fmt = requested.lower()
+    elif filename and "." in filename:
+        fmt = filename.rsplit(".", 1)[1].lower()
+    else:
+        fmt = "json" if mimetype.endswith("json") else "csv"
+    if fmt not in ("csv", "json"):
+        raise ValueError("format must be csv or json")
+    return fmt
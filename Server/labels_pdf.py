@@ -0,0 +1,141 @@
+"""OLPN label PDFs: one page per label, two copies of the label per page.
+
+QR codes are rendered once per barcode and kept as PNG bytes in
+``cache.qr_images``. Rendering the QR codes is most of the work, so a
+batch can hand its cache misses to a process pool
+(``$LABEL_PDF_WORKERS`` processes, default none).
+"""
+
+from __future__ import annotations
+
+import atexit
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import qrcode  # type: ignore
+from reportlab.lib.pagesizes import landscape, letter  # type: ignore
+from reportlab.lib.utils import ImageReader  # type: ignore
+from reportlab.pdfgen import canvas  # type: ignore
+
+import cache
+
+PAGE_SIZE = landscape(letter)
+MARGIN = 36
+BARCODE_SIZE = 200
+CHUNK_BYTES = 64 * 1024
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def render_qr(barcode: str) -> bytes:
+    """Render ``barcode`` as a grayscale QR code PNG.
+
+    reportlab expands 1-bit images to RGB before compressing them; grayscale
+    images stay one byte per pixel, which builds pages about 3x faster.
+    """
+    buffer = io.BytesIO()
+    qrcode.make(barcode).get_image().convert("L").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Return the shared pool of ``workers`` processes.
+
+    A call with another count replaces the pool; renders already submitted
+    to the old one still finish.
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is None:
+                atexit.register(_shutdown_pool)
+            else:
+                _pool.shutdown(wait=False)
+            # spawn: forking a threaded server process is unsafe
+            context = multiprocessing.get_context("spawn")
+            _pool = ProcessPoolExecutor(workers, mp_context=context)
+            _pool_workers = workers
+        return _pool
+
+
+def _shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def qr_images(barcodes: Iterable[str], workers: Optional[int] = None) -> Dict[str, bytes]:
+    """Return the QR PNG of every barcode, rendering cache misses.
+
+    With ``workers`` (default ``$LABEL_PDF_WORKERS``) above zero, misses
+    are rendered in a shared process pool of that size.
+    """
+    if workers is None:
+        workers = int(os.getenv("LABEL_PDF_WORKERS", 0))
+    images: Dict[str, bytes] = {}
+    missing: List[str] = []
+    for barcode in dict.fromkeys(barcodes):
+        png = cache.qr_images.get(barcode, None)
+        if png is None:
+            missing.append(barcode)
+        else:
+            images[barcode] = png
+    if workers > 0 and len(missing) > 1:
+        chunksize = max(1, len(missing) // (4 * workers))
+        rendered = _get_pool(workers).map(render_qr, missing, chunksize=chunksize)
+    else:
+        rendered = map(render_qr, missing)
+    for barcode, png in zip(missing, rendered):
+        cache.qr_images.put(barcode, png)
+        images[barcode] = png
+    return images
+
+
+def draw_label(c: canvas.Canvas, label, image: ImageReader) -> None:
+    """Draw ``label`` twice on the current page of ``c``."""
+    width, height = PAGE_SIZE
+    y_img = (height - BARCODE_SIZE) / 2
+    for offset in (MARGIN, width / 2 + MARGIN):
+        center = offset + BARCODE_SIZE / 2
+        c.drawImage(image, offset, y_img, width=BARCODE_SIZE, height=BARCODE_SIZE)
+        c.setFont("Helvetica", 14)
+        text_y = y_img - 20
+        c.drawCentredString(center, text_y, label.barcode)
+        c.setFont("Helvetica", 12)
+        c.drawCentredString(center, text_y - 18, f"Destination: {label.destination.code}")
+        c.setFont("Helvetica", 8)
+        c.drawCentredString(
+            center, MARGIN, f'Created: {label.created_at.strftime("%Y-%m-%d %H:%M")}'
+        )
+    c.showPage()
+
+
+def labels_pdf(labels: List, workers: Optional[int] = None) -> bytes:
+    """Return a PDF with one page per label, in the given order."""
+    images = qr_images((label.barcode for label in labels), workers)
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=PAGE_SIZE)
+    for label in labels:
+        draw_label(c, label, ImageReader(io.BytesIO(images[label.barcode])))
+    c.save()
+    return buffer.getvalue()
+
+
+def pdf_chunks(labels: List, workers: Optional[int] = None) -> Iterator[bytes]:
+    """Yield :func:`labels_pdf` in chunks for a streamed response.
+
+    reportlab writes the document only once it is complete, so the first
+    chunk comes after all pages are built; the response headers go out
+    straight away.
+    """
+    data = labels_pdf(labels, workers)
+    for start in range(0, len(data), CHUNK_BYTES):
+        yield data[start : start + CHUNK_BYTES]
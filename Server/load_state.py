@@ -0,0 +1,150 @@
+"""Incrementally maintained per-door loading summary for the dashboard.
+
+For every dock door the state holds the expected and shipped OLPN label
+counts of its destination and the last few scans, so dashboard reads cost
+O(doors) no matter how many scans or labels are stored. It is built
+lazily with one GROUP BY, then kept current by the ingest path and the
+facility CRUD routes; changes it cannot apply exactly just invalidate it.
+The state is per process: changes handled by another server process are
+never seen, so the server must run as one (threaded) process.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import func
+
+from models import db, DockDoor, OLPNLabel, Scan
+
+
+class LoadState:
+    """Per-door label counts and recent scans.
+
+    Methods that apply a change must be called inside :meth:`updating`,
+    wrapped around the commit that made it, so a concurrent rebuild cannot
+    count the same change twice. Flush the change first: the database write
+    lock must be taken before the state lock on every path, or a writer
+    holding one waits on the other. They do nothing until the state is built.
+    """
+
+    def __init__(self, recent: int = 20) -> None:
+        self.recent = recent
+        self.rebuilds = 0
+        self._lock = threading.RLock()
+        self._built = False
+        self._counts: Dict[int, Dict[str, int]] = {}  # destination id -> counts
+        self._doors: Dict[str, Dict] = {}
+        self._recent: Dict[str, Deque[Dict]] = {}
+
+    @contextmanager
+    def updating(self) -> Iterator["LoadState"]:
+        with self._lock:
+            yield self
+
+    def invalidate(self) -> None:
+        """Drop the state; the next read rebuilds it from the database."""
+        with self._lock:
+            self._built = False
+
+    def _build(self) -> None:
+        counts: Dict[int, Dict[str, int]] = {}
+        rows = db.session.query(
+            OLPNLabel.destination_code_id, OLPNLabel.status, func.count()
+        ).group_by(OLPNLabel.destination_code_id, OLPNLabel.status)
+        for dest_id, status, count in rows:
+            entry = counts.setdefault(dest_id, {"expected": 0, "shipped": 0})
+            entry["expected"] += count
+            if status == "shipped":
+                entry["shipped"] += count
+
+        doors = {}
+        recent = {}
+        for door in DockDoor.query.options(db.joinedload(DockDoor.destination_code)):
+            doors[door.name] = {
+                "destination_code_id": door.destination_code_id,
+                "destination_code": door.destination_code.code,
+                "destination_name": door.destination_code.name,
+                "is_active": door.is_active,
+            }
+            scans = (
+                Scan.query.filter_by(area=door.name)
+                .order_by(Scan.timestamp.desc(), Scan.id.desc())
+                .limit(self.recent)
+            )
+            recent[door.name] = deque(
+                reversed([_scan_summary(scan) for scan in scans]), maxlen=self.recent
+            )
+        self._counts, self._doors, self._recent = counts, doors, recent
+        self._built = True
+        self.rebuilds += 1
+
+    def snapshot(self, door: Optional[str] = None) -> List[Dict]:
+        """Return the summary of every door, or of ``door`` only."""
+        with self._lock:
+            if not self._built:
+                self._build()
+            names = sorted(self._doors) if door is None else [door] if door in self._doors else []
+            result = []
+            for name in names:
+                info = self._doors[name]
+                counts = self._counts.get(info["destination_code_id"], {})
+                expected = counts.get("expected", 0)
+                shipped = counts.get("shipped", 0)
+                result.append(
+                    {
+                        "door": name,
+                        **info,
+                        "expected": expected,
+                        "shipped": shipped,
+                        "remaining": expected - shipped,
+                        "recent_scans": list(reversed(self._recent[name])),
+                    }
+                )
+            return result
+
+    def scans_added(self, events: Iterable[Dict]) -> None:
+        """Record newly stored scans (live feed events) at dock doors."""
+        if not self._built:
+            return
+        for event in events:
+            if event["area"] in self._recent:
+                self._recent[event["area"]].append(event)
+
+    def labels_shipped(self, destinations: Iterable[int]) -> None:
+        """Count one label shipped per entry of ``destinations``."""
+        if not self._built:
+            return
+        for dest_id in destinations:
+            self._counts.setdefault(dest_id, {"expected": 0, "shipped": 0})["shipped"] += 1
+
+    def label_added(self, dest_id: int, status: str) -> None:
+        self._change_label(dest_id, status, 1)
+
+    def label_removed(self, dest_id: int, status: str) -> None:
+        self._change_label(dest_id, status, -1)
+
+    def _change_label(self, dest_id: int, status: str, delta: int) -> None:
+        if not self._built:
+            return
+        entry = self._counts.setdefault(dest_id, {"expected": 0, "shipped": 0})
+        entry["expected"] += delta
+        if status == "shipped":
+            entry["shipped"] += delta
+
+
+def _scan_summary(scan: Scan) -> Dict:
+    return {
+        "id": scan.id,
+        "barcode": scan.barcode,
+        "area": scan.area,
+        "camera_name": scan.camera_name,
+        "timestamp": scan.timestamp.isoformat() + "Z",
+        "valid": None,  # only known for scans received since the last rebuild
+    }
+
+
+state = LoadState()
@@ -1,5 +1,6 @@
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy # type: ignore
+from sqlalchemy import inspect, text
 
 db = SQLAlchemy()
 
@@ -7,16 +8,25 @@ db = SQLAlchemy()
 class Scan(db.Model):
     """Database model for a scan event."""
 
+    # the scans list filters on one of these columns and sorts newest first
+    __table_args__ = (
+        db.Index("ix_scan_area_timestamp", "area", "timestamp", "id"),
+        db.Index("ix_scan_barcode_timestamp", "barcode", "timestamp", "id"),
+        db.Index("ix_scan_camera_name_timestamp", "camera_name", "timestamp", "id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    camera_name = db.Column(db.String, nullable=False, index=True)
-    area = db.Column(db.String, nullable=False, index=True)
+    camera_name = db.Column(db.String, nullable=False)
+    area = db.Column(db.String, nullable=False)
     camera_type = db.Column(db.String, nullable=False)
     client_ip = db.Column(db.String, nullable=False)
     camera_url = db.Column(db.String, nullable=False)
-    barcode = db.Column(db.String, nullable=False, index=True)
+    barcode = db.Column(db.String, nullable=False)
     timestamp = db.Column(
         db.DateTime, nullable=False, index=True, default=datetime.utcnow
     )
+    # client generated idempotency key; retried or replayed scans reuse it
+    scan_id = db.Column(db.String(64), nullable=True, unique=True, index=True)
 
     def __repr__(self) -> str:  # pragma: no cover - representation only
         return f"<Scan {self.id} {self.barcode}>"
@@ -39,6 +49,7 @@ class DockDoor(db.Model):
     """Loading dock door linked to a destination code."""
 
     __tablename__ = "dock_doors"
+    __table_args__ = (db.Index("ix_dock_doors_created_at", "created_at", "id"),)
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False, unique=True)
@@ -62,6 +73,14 @@ class OLPNLabel(db.Model):
     """Label representing an outbound license plate number (OLPN)."""
 
     __tablename__ = "olpn_labels"
+    # the labels list sorts newest first, optionally filtered by status or destination
+    __table_args__ = (
+        db.Index("ix_olpn_labels_created_at", "created_at", "id"),
+        db.Index("ix_olpn_labels_status_created_at", "status", "created_at", "id"),
+        db.Index(
+            "ix_olpn_labels_destination_created_at", "destination_code_id", "created_at", "id"
+        ),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     barcode = db.Column(db.String, nullable=False, unique=True, index=True)
@@ -78,3 +97,68 @@ class OLPNLabel(db.Model):
 
     def __repr__(self) -> str:  # pragma: no cover - representation only
         return f"<OLPNLabel {self.id} {self.barcode}>"
+
+
+class ScanRollup(db.Model):
+    """Hourly scan count of one barcode in one area, kept after raw scans expire."""
+
+    __tablename__ = "scan_rollups"
+    __table_args__ = (db.UniqueConstraint("hour", "area", "barcode"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    hour = db.Column(db.DateTime, nullable=False, index=True)
+    area = db.Column(db.String, nullable=False)
+    barcode = db.Column(db.String, nullable=False, index=True)
+    scans = db.Column(db.Integer, nullable=False)
+    first_seen = db.Column(db.DateTime, nullable=False)
+    last_seen = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self) -> str:  # pragma: no cover - representation only
+        return f"<ScanRollup {self.hour} {self.area} {self.barcode} x{self.scans}>"
+
+
+def dialect_insert(table):
+    """Return an INSERT for ``table`` supporting ``ON CONFLICT`` clauses.
+
+    Works on SQLite and PostgreSQL, the databases WareEye runs on.
+    """
+    name = db.engine.dialect.name
+    if name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:  # pragma: no cover - unsupported database
+        raise NotImplementedError(f"ON CONFLICT inserts are not supported on {name}")
+    return insert(table)
+
+
+# indexes of older versions made redundant by the composite ``Scan`` indexes;
+# every extra index slows down scan ingest
+DROPPED_INDEXES = ("ix_scan_area", "ix_scan_barcode", "ix_scan_camera_name")
+
+
+def upgrade_schema() -> None:
+    """Create missing tables, nullable columns and indexes.
+
+    ``db.create_all`` never alters existing tables, so databases created by
+    older versions are brought up to date here, and indexes listed in
+    ``DROPPED_INDEXES`` are removed. Must run in an app context.
+    """
+    db.create_all()
+    inspector = inspect(db.engine)
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if not column.nullable:
+                    raise RuntimeError(f"Cannot add required column {table.name}.{column.name}")
+                column_type = column.type.compile(dialect=conn.dialect)
+                conn.execute(
+                    text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}")
+                )
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+        for name in DROPPED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
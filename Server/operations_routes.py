@@ -1,8 +1,61 @@
-from flask import Blueprint, render_template
+from datetime import datetime
+
+from flask import Blueprint, Response, jsonify, render_template, request
+
+import broker
+import load_state
 
 operations_bp = Blueprint('operations', __name__, url_prefix='/ops')
 
+HEARTBEAT_SECONDS = 15
+
 
 @operations_bp.route('/loading-dashboard')
 def loading_dashboard():
     return render_template('operations/loading_dashboard.html')
+
+
+@operations_bp.route('/load-state')
+def load_state_view():
+    """Expected vs. shipped labels and recent scans per dock door.
+
+    Served from the in-memory :mod:`load_state`, so the cost does not grow
+    with the number of stored scans or labels. ``?door=`` limits it to one door.
+    Only changes made through this server process are reflected.
+    """
+    return jsonify({
+        'generated_at': datetime.utcnow().isoformat() + 'Z',
+        'doors': load_state.state.snapshot(request.args.get('door') or None),
+    })
+
+
+@operations_bp.route('/stream')
+def live_stream():
+    """Server-Sent Events feed of new scans, optionally for one ``area``.
+
+    Events come from the in-memory broker, so viewers cost no database
+    queries. A comment line is sent every ``HEARTBEAT_SECONDS`` to keep
+    proxies from closing idle connections.
+    """
+    sub = broker.scans.subscribe(request.args.get('area') or None)
+
+    def events():
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                message = sub.get(timeout=HEARTBEAT_SECONDS)
+                yield message if message is not None else ': heartbeat\n\n'
+        finally:
+            broker.scans.unsubscribe(sub)
+
+    return Response(
+        events(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@operations_bp.route('/stream/stats')
+def live_stream_stats():
+    """Return subscriber and message counters of the live feed."""
+    return jsonify(broker.scans.stats())
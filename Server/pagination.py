@@ -0,0 +1,81 @@
+"""Keyset (cursor) pagination for the facility list pages.
+
+Instead of ``OFFSET`` and a ``COUNT(*)``, a page continues from the sort
+key of the last row shown, e.g. ``WHERE (timestamp, id) < (:ts, :id)``.
+With an index on the sort columns every page costs the same, however deep.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import tuple_
+
+DEFAULT_PER_PAGE = 50
+
+
+class Page(NamedTuple):
+    items: List[Any]
+    next_cursor: Optional[str]  # older rows, i.e. further down the list
+    prev_cursor: Optional[str]  # newer rows
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps(
+        [{"dt": v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Return the sort key in ``cursor``; raises ``ValueError`` if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list):
+            raise TypeError("not a list")
+        return [
+            datetime.fromisoformat(v["dt"]) if isinstance(v, dict) else v for v in values
+        ]
+    except Exception as exc:
+        raise ValueError(f"Invalid cursor: {exc}") from exc
+
+
+def keyset_page(
+    query,
+    columns: Sequence,
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    per_page: int = DEFAULT_PER_PAGE,
+) -> Page:
+    """Return one page of ``query`` sorted by ``columns``, all descending.
+
+    ``columns`` must end in a unique column (usually the primary key) so the
+    order is total. ``after`` continues with older rows from a
+    ``next_cursor``; ``before`` goes back with a ``prev_cursor``.
+    """
+    key = tuple_(*columns)
+    if before:
+        query = query.filter(key > tuple_(*decode_cursor(before)))
+        rows = query.order_by(*[c.asc() for c in columns]).limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        has_prev, has_next = has_more, True
+    else:
+        if after:
+            query = query.filter(key < tuple_(*decode_cursor(after)))
+        rows = query.order_by(*[c.desc() for c in columns]).limit(per_page + 1).all()
+        items = rows[:per_page]
+        has_prev, has_next = bool(after), len(rows) > per_page
+
+    def cursor(item) -> str:
+        return encode_cursor([getattr(item, c.key) for c in columns])
+
+    return Page(
+        items=items,
+        next_cursor=cursor(items[-1]) if items and has_next else None,
+        prev_cursor=cursor(items[0]) if items and has_prev else None,
+    )
@@ -0,0 +1,211 @@
+"""Scan retention: roll up, archive and delete raw scans past a certain age.
+
+Scans older than the retention period are processed oldest first in
+small batches, one short transaction each, so ingest is never locked out
+for long. Each batch is
+
+1. appended to a gzip NDJSON archive per day
+   (``scans-YYYY-MM-DD.ndjson.gz``, one gzip member per batch),
+2. counted into hourly :class:`models.ScanRollup` rows per (area, barcode),
+3. deleted.
+
+Steps 2 and 3 commit together, so rollups are exact. If the process
+dies between steps 1 and 3, that one batch is archived twice.
+
+Run it with ``flask --app app scan-retention`` or set
+``SCAN_RETENTION_INTERVAL_HOURS`` to run it inside the server.
+"""
+
+from __future__ import annotations
+
+import gzip
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import click  # type: ignore
+from flask import Flask, current_app  # type: ignore
+from flask.cli import with_appcontext  # type: ignore
+from sqlalchemy import case
+
+import load_state
+from models import db, dialect_insert, Scan, ScanRollup
+from scan_export import EXPORT_COLUMNS, ndjson_chunks
+
+DEFAULT_DAYS = 30
+DEFAULT_BATCH = 2000
+DEFAULT_PAUSE = 0.05  # seconds between batches, lets the scan writer in
+
+
+def archive_dir(app: Flask) -> str:
+    return os.getenv("SCAN_ARCHIVE_DIR") or os.path.join(app.instance_path, "scan_archive")
+
+
+def _archive(rows: List, directory: str) -> None:
+    by_day: Dict[str, List] = defaultdict(list)
+    for row in rows:
+        by_day[row.timestamp.strftime("%Y-%m-%d")].append(row)
+    os.makedirs(directory, exist_ok=True)
+    for day, day_rows in by_day.items():
+        path = os.path.join(directory, f"scans-{day}.ndjson.gz")
+        with gzip.open(path, "ab") as archive:
+            for chunk in ndjson_chunks(day_rows):
+                archive.write(chunk)
+
+
+def _rollup(rows: List) -> int:
+    """Add ``rows`` to the hourly rollups; returns the number of groups."""
+    groups: Dict[Tuple, Dict] = {}
+    for row in rows:
+        hour = row.timestamp.replace(minute=0, second=0, microsecond=0)
+        group = groups.get((hour, row.area, row.barcode))
+        if group is None:
+            groups[(hour, row.area, row.barcode)] = {
+                "hour": hour,
+                "area": row.area,
+                "barcode": row.barcode,
+                "scans": 1,
+                "first_seen": row.timestamp,
+                "last_seen": row.timestamp,
+            }
+        else:
+            group["scans"] += 1
+            group["first_seen"] = min(group["first_seen"], row.timestamp)
+            group["last_seen"] = max(group["last_seen"], row.timestamp)
+    if not groups:
+        return 0
+    table = ScanRollup.__table__
+    stmt = dialect_insert(table)
+    excluded = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["hour", "area", "barcode"],
+        set_={
+            "scans": table.c.scans + excluded.scans,
+            "first_seen": case(
+                (excluded.first_seen < table.c.first_seen, excluded.first_seen),
+                else_=table.c.first_seen,
+            ),
+            "last_seen": case(
+                (excluded.last_seen > table.c.last_seen, excluded.last_seen),
+                else_=table.c.last_seen,
+            ),
+        },
+    )
+    db.session.execute(stmt, list(groups.values()))
+    return len(groups)
+
+
+def run_retention(
+    days: int = DEFAULT_DAYS,
+    directory: Optional[str] = None,
+    batch: int = DEFAULT_BATCH,
+    pause: float = DEFAULT_PAUSE,
+    now: Optional[datetime] = None,
+) -> Dict[str, int]:
+    """Process every scan older than ``days`` days; returns counters.
+
+    ``directory`` of ``None`` skips archiving. Must run in an app context.
+    """
+    cutoff = (now or datetime.utcnow()) - timedelta(days=days)
+    cutoff = cutoff.replace(minute=0, second=0, microsecond=0)  # whole hours roll up
+    stats = {"deleted": 0, "rollups": 0, "batches": 0}
+    try:
+        while True:
+            rows = (
+                db.session.query(*EXPORT_COLUMNS)
+                .filter(Scan.timestamp < cutoff)
+                .order_by(Scan.timestamp, Scan.id)
+                .limit(batch)
+                .all()
+            )
+            if not rows:
+                break
+            if directory:
+                _archive(rows, directory)
+            stats["rollups"] += _rollup(rows)
+            db.session.query(Scan).filter(Scan.id.in_([row.id for row in rows])).delete(
+                synchronize_session=False
+            )
+            db.session.commit()
+            stats["deleted"] += len(rows)
+            stats["batches"] += 1
+            if pause:
+                time.sleep(pause)
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        if stats["deleted"]:
+            load_state.state.invalidate()  # deleted scans may be among the recent ones
+    return stats
+
+
+def run_configured(app: Flask) -> Dict[str, int]:
+    """Run :func:`run_retention` with the ``SCAN_RETENTION_*`` settings."""
+    return run_retention(
+        days=int(os.getenv("SCAN_RETENTION_DAYS", DEFAULT_DAYS)),
+        directory=archive_dir(app),
+        batch=int(os.getenv("SCAN_RETENTION_BATCH", DEFAULT_BATCH)),
+    )
+
+
+class RetentionScheduler:
+    """Run the retention job in the server every ``interval`` seconds."""
+
+    def __init__(self, app: Flask, interval: float) -> None:
+        self.app = app
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="scan-retention", daemon=True)
+
+    def start(self) -> "RetentionScheduler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(5.0)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            with self.app.app_context():
+                try:
+                    stats = run_configured(self.app)
+                    self.app.logger.info("Scan retention: %s", stats)
+                except Exception:  # pragma: no cover - logged, retried next interval
+                    self.app.logger.exception("Scan retention failed")
+
+
+def init_retention(app: Flask) -> Optional[RetentionScheduler]:
+    """Register the CLI command and start the schedule if configured."""
+    app.cli.add_command(retention_command)
+    hours = float(os.getenv("SCAN_RETENTION_INTERVAL_HOURS", 0))
+    if hours <= 0:
+        return None
+    scheduler = RetentionScheduler(app, hours * 3600).start()
+    app.extensions["scan_retention"] = scheduler
+    return scheduler
+
+
+@click.command("scan-retention")
+@click.option("--days", type=int, default=None, help="Keep raw scans this many days")
+@click.option("--archive-dir", "archive_path", default=None, help="Where to write the archives")
+@click.option("--no-archive", is_flag=True, help="Delete without archiving")
+@click.option("--batch", type=int, default=None, help="Scans per transaction")
+@with_appcontext
+def retention_command(
+    days: Optional[int], archive_path: Optional[str], no_archive: bool, batch: Optional[int]
+) -> None:
+    """Roll up, archive and delete scans older than the retention period."""
+    stats = run_retention(
+        days=days if days is not None else int(os.getenv("SCAN_RETENTION_DAYS", DEFAULT_DAYS)),
+        directory=None if no_archive else archive_path or archive_dir(current_app),
+        batch=batch or int(os.getenv("SCAN_RETENTION_BATCH", DEFAULT_BATCH)),
+    )
+    click.echo(
+        f"Deleted {stats['deleted']} scans in {stats['batches']} batches, "
+        f"updated {stats['rollups']} hourly rollups"
+    )
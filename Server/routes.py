@@ -1,10 +1,21 @@
-from datetime import datetime
-from flask import Blueprint, jsonify, render_template, request
+import json
+import queue
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import List
 
-from models import db, Scan, DockDoor, OLPNLabel
+from flask import Blueprint, current_app, jsonify, render_template, request
+from sqlalchemy.exc import DataError, IntegrityError, OperationalError
+
+import cache
+from ingest import IngestResult, ingest_scans, scan_from_payload
 
 bp = Blueprint("scan", __name__)
 
+MAX_BATCH_SIZE = 1000
+WRITER_TIMEOUT = 30  # seconds a request waits for the scan writer
+RETRY_AFTER = 1  # seconds, sent with 503 answers
+NDJSON_MIMETYPES = ("application/x-ndjson", "application/ndjson")
+
 
 @bp.route("/")
 def hello():
@@ -16,44 +27,126 @@ def ingest_scan() -> tuple:
     """Ingest scan data from cameras."""
     data = request.get_json(force=True, silent=True) or {}
     try:
-        timestamp = data.get("timestamp")
-        if timestamp:
-            timestamp = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
-        else:
-            timestamp = datetime.utcnow()
-        scan = Scan(
-            camera_name=data["camera_name"],  # type: ignore
-            area=data["area"],  # type: ignore
-            camera_type=data["camera_type"],  # type: ignore
-            client_ip=data["client_ip"],  # type: ignore
-            camera_url=data["camera_url"],  # type: ignore
-            barcode=data["barcode"],  # type: ignore
-            timestamp=timestamp,  # type: ignore
-        )
+        scan = scan_from_payload(data)
+    except Exception as exc:  # pragma: no cover - input errors
+        return jsonify({"error": f"Invalid payload: {exc}"}), 400
+
+    result = _store([scan])[0]
+    return jsonify({"status": "success", **_result_fields(result)})  # type: ignore
+
+
+class ScanStoreError(Exception):
+    """Scans could not be stored; ``status`` is the HTTP status to answer."""
+
+    def __init__(self, message: str, status: int) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def _store(scans: list) -> List[IngestResult]:
+    """Store ``scans`` through the scan writer if one runs, else directly.
+
+    Raises :class:`ScanStoreError`: 503 when the writer is saturated, did
+    not answer in time or the database stayed locked (clients retry, and
+    their ``scan_id`` keeps a late commit from being stored twice), 400 when
+    the database rejects the scans. Other database errors propagate (500).
+    """
+    writer = current_app.extensions.get("scan_writer")
+    try:
+        if writer is None or not writer.running:
+            return ingest_scans(scans)
+        future = writer.submit(scans)
+        try:
+            return future.result(WRITER_TIMEOUT)
+        except FutureTimeout:
+            future.cancel()  # only succeeds while still queued
+            raise ScanStoreError("scan writer did not answer in time", 503)
+    except queue.Full:
+        raise ScanStoreError("scan writer queue is full", 503)
+    except (IntegrityError, DataError) as exc:
+        raise ScanStoreError(f"Invalid scans: {exc.orig}", 400)
+    except OperationalError as exc:
+        if not _database_locked(exc):
+            raise
+        raise ScanStoreError(f"Database busy: {exc.orig}", 503)
+
+
+def _database_locked(exc: OperationalError) -> bool:
+    """Whether ``exc`` is a lock timeout, e.g. SQLite's "database is locked"."""
+    message = str(exc.orig).lower()
+    return "locked" in message or "busy" in message
+
+
+@bp.errorhandler(ScanStoreError)
+def scan_store_error(exc: ScanStoreError) -> tuple:
+    response = jsonify({"error": str(exc)})
+    if exc.status == 503:
+        response.headers["Retry-After"] = str(RETRY_AFTER)
+    return response, exc.status
+
+
+def _result_fields(result: IngestResult) -> dict:
+    fields = {"id": result.id}
+    if result.valid is not None:
+        fields["valid"] = result.valid
+    if result.duplicate:
+        fields["duplicate"] = True
+    return fields
+
+
+def _batch_payloads() -> list:
+    """Return the list of scan payloads posted to the batch endpoint.
+
+    Accepts a JSON array, a ``{"scans": [...]}`` object or NDJSON.
+    """
+    if request.mimetype in NDJSON_MIMETYPES:
+        body = request.get_data(as_text=True)
+        return [json.loads(line) for line in body.splitlines() if line.strip()]
+    data = request.get_json(force=True)
+    if isinstance(data, dict):
+        data = data.get("scans")
+    if not isinstance(data, list):
+        raise ValueError("expected a list of scans")
+    return data
+
+
+@bp.route("/api/scans/batch", methods=["POST"])
+def ingest_scan_batch() -> tuple:
+    """Ingest many scans in a single transaction.
+
+    The whole batch is rejected if any entry is malformed.
+    """
+    try:
+        payloads = _batch_payloads()
     except Exception as exc:  # pragma: no cover - input errors
         return jsonify({"error": f"Invalid payload: {exc}"}), 400
+    if len(payloads) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"Batch exceeds {MAX_BATCH_SIZE} scans"}), 413
+
+    scans, errors = [], []
+    for index, data in enumerate(payloads):
+        try:
+            scans.append(scan_from_payload(data))
+        except Exception as exc:
+            errors.append({"index": index, "error": f"Invalid payload: {exc}"})
+    if errors:
+        return jsonify({"error": "Invalid batch", "errors": errors}), 400
 
-    db.session.add(scan)
+    results = [_result_fields(result) for result in _store(scans)]
+    return jsonify({"status": "success", "results": results})  # type: ignore
 
-    valid = None
-    if scan.area.startswith("DD"):
-        dock = DockDoor.query.filter_by(name=scan.area).first()
-        label = OLPNLabel.query.filter_by(barcode=scan.barcode).first()
-        valid = (
-            dock is not None
-            and label is not None
-            and label.destination_code_id == dock.destination_code_id
-        )
-        if valid and label.status != "shipped":  # type: ignore[union-attr]
-            label.status = "shipped"  # type: ignore[union-attr]
-            label.updated_at = datetime.utcnow()  # type: ignore[union-attr]
-            db.session.add(label)  # ensure updated
 
-    db.session.commit()
+@bp.route("/api/cache/stats")
+def cache_stats():
+    """Return hit/miss counters of the validation caches.
 
-    resp = {"status": "success", "id": scan.id}
-    if valid is not None:
-        resp["valid"] = valid
-    return jsonify(resp)  # type: ignore
+    The counters, like the caches, belong to the process that answers.
+    """
+    return jsonify(cache.stats())
 
 
+@bp.route("/api/writer/stats")
+def writer_stats():
+    """Return group commit counters of the scan writer, if enabled."""
+    writer = current_app.extensions.get("scan_writer")
+    return jsonify(writer.stats() if writer is not None else {"enabled": False})
@@ -0,0 +1,86 @@
+"""Streaming CSV/NDJSON encoders for exporting scans.
+
+Rows are fetched in chunks with ``yield_per`` (a server-side cursor where
+the driver supports one) and encoded chunk by chunk, so an export of any
+size runs in constant memory and the first bytes go out immediately.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+import zlib
+from typing import Iterable, Iterator, Sequence
+
+from models import Scan
+
+EXPORT_COLUMNS = (
+    Scan.id,
+    Scan.timestamp,
+    Scan.barcode,
+    Scan.area,
+    Scan.camera_name,
+    Scan.camera_type,
+    Scan.client_ip,
+    Scan.camera_url,
+    Scan.scan_id,
+)
+FIELDS = [column.key for column in EXPORT_COLUMNS]
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+CHUNK_ROWS = 1000
+
+
+def iter_rows(query, chunk_rows: int = CHUNK_ROWS) -> Iterator[Sequence]:
+    """Yield the export columns of every scan in ``query``, oldest first."""
+    rows = (
+        query.with_entities(*EXPORT_COLUMNS)
+        .order_by(Scan.timestamp.asc(), Scan.id.asc())
+        .yield_per(chunk_rows)
+    )
+    return iter(rows)
+
+
+def _value(value):
+    return value.isoformat() + "Z" if hasattr(value, "isoformat") else value
+
+
+def csv_chunks(rows: Iterable[Sequence], chunk_rows: int = CHUNK_ROWS) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(FIELDS)
+    for count, row in enumerate(rows, 1):
+        writer.writerow([_value(value) for value in row])
+        if count % chunk_rows == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def ndjson_chunks(rows: Iterable[Sequence], chunk_rows: int = CHUNK_ROWS) -> Iterator[bytes]:
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(FIELDS, map(_value, row)))))
+        if len(lines) == chunk_rows:
+            yield ("\n".join(lines) + "\n").encode()
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Compress ``chunks`` into one gzip stream as they arrive."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_chunks(query, fmt: str, compress: bool = False) -> Iterator[bytes]:
+    """Encode the scans in ``query`` as ``fmt`` ("csv" or "ndjson")."""
+    encode = csv_chunks if fmt == "csv" else ndjson_chunks
+    chunks = encode(iter_rows(query))
+    return gzip_chunks(chunks) if compress else chunks
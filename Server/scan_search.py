@@ -0,0 +1,148 @@
+"""Filters for the scans list, plus an optional substring search index.
+
+Text filters match in one of three modes:
+
+``contains`` (default)
+    Case-insensitive substring match, as in earlier versions. Without a
+    search index this reads every row; :func:`create_search_index` adds an
+    FTS5 trigram table on SQLite or ``pg_trgm`` indexes on PostgreSQL so it
+    does not have to.
+``prefix``
+    ``barcode >= 'OLPN12' AND barcode < 'OLPN13'``, an index range scan.
+``exact``
+    Equality, served by the ``(column, timestamp, id)`` indexes in sort order.
+
+Prefix and exact matches are case-sensitive.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from typing import Dict, Mapping, Optional
+
+from sqlalchemy import inspect, text
+
+from models import db, Scan
+
+MATCH_MODES = ("contains", "prefix", "exact")
+DEFAULT_MATCH = "contains"
+TEXT_FILTERS = {
+    "barcode": Scan.barcode,
+    "area": Scan.area,
+    "camera_name": Scan.camera_name,
+}
+FTS_TABLE = "scan_fts"
+MIN_TRIGRAM = 3  # trigram indexes cannot serve shorter substrings
+
+_SQLITE_FTS = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "barcode, area, camera_name, content='scan', content_rowid='id', tokenize='trigram')",
+    f"""CREATE TRIGGER IF NOT EXISTS scan_fts_insert AFTER INSERT ON scan BEGIN
+      INSERT INTO {FTS_TABLE}(rowid, barcode, area, camera_name)
+      VALUES (new.id, new.barcode, new.area, new.camera_name);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS scan_fts_delete AFTER DELETE ON scan BEGIN
+      INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, barcode, area, camera_name)
+      VALUES ('delete', old.id, old.barcode, old.area, old.camera_name);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS scan_fts_update AFTER UPDATE ON scan BEGIN
+      INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, barcode, area, camera_name)
+      VALUES ('delete', old.id, old.barcode, old.area, old.camera_name);
+      INSERT INTO {FTS_TABLE}(rowid, barcode, area, camera_name)
+      VALUES (new.id, new.barcode, new.area, new.camera_name);
+    END""",
+]
+
+_has_fts: Dict[str, bool] = {}  # engine URL -> whether the FTS table exists
+
+
+def create_search_index() -> None:
+    """Create the substring search index for ``contains`` filters.
+
+    On SQLite this builds an FTS5 trigram table kept in sync by triggers
+    (SQLite 3.34+); on PostgreSQL it adds ``pg_trgm`` GIN indexes, which
+    ``ILIKE`` uses directly. Building it over many rows takes a while.
+    """
+    engine = db.engine
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            exists = inspect(conn).has_table(FTS_TABLE)
+            for statement in _SQLITE_FTS:
+                conn.execute(text(statement))
+            if not exists:
+                conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        elif engine.dialect.name == "postgresql":
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            for name in TEXT_FILTERS:
+                conn.execute(
+                    text(
+                        f"CREATE INDEX IF NOT EXISTS ix_scan_{name}_trgm "
+                        f"ON scan USING gin ({name} gin_trgm_ops)"
+                    )
+                )
+    _has_fts.pop(str(engine.url), None)
+
+
+def has_fts_index() -> bool:
+    engine = db.engine
+    key = str(engine.url)
+    if key not in _has_fts:
+        _has_fts[key] = engine.dialect.name == "sqlite" and inspect(engine).has_table(FTS_TABLE)
+    return _has_fts[key]
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _prefix_end(value: str) -> str:
+    """Smallest string greater than every string starting with ``value``."""
+    return value[:-1] + chr(ord(value[-1]) + 1)
+
+
+def text_filter(name: str, value: str, match: str = DEFAULT_MATCH):
+    column = TEXT_FILTERS[name]
+    if match == "exact":
+        return column == value
+    if match == "prefix":
+        return (column >= value) & (column < _prefix_end(value))
+    # FTS5 ignores its index for LIKE with an ESCAPE clause, so values
+    # containing wildcards take the unindexed path
+    if len(value) >= MIN_TRIGRAM and not any(c in value for c in "%_") and has_fts_index():
+        fts = text(f"SELECT rowid FROM {FTS_TABLE} WHERE {name} LIKE :pattern")
+        return Scan.id.in_(fts.bindparams(pattern=f"%{value}%"))
+    return column.ilike(f"%{_escape_like(value)}%", escape="\\")
+
+
+def _parse_date(value: str) -> datetime:
+    if len(value) == 10:
+        return datetime.combine(date.fromisoformat(value), datetime.min.time())
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+
+
+def filtered_scans(args: Mapping[str, str], match: Optional[str] = None):
+    """Return ``Scan.query`` narrowed by the list page's query ``args``.
+
+    Recognises ``barcode``, ``area``, ``camera_name``, ``match``,
+    ``start_date`` and ``end_date`` (a bare ``end_date`` includes that whole
+    day). Raises ``ValueError`` for a bad match mode or date.
+    """
+    match = match or args.get("match") or DEFAULT_MATCH
+    if match not in MATCH_MODES:
+        raise ValueError(f"match must be one of {', '.join(MATCH_MODES)}")
+    q = Scan.query
+    for name in TEXT_FILTERS:
+        value = (args.get(name) or "").strip()
+        if value:
+            q = q.filter(text_filter(name, value, match))
+    start_date = args.get("start_date")
+    end_date = args.get("end_date")
+    if start_date:
+        q = q.filter(Scan.timestamp >= _parse_date(start_date))
+    if end_date:
+        end = _parse_date(end_date)
+        if len(end_date) == 10:
+            q = q.filter(Scan.timestamp < end + timedelta(days=1))
+        else:
+            q = q.filter(Scan.timestamp <= end)
+    return q
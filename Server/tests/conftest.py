@@ -0,0 +1,82 @@
+"""Fixtures for the server tests: an app on a throwaway SQLite file.
+
+Run from the ``Server`` folder with ``python -m pytest``.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # type: ignore  # noqa: E402
+
+import cache  # noqa: E402
+import load_state  # noqa: E402
+from db_config import configure_database  # noqa: E402
+from facility_routes import facility_bp  # noqa: E402
+from models import db, DestinationCode, DockDoor, OLPNLabel  # noqa: E402
+from operations_routes import operations_bp  # noqa: E402
+from routes import bp  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__, root_path=bp.root_path)
+    app.config.update(SECRET_KEY="test", TESTING=True)
+    configure_database(app, f"sqlite:///{tmp_path / 'test.db'}")
+    app.register_blueprint(bp)
+    app.register_blueprint(facility_bp)
+    app.register_blueprint(operations_bp)
+    with app.app_context():
+        db.create_all()
+    yield app
+    # the caches and load state are process-wide
+    for lru in (cache.dock_doors, cache.olpn_labels, cache.qr_images):
+        lru.clear()
+    load_state.state.invalidate()
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def dock(app):
+    """Door ``DD-01`` shipping to ``BEN``, with labels ``OLPN0``..``OLPN9``."""
+    with app.app_context():
+        code = DestinationCode(code="BEN", name="Test Carrier")  # type: ignore
+        db.session.add(code)
+        db.session.flush()
+        db.session.add(DockDoor(name="DD-01", destination_code_id=code.id))  # type: ignore
+        db.session.add_all(
+            OLPNLabel(barcode=f"OLPN{i}", destination_code_id=code.id)  # type: ignore
+            for i in range(10)
+        )
+        db.session.commit()
+        return code.id
+
+
+def make_payload(barcode: str, area: str = "DD-01", **extra) -> dict:
+    return {
+        "camera_name": "cam-1",
+        "area": area,
+        "camera_type": "usb",
+        "client_ip": "127.0.0.1",
+        "camera_url": "0",
+        "barcode": barcode,
+        **extra,
+    }
+
+
+@pytest.fixture
+def scan_payload():
+    """Build a camera's scan payload: ``scan_payload(barcode, area, **extra)``."""
+    return make_payload
@@ -0,0 +1,59 @@
+"""Live feed: fan-out of ingested scans to dashboard subscribers."""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+import broker
+
+
+@pytest.fixture
+def subscribe():
+    subs = []
+
+    def subscribe(topic=None):
+        subs.append(broker.scans.subscribe(topic))
+        return subs[-1]
+
+    yield subscribe
+    for sub in subs:
+        broker.scans.unsubscribe(sub)
+
+
+def events(sub):
+    messages = []
+    message = sub.get(timeout=0)
+    while message is not None:
+        messages.append(json.loads(message.split("data: ", 1)[1]))
+        message = sub.get(timeout=0)
+    return messages
+
+
+def test_scans_reach_their_area_and_catch_all_subscribers(client, subscribe, scan_payload):
+    door, everything, aisle = subscribe("DD-01"), subscribe(), subscribe("AISLE-3")
+    client.post(
+        "/api/scans/batch",
+        json=[scan_payload("A"), scan_payload("B", area="AISLE-3"), scan_payload("C")],
+    )
+    assert [e["barcode"] for e in events(door)] == ["A", "C"]
+    assert [e["barcode"] for e in events(everything)] == ["A", "B", "C"]
+    assert [e["barcode"] for e in events(aisle)] == ["B"]
+
+
+def test_replayed_scans_are_not_published_again(client, subscribe, scan_payload):
+    sub = subscribe()
+    client.post("/api/scan", json=scan_payload("A", scan_id="s1"))
+    client.post("/api/scan", json=scan_payload("A", scan_id="s1"))
+    assert len(events(sub)) == 1
+
+
+def test_slow_subscriber_loses_oldest_messages():
+    feed = broker.Broker(maxsize=2)
+    slow, gone = feed.subscribe("DD-01"), feed.subscribe("DD-01")
+    feed.unsubscribe(gone)
+    for barcode in "ABC":
+        feed.publish("DD-01", "scan", {"barcode": barcode})
+    assert [e["barcode"] for e in events(slow)] == ["B", "C"]
+    assert feed.stats() == {"subscribers": 1, "published": 3, "dropped": 1}
@@ -0,0 +1,39 @@
+"""Engine options chosen by configure_database."""
+
+from __future__ import annotations
+
+import pytest
+from flask import Flask  # type: ignore
+from sqlalchemy.pool import NullPool, QueuePool, StaticPool
+
+from db_config import configure_database
+from models import db, Scan
+
+
+@pytest.mark.parametrize("uri", ["sqlite://", "sqlite:///:memory:"])
+def test_in_memory_sqlite_gets_no_pool_sizing(uri):
+    app = Flask(__name__)
+    configure_database(app, uri)
+    with app.app_context():
+        assert isinstance(db.engine.pool, StaticPool)
+        db.create_all()
+        assert Scan.query.count() == 0
+        db.session.remove()
+
+
+def test_explicit_poolclass_replaces_pool_sizing(tmp_path):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {"poolclass": NullPool}
+    configure_database(app, f"sqlite:///{tmp_path / 'test.db'}")
+    with app.app_context():
+        assert isinstance(db.engine.pool, NullPool)
+
+
+def test_file_database_gets_a_sized_queue_pool(tmp_path, monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "3")
+    app = Flask(__name__)
+    configure_database(app, f"sqlite:///{tmp_path / 'test.db'}")
+    with app.app_context():
+        assert isinstance(db.engine.pool, QueuePool)
+        assert db.engine.pool.size() == 3
+        db.engine.dispose()
@@ -0,0 +1,89 @@
+"""Scan ingest: payload checks, scan_id idempotency and dock door validation."""
+
+from __future__ import annotations
+
+import cache
+from models import db, OLPNLabel, Scan
+
+
+def scan_count(app) -> int:
+    with app.app_context():
+        return Scan.query.count()
+
+
+def test_batch_rejects_null_and_empty_fields_per_index(client, app, scan_payload):
+    resp = client.post(
+        "/api/scans/batch",
+        json=[
+            scan_payload("A"),
+            scan_payload("B", area=None),
+            scan_payload(None),
+            scan_payload("C", camera_name=" "),
+            scan_payload("D", scan_id=5),
+        ],
+    )
+    assert resp.status_code == 400
+    assert [error["index"] for error in resp.get_json()["errors"]] == [1, 2, 3, 4]
+    assert scan_count(app) == 0
+
+
+def test_repeated_scan_id_is_stored_once(client, app, scan_payload):
+    first = client.post("/api/scan", json=scan_payload("A", scan_id="cam-1:1")).get_json()
+    again = client.post("/api/scan", json=scan_payload("A", scan_id="cam-1:1")).get_json()
+    assert "duplicate" not in first
+    assert again["duplicate"] is True
+    assert again["id"] == first["id"]
+    assert scan_count(app) == 1
+
+
+def test_replayed_batch_acknowledges_stored_scans(client, app, scan_payload):
+    client.post("/api/scans/batch", json=[scan_payload("A", scan_id="s1")])
+    results = client.post(
+        "/api/scans/batch",
+        json=[
+            scan_payload("A", scan_id="s1"),
+            scan_payload("B", scan_id="s2"),
+            scan_payload("B", scan_id="s2"),
+            scan_payload("C"),
+        ],
+    ).get_json()["results"]
+    assert [r.get("duplicate", False) for r in results] == [True, False, True, False]
+    assert results[1]["id"] == results[2]["id"]
+    assert scan_count(app) == 3
+
+
+def test_scans_without_scan_id_are_always_inserted(client, app, scan_payload):
+    for _ in range(2):
+        client.post("/api/scan", json=scan_payload("A"))
+    assert scan_count(app) == 2
+
+
+def test_dock_door_scan_ships_label_once(client, app, dock, scan_payload):
+    valid = client.post("/api/scan", json=scan_payload("OLPN1", scan_id="x")).get_json()
+    replay = client.post("/api/scan", json=scan_payload("OLPN1", scan_id="x")).get_json()
+    unknown = client.post("/api/scan", json=scan_payload("NOPE")).get_json()
+    elsewhere = client.post("/api/scan", json=scan_payload("OLPN2", area="AISLE-3")).get_json()
+    assert valid["valid"] is True
+    assert replay == {**valid, "duplicate": True}
+    assert unknown["valid"] is False
+    assert "valid" not in elsewhere
+    with app.app_context():
+        assert db.session.get(OLPNLabel, 2).status == "shipped"
+        assert db.session.get(OLPNLabel, 3).status == "pending"
+
+
+def test_label_edit_invalidates_cached_destination(client, app, dock, scan_payload):
+    assert client.post("/api/scan", json=scan_payload("OLPN3")).get_json()["valid"]
+    with app.app_context():
+        label = OLPNLabel.query.filter_by(barcode="OLPN3").one()
+        label.destination_code_id = dock + 1
+        db.session.commit()
+    cache.olpn_labels.invalidate("OLPN3")
+    assert client.post("/api/scan", json=scan_payload("OLPN3")).get_json()["valid"] is False
+
+
+def test_outdated_cache_put_is_dropped():
+    generation = cache.olpn_labels.generation
+    cache.olpn_labels.invalidate("OLPN4")  # a CRUD commit in between
+    cache.olpn_labels.put("OLPN4", (1, "pending"), generation)
+    assert cache.olpn_labels.get("OLPN4", None) is None
@@ -0,0 +1,107 @@
+"""Bulk OLPN label import and upsert."""
+
+from __future__ import annotations
+
+import io
+import json
+
+from label_import import import_labels
+from models import db, DestinationCode, OLPNLabel
+
+CSV = b"""Barcode,Destination,Status
+OLPN1,XYZ,
+OLPN2,BEN,shipped
+NEW1,BEN,
+NEW2,NOPE,
+NEW1,XYZ,
+,BEN,
+"""
+
+
+def labels(app) -> dict:
+    with app.app_context():
+        rows = db.session.query(OLPNLabel.barcode, DestinationCode.code, OLPNLabel.status).join(
+            OLPNLabel.destination
+        )
+        return {barcode: (code, status) for barcode, code, status in rows}
+
+
+def test_import_upserts_and_reports_bad_rows(app, client, dock, scan_payload):
+    with app.app_context():
+        db.session.add(DestinationCode(code="XYZ", name="Other"))
+        db.session.commit()
+    assert client.post("/api/scan", json=scan_payload("OLPN1")).get_json()["valid"]  # cached
+
+    resp = client.post(
+        "/facility/olpn-labels/import",
+        data={"file": (io.BytesIO(CSV), "labels.csv")},
+        content_type="multipart/form-data",
+    )
+    events = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    assert [(e["row"], e["error"]) for e in events if e["event"] == "error"] == [
+        (4, "unknown destination 'NOPE'"),
+        (5, "duplicate of row 3"),
+        (6, "barcode is required"),
+    ]
+    done = events[-1]
+    assert done["event"] == "done"
+    assert (done["rows"], done["inserted"], done["updated"], done["errors"]) == (6, 1, 2, 3)
+
+    stored = labels(app)
+    assert stored["OLPN1"] == ("XYZ", "shipped")  # no status given: keeps the scanned one
+    assert stored["OLPN2"] == ("BEN", "shipped")
+    assert stored["NEW1"] == ("BEN", "pending")
+    assert len(stored) == 11
+    # the import invalidated the cached destination of OLPN1
+    assert client.post("/api/scan", json=scan_payload("OLPN1")).get_json()["valid"] is False
+
+
+def test_import_reports_each_committed_chunk(app, dock):
+    rows = [{"barcode": f"J{i}", "destination": "BEN"} for i in range(5)]
+    with app.app_context():
+        events = list(import_labels(rows, chunk_rows=2))
+    assert [e["inserted"] for e in events if e["event"] == "progress"] == [2, 4, 5]
+    assert events[-1]["event"] == "done"
+    assert len(labels(app)) == 15
+
+
+def test_import_from_json_body_and_upload_form_summary(app, client, dock):
+    resp = client.post(
+        "/facility/olpn-labels/import",
+        json={"labels": [{"barcode": "J1", "destination": "BEN", "status": "shipped"}]},
+    )
+    assert json.loads(resp.get_data(as_text=True).splitlines()[-1])["inserted"] == 1
+
+    resp = client.post(
+        "/facility/olpn-labels/import",
+        data={
+            "file": (io.BytesIO(b"barcode,destination\nJ2,BEN\n"), "labels.csv"),
+            "summary": "1",
+        },
+        content_type="multipart/form-data",
+    )
+    assert resp.status_code == 302
+    assert labels(app)["J1"] == ("BEN", "shipped")
+    assert "J2" in labels(app)
+
+
+def test_import_reads_raw_bodies_sent_as_forms(app, client, dock):
+    # what `curl --data-binary @labels.csv` sends without -H Content-Type
+    resp = client.post(
+        "/facility/olpn-labels/import",
+        data=b"barcode,destination\nJ1,BEN\nJ2,BEN\n",
+        content_type="application/x-www-form-urlencoded",
+    )
+    assert json.loads(resp.get_data(as_text=True).splitlines()[-1])["inserted"] == 2
+    assert {"J1", "J2"} <= set(labels(app))
+
+
+def test_import_refuses_empty_uploads(client, dock):
+    assert client.post("/facility/olpn-labels/import", data=b"").status_code == 400
+    resp = client.post(
+        "/facility/olpn-labels/import",
+        data={"summary": "1"},
+        content_type="multipart/form-data",
+    )
+    assert resp.status_code == 400
+    assert "file" in resp.get_json()["error"]
@@ -0,0 +1,109 @@
+"""OLPN label PDFs: label selection, limits and the QR image cache."""
+
+from __future__ import annotations
+
+import re
+
+import cache
+import facility_routes
+import labels_pdf
+from models import db, DestinationCode, OLPNLabel
+
+
+def page_count(pdf: bytes) -> int:
+    return len(re.findall(rb"/Type /Page\b", pdf))
+
+
+def printed(monkeypatch) -> list:
+    """Record the barcode of every label drawn, in page order."""
+    barcodes = []
+    draw = labels_pdf.draw_label
+
+    def record(c, label, image):
+        barcodes.append(label.barcode)
+        draw(c, label, image)
+
+    monkeypatch.setattr(labels_pdf, "draw_label", record)
+    return barcodes
+
+
+def test_batch_pdf_selects_by_ids_and_filters_in_barcode_order(app, client, dock, monkeypatch):
+    with app.app_context():
+        code = DestinationCode(code="XYZ", name="Other")  # type: ignore
+        db.session.add(code)
+        db.session.flush()
+        db.session.add_all(
+            OLPNLabel(barcode=barcode, destination_code_id=code.id, status=status)  # type: ignore
+            for barcode, status in [("X2", "shipped"), ("X1", "pending"), ("X3", "shipped")]
+        )
+        db.session.commit()
+    barcodes = printed(monkeypatch)
+
+    resp = client.get("/facility/olpn-labels/pdf?ids=3,1,2")
+    assert resp.status_code == 200
+    assert resp.mimetype == "application/pdf"
+    assert page_count(resp.data) == 3
+    assert barcodes == ["OLPN0", "OLPN1", "OLPN2"]
+
+    barcodes.clear()
+    resp = client.get("/facility/olpn-labels/pdf?destination=XYZ&status=shipped")
+    assert page_count(resp.data) == 2
+    assert barcodes == ["X2", "X3"]
+    assert "labels_XYZ_" in resp.headers["Content-Disposition"]
+
+
+def test_batch_pdf_limits(client, dock, monkeypatch):
+    assert client.get("/facility/olpn-labels/pdf?ids=1,x").status_code == 400
+    assert client.get("/facility/olpn-labels/pdf?destination=NOPE").status_code == 404
+    assert client.get("/facility/olpn-labels/pdf?ids=999").status_code == 404
+    monkeypatch.setattr(facility_routes, "MAX_PDF_LABELS", 9)
+    assert client.get("/facility/olpn-labels/pdf").status_code == 413
+    assert client.get("/facility/olpn-labels/pdf?ids=1,2,3").status_code == 200
+
+
+def test_qr_images_are_cached_between_renders(client, dock):
+    def qr_stats():  # the counters are process-wide, so compare against a start
+        stats = client.get("/api/cache/stats").get_json()["qr_images"]
+        return stats["hits"], stats["misses"], stats["entries"]
+
+    hits, misses, _entries = qr_stats()
+    first = client.get("/facility/olpn-labels/pdf?destination=BEN").data
+    assert qr_stats() == (hits, misses + 10, 10)
+    second = client.get("/facility/olpn-labels/pdf?destination=BEN").data
+    assert qr_stats() == (hits + 10, misses + 10, 10)
+    assert page_count(first) == page_count(second) == 10
+
+
+def test_qr_image_cache_is_bounded_by_bytes(monkeypatch):
+    size = len(labels_pdf.render_qr("OLPN0"))
+    images = cache.LRUCache(maxsize=3 * size, sizeof=len)
+    monkeypatch.setattr(cache, "qr_images", images)
+    labels_pdf.qr_images([f"OLPN{i}" for i in range(6)], workers=0)
+    assert images.size <= images.maxsize
+    assert images.stats()["entries"] < 6
+    assert images.evictions > 0
+    assert images.get("OLPN5", None) is not None  # the most recent ones stay
+
+
+def test_single_label_pdf(client, dock):
+    resp = client.get("/facility/olpn-labels/1/pdf")
+    assert resp.status_code == 200
+    assert "label_OLPN0.pdf" in resp.headers["Content-Disposition"]
+    assert page_count(resp.data) == 1
+    assert client.get("/facility/olpn-labels/999/pdf").status_code == 404
+
+
+def test_render_pool_follows_the_worker_count():
+    try:
+        images = labels_pdf.qr_images(["P1", "P2"], workers=1)
+        first = labels_pdf._pool
+        assert labels_pdf.qr_images(["P1", "P2"], workers=1) == images  # cached
+        labels_pdf.qr_images(["P3", "P4"], workers=1)
+        assert labels_pdf._pool is first
+        labels_pdf.qr_images(["P5", "P6"], workers=2)
+        assert labels_pdf._pool is not first
+        assert labels_pdf._pool._max_workers == 2
+        assert images["P1"] == labels_pdf.render_qr("P1")
+    finally:
+        labels_pdf._shutdown_pool()
+        cache.qr_images.clear()
@@ -0,0 +1,95 @@
+"""Loading dashboard state kept current by ingest and the label routes."""
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import load_state
+from models import OLPNLabel
+
+
+def door_state(client) -> dict:
+    return client.get("/ops/load-state?door=DD-01").get_json()["doors"][0]
+
+
+def test_changes_are_applied_without_a_rebuild(client, dock, scan_payload):
+    assert door_state(client)["expected"] == 10
+    rebuilds = load_state.state.rebuilds
+    for barcode in ("OLPN1", "OLPN2", "OLPN1"):
+        client.post("/api/scan", json=scan_payload(barcode))
+    client.post("/facility/olpn-labels", data={"barcode": "NEW", "destination_code_id": dock})
+    client.post(
+        "/facility/olpn-labels/4/edit",
+        data={"barcode": "OLPN3", "destination_code_id": dock, "status": "shipped"},
+    )
+    client.post("/facility/olpn-labels/10/delete")
+
+    state = door_state(client)
+    assert load_state.state.rebuilds == rebuilds
+    assert (state["expected"], state["shipped"], state["remaining"]) == (10, 3, 7)
+    assert [scan["barcode"] for scan in state["recent_scans"]] == ["OLPN1", "OLPN2", "OLPN1"]
+    assert [scan["valid"] for scan in state["recent_scans"]] == [True, True, True]
+
+    load_state.state.invalidate()  # a rebuild from the database finds the same
+    rebuilt = door_state(client)
+    for scan in state["recent_scans"]:
+        scan["valid"] = None  # only known to the live updates
+    assert rebuilt == state
+
+
+def test_label_changes_during_ingest_do_not_stall(app, client, dock, scan_payload):
+    door_state(client)  # build the state so every change goes through updating()
+    stop = threading.Event()
+    failures: list = []
+
+    def ingest() -> None:
+        ingest_client = app.test_client()
+        n = 0
+        while not stop.is_set():
+            batch = [scan_payload(f"OLPN{n % 10}", scan_id=f"s{n}-{i}") for i in range(20)]
+            if ingest_client.post("/api/scans/batch", json=batch).status_code != 200:
+                failures.append("ingest")
+            n += 1
+
+    def edit_labels(worker: int) -> None:
+        labels_client = app.test_client()
+        for i in range(10):
+            barcode = f"NEW{worker}-{i}"
+            resp = labels_client.post(
+                "/facility/olpn-labels", data={"barcode": barcode, "destination_code_id": dock}
+            )
+            if resp.status_code != 302:
+                failures.append(barcode)
+        with app.app_context():
+            ids = [
+                label.id
+                for label in OLPNLabel.query.filter(OLPNLabel.barcode.like(f"NEW{worker}-%"))
+            ]
+        for label_id in ids[:5]:
+            labels_client.post(
+                f"/facility/olpn-labels/{label_id}/edit",
+                data={
+                    "barcode": f"EDIT{label_id}",
+                    "destination_code_id": dock,
+                    "status": "shipped",
+                },
+            )
+        for label_id in ids[5:]:
+            labels_client.post(f"/facility/olpn-labels/{label_id}/delete")
+
+    ingester = threading.Thread(target=ingest)
+    ingester.start()
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(3) as pool:
+            list(pool.map(edit_labels, range(3)))
+    finally:
+        stop.set()
+        ingester.join()
+    assert failures == []
+    assert time.perf_counter() - start < 3  # well under the 5 s busy_timeout
+
+    state = door_state(client)
+    assert (state["expected"], state["shipped"]) == (25, 10 + 15)
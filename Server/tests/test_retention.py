@@ -0,0 +1,63 @@
+"""Scan retention: rollups, archives and deletion of old scans."""
+
+from __future__ import annotations
+
+import gzip
+import json
+from datetime import datetime
+
+from models import db, Scan, ScanRollup
+from retention import run_retention
+
+NOW = datetime(2024, 6, 1, 12, 30)
+
+
+def add_scans(app, scan_payload, *stamps) -> None:
+    with app.app_context():
+        db.session.add_all(
+            Scan(timestamp=datetime(2024, *stamp), **scan_payload(barcode))
+            for barcode, stamp in stamps
+        )
+        db.session.commit()
+
+
+def test_old_scans_are_rolled_up_archived_and_deleted(app, scan_payload, tmp_path):
+    add_scans(
+        app,
+        scan_payload,
+        ("A", (4, 1, 8, 5)),
+        ("A", (4, 1, 8, 50)),
+        ("B", (4, 1, 8, 20)),
+        ("A", (4, 2, 9, 0)),
+        ("A", (5, 2, 12, 10)),  # less than 30 days old at NOW
+    )
+    with app.app_context():
+        stats = run_retention(days=30, directory=str(tmp_path), batch=2, pause=0, now=NOW)
+        rollups = {
+            (r.hour, r.barcode): (r.scans, r.first_seen.minute, r.last_seen.minute)
+            for r in ScanRollup.query
+        }
+        left = [scan.barcode for scan in Scan.query]
+    assert stats == {"deleted": 4, "rollups": 4, "batches": 2}  # (A, 8:00) in both batches
+    assert rollups == {
+        (datetime(2024, 4, 1, 8), "A"): (2, 5, 50),
+        (datetime(2024, 4, 1, 8), "B"): (1, 20, 20),
+        (datetime(2024, 4, 2, 9), "A"): (1, 0, 0),
+    }
+    assert left == ["A"]
+
+    with gzip.open(tmp_path / "scans-2024-04-01.ndjson.gz", "rt") as archive:
+        assert [json.loads(line)["barcode"] for line in archive] == ["A", "B", "A"]
+    assert (tmp_path / "scans-2024-04-02.ndjson.gz").exists()
+
+
+def test_later_runs_add_to_existing_rollups(app, scan_payload):
+    add_scans(app, scan_payload, ("A", (4, 1, 8, 30)))
+    with app.app_context():
+        run_retention(days=30, pause=0, now=NOW)
+    add_scans(app, scan_payload, ("A", (4, 1, 8, 10)), ("A", (4, 1, 8, 40)))
+    with app.app_context():
+        assert run_retention(days=30, pause=0, now=NOW)["deleted"] == 2
+        rollup = ScanRollup.query.one()
+        assert (rollup.scans, rollup.first_seen.minute, rollup.last_seen.minute) == (3, 10, 40)
+        assert run_retention(days=30, pause=0, now=NOW)["deleted"] == 0
@@ -0,0 +1,83 @@
+"""Group commit: per-job fallback and the 503 answers of the ingest routes."""
+
+from __future__ import annotations
+
+import sqlite3
+from concurrent.futures import Future
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+import routes
+from ingest import scan_from_payload
+from models import Scan
+from writer import ScanWriter
+
+
+def test_failing_job_only_fails_its_own_request(app, scan_payload):
+    writer = ScanWriter(app)
+    bad = scan_from_payload(scan_payload("B"))
+    bad.camera_name = None  # NOT NULL violation inside the group
+    group = [
+        ([scan_from_payload(scan_payload("A"))], Future()),
+        ([bad], Future()),
+        ([scan_from_payload(scan_payload("C"))], Future()),
+    ]
+    with app.app_context():
+        writer._commit(group)
+        stored = sorted(barcode for (barcode,) in Scan.query.with_entities(Scan.barcode))
+    assert writer.fallbacks == 1
+    assert group[0][1].result(0)[0].id
+    assert group[1][1].exception(0) is not None
+    assert group[2][1].result(0)[0].id
+    assert stored == ["A", "C"]
+
+
+def test_cancelled_job_is_skipped(app, scan_payload):
+    writer = ScanWriter(app)
+    future: Future = Future()
+    future.cancel()
+    with app.app_context():
+        writer._commit([([scan_from_payload(scan_payload("A"))], future)])
+        assert Scan.query.count() == 0
+
+
+@pytest.fixture
+def stalled_writer(app, monkeypatch):
+    """A writer that accepts one job and never runs it."""
+    writer = ScanWriter(app, max_jobs=1)
+    monkeypatch.setattr(ScanWriter, "running", property(lambda self: True))
+    monkeypatch.setattr(routes, "WRITER_TIMEOUT", 0.05)
+    app.extensions["scan_writer"] = writer
+    return writer
+
+
+def test_writer_timeout_answers_503_and_cancels(client, stalled_writer, scan_payload):
+    resp = client.post("/api/scan", json=scan_payload("A"))
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"]
+    _scans, future = stalled_writer._queue.get_nowait()
+    assert future.cancelled()
+
+
+def test_full_writer_queue_answers_503(client, app, stalled_writer, scan_payload):
+    stalled_writer.submit([])
+    resp = client.post("/api/scans/batch", json=[scan_payload("A")])
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"]
+    with app.app_context():
+        assert Scan.query.count() == 0  # no fallback commit in the request thread
+
+
+@pytest.mark.parametrize(
+    "error, status", [("database is locked", 503), ("no such table: scans", 500)]
+)
+def test_only_lock_timeouts_answer_503(app, client, monkeypatch, scan_payload, error, status):
+    def fail(scans):
+        raise OperationalError("INSERT", {}, sqlite3.OperationalError(error))
+
+    monkeypatch.setattr(routes, "ingest_scans", fail)
+    app.config["PROPAGATE_EXCEPTIONS"] = False
+    resp = client.post("/api/scan", json=scan_payload("A"))
+    assert resp.status_code == status
+    assert ("Retry-After" in resp.headers) == (status == 503)
@@ -0,0 +1,144 @@
+"""Single writer thread that group-commits scans from concurrent requests.
+
+SQLite has one writer at a time, so request threads that each commit a
+scan mostly wait on the write lock. With the writer enabled, requests hand
+their scans to one thread that stores everything queued within a few
+milliseconds in a single transaction and hands each request its results.
+"""
+
+from __future__ import annotations
+
+import atexit
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Tuple
+
+from flask import Flask  # type: ignore
+
+from ingest import IngestResult, ingest_scans
+from models import db, Scan
+
+Job = Tuple[List[Scan], "Future[List[IngestResult]]"]
+
+
+class ScanWriter:
+    """Store submitted scans in group commits of up to ``max_rows`` rows.
+
+    A group is closed ``max_delay`` seconds after its first job arrived or
+    once it holds ``max_rows`` scans. If a group fails, its jobs are retried
+    one transaction each, so a bad batch only fails its own request.
+    """
+
+    def __init__(
+        self, app: Flask, max_delay: float = 0.005, max_rows: int = 500, max_jobs: int = 10_000
+    ) -> None:
+        self.app = app
+        self.max_delay = max_delay
+        self.max_rows = max_rows
+        self.groups = 0
+        self.rows = 0
+        self.fallbacks = 0
+        self._queue: "queue.Queue[Job]" = queue.Queue(maxsize=max_jobs)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="scan-writer", daemon=True)
+
+    def start(self) -> "ScanWriter":
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Store what is queued and stop."""
+        self._stop.set()
+        self._thread.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive() and not self._stop.is_set()
+
+    def submit(self, scans: List[Scan]) -> "Future[List[IngestResult]]":
+        """Queue ``scans``; raises ``queue.Full`` if the writer is saturated.
+
+        Cancelling the future before the writer picks the job up drops it.
+        """
+        future: "Future[List[IngestResult]]" = Future()
+        self._queue.put_nowait((scans, future))
+        return future
+
+    def stats(self) -> dict:
+        return {
+            "groups": self.groups,
+            "rows": self.rows,
+            "mean_group_rows": self.rows / self.groups if self.groups else 0.0,
+            "fallbacks": self.fallbacks,
+            "queued": self._queue.qsize(),
+        }
+
+    def _next_group(self) -> List[Job]:
+        try:
+            group = [self._queue.get(timeout=0.2)]
+        except queue.Empty:
+            return []
+        rows = len(group[0][0])
+        deadline = time.monotonic() + self.max_delay
+        while rows < self.max_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                job = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            group.append(job)
+            rows += len(job[0])
+        return group
+
+    def _run(self) -> None:
+        with self.app.app_context():
+            while not (self._stop.is_set() and self._queue.empty()):
+                group = self._next_group()
+                if group:
+                    self._commit(group)
+                    db.session.close()
+
+    def _commit(self, group: List[Job]) -> None:
+        # requests that gave up waiting cancel their future; skip those
+        group = [job for job in group if job[1].set_running_or_notify_cancel()]
+        if not group:
+            return
+        scans = [scan for job_scans, _ in group for scan in job_scans]
+        try:
+            results = ingest_scans(scans)
+        except Exception:
+            db.session.rollback()
+            self.fallbacks += 1
+            for job_scans, future in group:
+                try:
+                    future.set_result(ingest_scans(job_scans))
+                except Exception as exc:
+                    db.session.rollback()
+                    future.set_exception(exc)
+            return
+        self.groups += 1
+        self.rows += len(scans)
+        start = 0
+        for job_scans, future in group:
+            future.set_result(results[start : start + len(job_scans)])
+            start += len(job_scans)
+
+
+def init_scan_writer(app: Flask) -> ScanWriter:
+    """Start a writer for ``app``; the ingest routes use it from then on.
+
+    Tuned by ``$SCAN_WRITER_MAX_DELAY_MS`` and ``$SCAN_WRITER_MAX_ROWS``.
+    """
+    writer = ScanWriter(
+        app,
+        max_delay=float(os.getenv("SCAN_WRITER_MAX_DELAY_MS", 5)) / 1000,
+        max_rows=int(os.getenv("SCAN_WRITER_MAX_ROWS", 500)),
+    ).start()
+    app.extensions["scan_writer"] = writer
+    atexit.register(writer.stop)
+    return writer
@@ -0,0 +1,53 @@
+"""Images/second of the YOLO service at several batch sizes (CPU by default)."""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+from common import detector_args, synthetic_frames
+
+import yolo_service
+
+
+def bench(service: yolo_service.YOLOService, frames: list, count: int) -> float:
+    # the submitting threads in the client are decode threads; here all
+    # images are queued at once so every batch fills up to max_batch
+    start = time.perf_counter()
+    futures = [service.submit(frames[i % len(frames)]) for i in range(count)]
+    for future in futures:
+        future.result(timeout=300)
+    return count / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model-path", default=detector_args().model_path)
+    parser.add_argument("--batches", default="1,2,4,8,16", help="Comma separated batch sizes")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--images", type=int, default=64, help="Images per batch size")
+    args = parser.parse_args()
+
+    if yolo_service.YOLO is None:
+        sys.exit("ultralytics is not installed; pip install ultralytics to run this benchmark")
+    if not os.path.exists(args.model_path):
+        sys.exit(f"YOLO model file '{args.model_path}' not found")
+
+    frames = synthetic_frames(8)
+    model = yolo_service.YOLO(args.model_path)
+    model(frames[:1], imgsz=args.imgsz, verbose=False)  # warm up
+    print(f"imgsz {args.imgsz}, {args.images} images of {frames[0].shape[1]}x{frames[0].shape[0]}")
+    print(f"{'batch':>6}{'images/s':>12}{'ms/image':>12}")
+    for size in (int(b) for b in args.batches.split(",")):
+        service = yolo_service.YOLOService(
+            args.model_path, max_batch=size, imgsz=args.imgsz, model=model
+        ).start()
+        rate = bench(service, frames, args.images)
+        service.stop()
+        print(f"{size:>6}{rate:>12.1f}{1000 / rate:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
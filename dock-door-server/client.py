@@ -4,49 +4,27 @@
 from __future__ import annotations
 
 import argparse
+import logging
 import os
 from typing import Dict
 
-import cv2
-
 import utils
+from decoders import DEFAULT_CASCADE
 from stream import run_stream
 
+PROMPTED_KEYS = (
+    "Camera Name",
+    "Camera Area",
+    "Camera Type",
+    "Server IP",
+    "Port",
+    "Client IP",
+    "Camera URL",
+)
 
-def main() -> None:
-    """Start the webcam stream and scan for barcodes or QR codes."""
-    parser = argparse.ArgumentParser(
-        description="Start the webcam stream and scan for barcodes or QR codes."
-    )
-    parser.add_argument(
-        "--model-path",
-        default=os.getenv("YOLO_MODEL_PATH", "barcode_yolo.pt"),
-        help="Path to the YOLO model for barcode detection",
-    )
-    parser.add_argument(
-        "--wechat-det-prototxt",
-        default=os.getenv("WECHAT_DET_PROTOTXT", "detect.prototxt"),
-        help="Path to WeChat QRCode detection prototxt file",
-    )
-    parser.add_argument(
-        "--wechat-det-model",
-        default=os.getenv("WECHAT_DET_MODEL", "detect.caffemodel"),
-        help="Path to WeChat QRCode detection model file",
-    )
-    parser.add_argument(
-        "--wechat-sr-prototxt",
-        default=os.getenv("WECHAT_SR_PROTOTXT", "sr.prototxt"),
-        help="Path to WeChat QRCode super resolution prototxt file",
-    )
-    parser.add_argument(
-        "--wechat-sr-model",
-        default=os.getenv("WECHAT_SR_MODEL", "sr.caffemodel"),
-        help="Path to WeChat QRCode super resolution model file",
-    )
-
-    args = parser.parse_args()
 
-    info_path = os.path.join(os.path.dirname(__file__), "camera_info.txt")
+def prompt_camera_info(info_path: str) -> None:
+    """Ask for the camera settings, defaulting to those in ``info_path``."""
     prev_info = utils.parse_camera_info(info_path)
 
     camera_name = input(
@@ -77,10 +55,174 @@ def main() -> None:
         f.write(f"Port: {port}\n")
         f.write(f"Client IP: {client_ip}\n")
         f.write(f"Camera URL: {camera_url_input}\n")
+        for key, value in prev_info.items():
+            if key not in PROMPTED_KEYS:
+                f.write(f"{key}: {value}\n")
 
     print(f"Camera info saved to {info_path}")
 
+
+def add_stream_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the decoding, delivery and reporting options shared with ``supervisor.py``."""
+    parser.add_argument(
+        "--model-path",
+        default=os.getenv("YOLO_MODEL_PATH", "barcode_yolo.pt"),
+        help="Path to the YOLO model for barcode detection",
+    )
+    parser.add_argument(
+        "--yolo-batch",
+        type=int,
+        default=int(os.getenv("YOLO_BATCH", "0")),
+        help="Maximum frames per YOLO forward pass (0 = one per decode thread)",
+    )
+    parser.add_argument(
+        "--yolo-max-wait-ms",
+        type=float,
+        default=float(os.getenv("YOLO_MAX_WAIT_MS", "10")),
+        help="How long a YOLO batch waits for more frames before running",
+    )
+    parser.add_argument(
+        "--yolo-imgsz",
+        type=int,
+        default=int(os.getenv("YOLO_IMGSZ", "640")),
+        help="YOLO input size in pixels; smaller is faster on CPU",
+    )
+    parser.add_argument(
+        "--wechat-det-prototxt",
+        default=os.getenv("WECHAT_DET_PROTOTXT", "detect.prototxt"),
+        help="Path to WeChat QRCode detection prototxt file",
+    )
+    parser.add_argument(
+        "--wechat-det-model",
+        default=os.getenv("WECHAT_DET_MODEL", "detect.caffemodel"),
+        help="Path to WeChat QRCode detection model file",
+    )
+    parser.add_argument(
+        "--wechat-sr-prototxt",
+        default=os.getenv("WECHAT_SR_PROTOTXT", "sr.prototxt"),
+        help="Path to WeChat QRCode super resolution prototxt file",
+    )
+    parser.add_argument(
+        "--wechat-sr-model",
+        default=os.getenv("WECHAT_SR_MODEL", "sr.caffemodel"),
+        help="Path to WeChat QRCode super resolution model file",
+    )
+    parser.add_argument(
+        "--spool-path",
+        default=os.getenv(
+            "SCAN_SPOOL_PATH", os.path.join(os.path.dirname(__file__), "scan_spool.db")
+        ),
+        help="SQLite file holding scans that could not be sent to the server",
+    )
+    parser.add_argument(
+        "--spool-max-mb",
+        type=float,
+        default=float(os.getenv("SCAN_SPOOL_MAX_MB", "50")),
+        help="Maximum size of spooled scans before the oldest are evicted",
+    )
+    parser.add_argument(
+        "--decode-threads",
+        type=int,
+        default=int(os.getenv("DECODE_THREADS", "0")),
+        help="Number of decoding threads, each with its own detectors "
+        "(0 = one per CPU core, at most one per camera)",
+    )
+    parser.add_argument(
+        "--decode-workers",
+        type=int,
+        default=int(os.getenv("DECODE_WORKERS", "0")),
+        help="Decode in this many worker processes via shared memory (0 = in-process threads)",
+    )
+    parser.add_argument(
+        "--motion-threshold",
+        type=float,
+        default=float(os.getenv("MOTION_THRESHOLD", "0.5")),
+        help="Percent of changed pixels needed to decode a frame; 0 decodes every frame",
+    )
+    parser.add_argument(
+        "--force-decode-interval",
+        type=float,
+        default=float(os.getenv("FORCE_DECODE_INTERVAL", "2")),
+        help="Decode at least this often (seconds) even when nothing moves",
+    )
+    parser.add_argument(
+        "--roi-full-scan-every",
+        type=int,
+        default=int(os.getenv("ROI_FULL_SCAN_EVERY", "10")),
+        help="Decode only around recent barcodes, scanning the full frame every N frames (<=1 disables)",
+    )
+    parser.add_argument(
+        "--roi-ttl",
+        type=float,
+        default=float(os.getenv("ROI_TTL", "1.0")),
+        help="Seconds a barcode location stays tracked after it was last seen",
+    )
+    parser.add_argument(
+        "--decoders",
+        default=os.getenv("DECODERS"),
+        help=(
+            "Comma separated decoder cascade, e.g. 'qr,wechat' "
+            f"(default: camera_info 'Decoders' or {DEFAULT_CASCADE})"
+        ),
+    )
+    parser.add_argument(
+        "--adaptive-decoders",
+        action="store_true",
+        default=os.getenv("ADAPTIVE_DECODERS", "") == "1",
+        help="Reorder the cascade by observed hits per millisecond",
+    )
+    parser.add_argument(
+        "--dedup-window",
+        type=float,
+        default=float(os.getenv("DEDUP_WINDOW", "2")),
+        help="Seconds a code is not re-sent (overridden by 'Dedup Window' in the camera settings)",
+    )
+    parser.add_argument(
+        "--dedup-idle",
+        type=float,
+        default=float(os.getenv("DEDUP_IDLE", "300")),
+        help=(
+            "Session dedup (dock doors): idle seconds that end a trailer session "
+            "(overridden by 'Dedup Idle')"
+        ),
+    )
+    parser.add_argument(
+        "--stats-interval",
+        type=float,
+        default=float(os.getenv("STATS_INTERVAL", "30")),
+        help="Seconds between pipeline FPS/latency reports (0 disables them)",
+    )
+
+
+def main() -> None:
+    """Start the webcam stream and scan for barcodes or QR codes."""
+    parser = argparse.ArgumentParser(
+        description="Start the webcam stream and scan for barcodes or QR codes."
+    )
+    add_stream_arguments(parser)
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        default=os.getenv("HEADLESS", "") == "1",
+        help=(
+            "Run as a service: no prompts (uses camera_info.txt), no window, "
+            "stop with SIGINT/SIGTERM and report status through logs"
+        ),
+    )
+
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    info_path = os.path.join(os.path.dirname(__file__), "camera_info.txt")
+    if not args.headless:
+        prompt_camera_info(info_path)
+
     camera_info = utils.parse_camera_info(info_path)
+    args.decoders = args.decoders or camera_info.get("Decoders") or DEFAULT_CASCADE
+    if utils.is_enabled(camera_info.get("Adaptive Decoders", "")):
+        args.adaptive_decoders = True
 
     utils.ensure_wechat_models(
         args.wechat_det_prototxt,
@@ -89,15 +231,11 @@ def main() -> None:
         args.wechat_sr_model,
     )
     camera_url = camera_info.get("Camera URL", "0")
-    cam_source = int(camera_url) if camera_url.isdigit() else camera_url
-    cap = cv2.VideoCapture(cam_source)
-    if not cap.isOpened():
+    cap = utils.open_capture(camera_url)
+    if cap is None:
         print(f"Cannot open camera {camera_url}")
         return
 
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 1080)
-
     run_stream(cap, camera_info, args)
 
 
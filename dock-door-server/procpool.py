@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""Multi-process decoding with frames passed through shared memory."""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing as mp
+import queue
+import threading
+import time
+from collections import deque
+from multiprocessing import shared_memory
+from multiprocessing.connection import Connection, wait
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from decoders import CascadeStats
+from pipeline import DropOldestQueue, Frame, FrameResult, StageStats
+
+log = logging.getLogger(__name__)
+
+
+def _worker_main(args: Any, tasks: "mp.Queue", results: Connection) -> None:
+    """Decode frames announced on ``tasks`` with this process's own detectors."""
+    from stream import FrameDecoder
+
+    decode = FrameDecoder(args)
+    shm = None
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        job, slot, name, shape, dtype, source = task
+        if shm is None or shm.name != name:
+            # the slot was grown for a larger frame: drop the old mapping.
+            # Spawned workers share the parent's resource tracker, so attaching
+            # here does not make the segment outlive its owner
+            if shm is not None:
+                shm.close()
+            shm = shared_memory.SharedMemory(name=name)
+        image = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        start = time.monotonic()
+        try:
+            detections = decode(image, source)
+        except Exception as exc:  # pragma: no cover - runtime issues
+            log.warning("Decoder worker failed on frame %d: %s", job, exc)
+            detections = []
+        del image
+        results.send((job, slot, detections, decode.pop_timings(), time.monotonic() - start))
+    if shm is not None:
+        shm.close()
+
+
+class ProcessDecodePool:
+    """Drop-in replacement for :class:`pipeline.DecodePool` using processes.
+
+    Each worker owns one shared memory slot; a frame is copied once into
+    the slot of an idle worker and only the slot number and the frame's
+    shape travel through that worker's task queue. Slots grow to the
+    largest frame seen, so cameras of different resolutions share the pool. Results come back over the worker's own pipe
+    and are emitted in dispatch order, which is frame order for each camera.
+
+    A worker that dies, or spends more than ``job_timeout`` seconds on one
+    frame, is replaced; its frame is skipped (counted in ``lost``) so the
+    frames after it are not held back.
+    """
+
+    def __init__(
+        self,
+        args: Any,
+        source: Any,
+        output: DropOldestQueue,
+        workers: int,
+        job_timeout: float = 30.0,
+    ) -> None:
+        self.args = args
+        self.source = source
+        self.output = output
+        self.workers = workers
+        self.job_timeout = job_timeout
+        self.stats = StageStats("decode")
+        self.decoder_stats = CascadeStats()
+        self.restarts = 0
+        self.lost = 0
+        self._ctx = mp.get_context("spawn")
+        self._tasks: List[Any] = [None] * workers
+        self._results: List[Any] = [None] * workers
+        self._procs: List[Any] = [None] * workers
+        self._slots: List[Optional[shared_memory.SharedMemory]] = [None] * workers
+        self._slot_size = 0
+        self._free: "queue.Queue[int]" = queue.Queue()
+        self._running: Dict[int, Tuple[int, float]] = {}  # slot -> (job, started)
+        self._jobs = 0
+        self._pending: Dict[int, Frame] = {}  # job -> frame, without the image
+        self._order: Deque[int] = deque()
+        self._done: Dict[int, Optional[FrameResult]] = {}  # None: frame was lost
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = [
+            threading.Thread(target=self._dispatch, name="decode-dispatch", daemon=True),
+            threading.Thread(target=self._collect, name="decode-collect", daemon=True),
+        ]
+
+    def _start_worker(self, slot: int) -> None:
+        """Start the worker of ``slot`` with a new task queue and result pipe.
+
+        Workers share no queue or lock: one that dies mid-write could leave
+        a shared one locked for every other worker.
+        """
+        self._tasks[slot] = self._ctx.Queue()
+        reader, writer = self._ctx.Pipe(duplex=False)
+        proc = self._ctx.Process(
+            target=_worker_main,
+            args=(self.args, self._tasks[slot], writer),
+            name=f"decoder-{slot}",
+            daemon=True,
+        )
+        proc.start()
+        writer.close()  # the worker holds the only write end, so its exit reads as EOF
+        self._procs[slot] = proc
+        self._results[slot] = reader
+
+    def start(self) -> "ProcessDecodePool":
+        for slot in range(self.workers):
+            self._start_worker(slot)
+            self._free.put(slot)
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        for tasks in self._tasks:
+            tasks.put(None)
+        for proc in self._procs:
+            proc.join(5.0)
+            if proc.is_alive():
+                proc.terminate()
+        for thread in self._threads:
+            thread.join(2.0)
+        for reader in self._results:
+            reader.close()
+        for slot, shm in enumerate(self._slots):
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+            self._slots[slot] = None
+
+    def _segment(self, slot: int, nbytes: int) -> shared_memory.SharedMemory:
+        """Return the shared memory of ``slot``, grown to hold ``nbytes``.
+
+        Only called for a free slot, so no worker is reading the old segment.
+        A grown slot takes the largest size seen, so it is not regrown for
+        every camera that sends larger frames.
+        """
+        shm = self._slots[slot]
+        if shm is None or shm.size < nbytes:
+            self._slot_size = max(self._slot_size, nbytes)
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+            shm = shared_memory.SharedMemory(create=True, size=self._slot_size)
+            self._slots[slot] = shm
+        return shm
+
+    def _dispatch(self) -> None:
+        while not self._stop.is_set():
+            frame = self.source.get(timeout=0.2)
+            if frame is None:
+                continue
+            image = frame.image
+            while not self._stop.is_set():
+                try:
+                    slot = self._free.get(timeout=0.2)
+                    break
+                except queue.Empty:
+                    continue
+            else:
+                return
+            shm = self._segment(slot, image.nbytes)
+            view = np.ndarray(image.shape, dtype=image.dtype, buffer=shm.buf)
+            np.copyto(view, image)
+            del view  # a segment cannot be closed while views of it exist
+            with self._lock:
+                self._jobs += 1
+                job = self._jobs
+                self._pending[job] = frame._replace(image=None)
+                self._order.append(job)
+                self._running[slot] = (job, time.monotonic())
+                # under the lock, so a restart cannot swap the queue meanwhile
+                self._tasks[slot].put(
+                    (job, slot, shm.name, image.shape, image.dtype.str, frame.source)
+                )
+
+    def _collect(self) -> None:
+        while not self._stop.is_set():
+            with self._lock:
+                readers = list(self._results)
+            for reader in wait(readers, timeout=min(1.0, self.job_timeout)):
+                try:
+                    item = reader.recv()
+                except (EOFError, OSError):  # the worker died; replaced below
+                    self._procs[readers.index(reader)].join(1.0)
+                    continue
+                self._finish(*item)
+            if not self._stop.is_set():
+                self._replace_failed_workers()
+
+    def _finish(
+        self, job: int, slot: int, detections: List[Any], timings: List[Any], elapsed: float
+    ) -> None:
+        with self._lock:
+            if self._running.get(slot, (None,))[0] != job:
+                return  # late result of a frame already given up on
+            del self._running[slot]
+            self._free.put(slot)
+            frame = self._pending.pop(job)
+            self._done[job] = FrameResult(
+                frame.seq, frame.captured_at, time.time(), detections, frame.source
+            )
+            ready = self._pop_ready()
+        self.stats.record(elapsed)
+        self.decoder_stats.record(timings)
+        for result in ready:
+            self.output.put(result)
+
+    def _pop_ready(self) -> List[FrameResult]:
+        """Take finished results off the front of the dispatch order."""
+        ready = []
+        while self._order and self._order[0] in self._done:
+            result = self._done.pop(self._order.popleft())
+            if result is not None:
+                ready.append(result)
+        return ready
+
+    def _replace_failed_workers(self) -> None:
+        """Restart dead or stuck workers and skip the frame each one held."""
+        now = time.monotonic()
+        ready: List[FrameResult] = []
+        with self._lock:
+            for slot, proc in enumerate(self._procs):
+                job, started = self._running.get(slot, (None, now))
+                stuck = job is not None and now - started > self.job_timeout
+                if proc.exitcode is None and not stuck:
+                    continue
+                if stuck:
+                    proc.terminate()
+                proc.join(1.0)
+                if stuck:
+                    log.warning("Decoder worker %d stuck on frame %d, restarting it", slot, job)
+                else:
+                    log.warning(
+                        "Decoder worker %d exited (%s), restarting it", slot, proc.exitcode
+                    )
+                self._results[slot].close()
+                self._start_worker(slot)
+                self.restarts += 1
+                if job is not None:
+                    del self._running[slot]
+                    self._pending.pop(job, None)
+                    self._done[job] = None
+                    self.lost += 1
+                    self._free.put(slot)
+            ready = self._pop_ready()
+        for result in ready:
+            self.output.put(result)
@@ -0,0 +1,8 @@
+"""Run the client tests from the client's folder with ``python -m pytest``."""
+
+from __future__ import annotations
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,85 @@
+"""Decoder worker processes: shared frame slots and replacement of failed workers."""
+
+from __future__ import annotations
+
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+procpool = pytest.importorskip("procpool", exc_type=ImportError)  # needs libzbar
+from pipeline import DropOldestQueue, Frame  # noqa: E402
+
+
+def failing_worker(args, tasks, results) -> None:
+    """Stand-in for ``procpool._worker_main``: dies on "crash", hangs on "hang"."""
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        job, slot, _name, _shape, _dtype, source = task
+        if source == "crash":
+            os._exit(3)
+        if source == "hang":
+            time.sleep(3600)
+        results.send((job, slot, [], [], 0.0))
+
+
+def echo_worker(args, tasks, results) -> None:
+    """Stand-in for ``procpool._worker_main``: reports each frame's shape and pixel value."""
+    shm = None
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        job, slot, name, shape, dtype, _source = task
+        if shm is None or shm.name != name:
+            if shm is not None:
+                shm.close()
+            shm = shared_memory.SharedMemory(name=name)
+        image = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        detections = [(image.shape, int(image.min()), int(image.max()))]
+        del image
+        results.send((job, slot, detections, [], 0.0))
+    if shm is not None:
+        shm.close()
+
+
+def test_cameras_of_different_resolutions_share_the_pool(monkeypatch):
+    monkeypatch.setattr(procpool, "_worker_main", echo_worker)
+    frames, results = DropOldestQueue(20), DropOldestQueue(20)
+    pool = procpool.ProcessDecodePool(None, frames, results, workers=2)
+    pool.start()
+    shapes = {"small": (36, 64, 3), "large": (54, 96, 3)}
+    try:
+        for seq in range(1, 13):
+            source = "small" if seq % 2 else "large"
+            frames.put(Frame(seq, time.time(), np.full(shapes[source], seq, np.uint8), source))
+            time.sleep(0.01)  # keep both cameras' frames in flight together
+        done = [results.get(timeout=30) for _ in range(12)]
+    finally:
+        pool.stop()
+    assert [r.seq for r in done] == list(range(1, 13))
+    for result in done:
+        assert result.detections == [(shapes[result.source], result.seq, result.seq)]
+    assert pool.lost == 0
+
+
+@pytest.mark.parametrize("failure", ["crash", "hang"])
+def test_failed_worker_is_replaced_and_its_frame_skipped(monkeypatch, failure):
+    monkeypatch.setattr(procpool, "_worker_main", failing_worker)
+    frames, results = DropOldestQueue(10), DropOldestQueue(10)
+    # a spawned worker takes about half a second to start, all of it on the first frame's clock
+    pool = procpool.ProcessDecodePool(None, frames, results, workers=1, job_timeout=5.0)
+    pool.start()
+    try:
+        image = np.zeros((4, 4, 3), np.uint8)
+        for seq, source in enumerate(["a", failure, "b"], 1):
+            frames.put(Frame(seq, time.time(), image, source))
+        done = [results.get(timeout=30), results.get(timeout=30)]
+    finally:
+        pool.stop()
+    assert [(r.seq, r.source) for r in done if r] == [(1, "a"), (3, "b")]
+    assert (pool.restarts, pool.lost) == (1, 1)
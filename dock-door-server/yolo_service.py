@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""Micro-batched YOLO inference shared by every decoder in the process."""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+from pipeline import StageStats
+
+try:
+    from ultralytics import YOLO  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    YOLO = None  # type: ignore
+
+Box = Tuple[int, int, int, int]  # x1, y1, x2, y2
+
+
+class YOLOService:
+    """Collect images from many callers and run them through YOLO in batches.
+
+    A batch is closed when it holds ``max_batch`` images or ``max_wait``
+    seconds after its first image arrived, whichever comes first, so a
+    lone caller waits at most ``max_wait`` (nothing with ``max_batch=1``).
+    Images are letterboxed to ``imgsz`` by YOLO. Every future resolves:
+    failed inference or box parsing sets its exception, and so does
+    :meth:`stop` for images still queued.
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        max_batch: int = 8,
+        max_wait: float = 0.01,
+        imgsz: int = 640,
+        model: Any = None,
+    ) -> None:
+        if model is None:
+            if YOLO is None:
+                raise RuntimeError("ultralytics is not installed")
+            model = YOLO(model_path)
+        self.model = model
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait
+        self.imgsz = imgsz
+        self.stats = StageStats("yolo")
+        self.batches = 0
+        self.images = 0
+        self._queue: "queue.Queue[Tuple[np.ndarray, Future]]" = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="yolo-service", daemon=True)
+
+    def start(self) -> "YOLOService":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.ident is not None:  # started
+            self._thread.join(5.0)
+        while True:
+            try:
+                _, future = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            future.set_exception(RuntimeError("YOLO service stopped"))
+
+    def submit(self, image: np.ndarray) -> "Future[List[Box]]":
+        """Queue ``image`` and return a future resolving to its boxes."""
+        future: "Future[List[Box]]" = Future()
+        if self._stop.is_set():
+            future.set_exception(RuntimeError("YOLO service stopped"))
+        else:
+            self._queue.put((image, future))
+        return future
+
+    def __call__(self, image: np.ndarray, timeout: Optional[float] = None) -> List[Box]:
+        return self.submit(image).result(timeout)
+
+    @property
+    def mean_batch(self) -> float:
+        return self.images / self.batches if self.batches else 0.0
+
+    def _next_batch(self) -> List[Tuple[np.ndarray, Future]]:
+        try:
+            batch = [self._queue.get(timeout=0.2)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if not batch:
+                continue
+            start = time.monotonic()
+            try:
+                images = [image for image, _ in batch]
+                results = list(self.model(images, imgsz=self.imgsz, verbose=False))
+            except Exception as exc:
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            self.stats.record(time.monotonic() - start)
+            self.batches += 1
+            self.images += len(batch)
+            for index, (_, future) in enumerate(batch):
+                try:
+                    result = results[index]
+                    boxes = [tuple(map(int, b)) for b in result.boxes.xyxy.tolist()]
+                except Exception as exc:  # one bad result must not fail the batch
+                    future.set_exception(exc)
+                else:
+                    future.set_result(boxes)  # type: ignore[arg-type]
+
+    def __str__(self) -> str:
+        return f"{self.stats}, {self.images} images in {self.batches} batches (mean {self.mean_batch:.1f})"
+
+
+_shared: Optional[YOLOService] = None
+_shared_lock = threading.Lock()
+
+
+def shared_service(args) -> YOLOService:
+    """Return the process-wide service, starting it on first use.
+
+    ``args.yolo_batch`` of 0 batches up to one image per decode thread,
+    the most that can be in flight at once; the supervisor sizes it from
+    its cameras. A decoder worker process decodes one frame at a time, so
+    its service never waits for a second image.
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            threads = 1 if args.decode_workers > 0 else max(1, args.decode_threads)
+            max_batch = args.yolo_batch or threads
+            _shared = YOLOService(
+                args.model_path,
+                max_batch=max_batch,
+                max_wait=args.yolo_max_wait_ms / 1000,
+                imgsz=args.yolo_imgsz,
+            ).start()
+        return _shared
+
+
+def current() -> Optional[YOLOService]:
+    """Return the process-wide service if a decoder has started it."""
+    return _shared
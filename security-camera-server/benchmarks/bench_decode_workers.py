@@ -0,0 +1,54 @@
+"""Frames/second of the process decode pool at several worker counts."""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+from common import detector_args, synthetic_frames
+
+from pipeline import DropOldestQueue, Frame
+from procpool import ProcessDecodePool
+
+
+def bench(workers: int, frames: list, count: int) -> float:
+    source = DropOldestQueue(maxsize=count)
+    output = DropOldestQueue(maxsize=count)
+    pool = ProcessDecodePool(detector_args(), source, output, workers=workers).start()
+    # warm up: let every worker load its detectors
+    for i in range(workers):
+        source.put(Frame(-workers + i, time.time(), frames[0]))
+    for _ in range(workers):
+        while output.get(timeout=60) is None:
+            pass
+
+    start = time.perf_counter()
+    for seq in range(count):
+        source.put(Frame(seq, time.time(), frames[seq % len(frames)]))
+    received = 0
+    last_seq = -1
+    while received < count:
+        result = output.get(timeout=60)
+        assert result is not None, "decoder workers stalled"
+        assert result.seq > last_seq, "results out of order"
+        last_seq = result.seq
+        received += 1
+    elapsed = time.perf_counter() - start
+    pool.stop()
+    return count / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--workers", default="1,2,4,8")
+    args = parser.parse_args()
+
+    frames = synthetic_frames()
+    print(f"{'workers':<10}{'frames/s':>10}")
+    for workers in (int(w) for w in args.workers.split(",")):
+        print(f"{workers:<10}{bench(workers, frames, args.frames):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""Bounded duplicate suppression for decoded barcodes."""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+WINDOW = "window"
+SESSION = "session"
+
+
+class WindowDeduper:
+    """Pass each code at most once per ``window`` seconds.
+
+    Codes live in a ring of ``buckets`` time buckets; advancing the ring
+    clears expired buckets wholesale, so memory only holds codes seen in
+    the last window (capped at ``max_codes``) no matter how long it runs.
+    A repeat is suppressed for ``window`` to ``window * (1 + 1/buckets)``
+    seconds.
+    """
+
+    def __init__(self, window: float = 2.0, buckets: int = 8, max_codes: int = 10_000) -> None:
+        self.window = window
+        self.width = window / buckets
+        self.max_codes = max_codes
+        self._buckets: List[Dict[str, None]] = [{} for _ in range(buckets + 1)]  # ordered sets
+        self._tick = 0
+        self.passed = 0
+        self.suppressed = 0
+
+    def _advance(self, tick: int) -> None:
+        for t in range(max(self._tick + 1, tick - len(self._buckets) + 1), tick + 1):
+            self._buckets[t % len(self._buckets)].clear()
+        self._tick = max(self._tick, tick)
+
+    def __len__(self) -> int:
+        return sum(len(bucket) for bucket in self._buckets)
+
+    def _evict_oldest(self) -> None:
+        """Expire the oldest code early rather than grow past ``max_codes``."""
+        for t in range(self._tick - len(self._buckets) + 1, self._tick + 1):
+            bucket = self._buckets[t % len(self._buckets)]
+            if bucket:
+                del bucket[next(iter(bucket))]
+                return
+
+    def __call__(self, code: str, now: Optional[float] = None) -> bool:
+        """Return ``True`` if ``code`` should be sent."""
+        if not code:
+            return False
+        now = time.time() if now is None else now
+        tick = int(now / self.width)
+        self._advance(tick)
+        if any(code in bucket for bucket in self._buckets):
+            self.suppressed += 1
+            return False
+        if len(self) >= self.max_codes:
+            self._evict_oldest()
+        self._buckets[self._tick % len(self._buckets)][code] = None
+        self.passed += 1
+        return True
+
+    def __str__(self) -> str:
+        return f"dedup: window {self.window:g}s, passed {self.passed}, suppressed {self.suppressed}"
+
+
+class SessionDeduper:
+    """Pass each code once per session, e.g. one trailer at a dock door.
+
+    A session ends after ``idle_timeout`` seconds without any code, when
+    the next trailer is assumed to be at the door. At most ``max_codes``
+    codes are remembered; the least recently seen are forgotten first.
+    """
+
+    def __init__(self, idle_timeout: float = 300.0, max_codes: int = 5_000) -> None:
+        self.idle_timeout = idle_timeout
+        self.max_codes = max_codes
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._last = 0.0
+        self.sessions = 0
+        self.passed = 0
+        self.suppressed = 0
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def __call__(self, code: str, now: Optional[float] = None) -> bool:
+        """Return ``True`` if ``code`` should be sent."""
+        if not code:
+            return False
+        now = time.time() if now is None else now
+        if now - self._last > self.idle_timeout:
+            self._seen.clear()
+            self.sessions += 1
+        self._last = max(self._last, now)
+        if code in self._seen:
+            self._seen.move_to_end(code)
+            self.suppressed += 1
+            return False
+        self._seen[code] = None
+        if len(self._seen) > self.max_codes:
+            self._seen.popitem(last=False)
+        self.passed += 1
+        return True
+
+    def __str__(self) -> str:
+        return (
+            f"dedup: session {self.sessions}, {len(self)} codes, "
+            f"passed {self.passed}, suppressed {self.suppressed}"
+        )
+
+
+def make_deduper(info: Dict[str, str], args) -> "WindowDeduper | SessionDeduper":
+    """Build the deduplicator configured for the camera described by ``info``.
+
+    ``Dedup Mode`` is ``window`` or ``session`` and defaults to ``session``
+    at dock doors (areas starting with ``DD``). ``Dedup Window`` and
+    ``Dedup Idle`` override ``--dedup-window`` and ``--dedup-idle``.
+    """
+    dock_door = info.get("Camera Area", "").startswith("DD")
+    mode = info.get("Dedup Mode", "").lower() or (SESSION if dock_door else WINDOW)
+    if mode == SESSION:
+        return SessionDeduper(float(info.get("Dedup Idle") or args.dedup_idle))
+    if mode == WINDOW:
+        return WindowDeduper(float(info.get("Dedup Window") or args.dedup_window))
+    raise ValueError(f"Unknown Dedup Mode '{mode}', expected '{WINDOW}' or '{SESSION}'")
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""Building blocks for the capture / decode / display pipeline."""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional
+
+import cv2  # type: ignore
+
+from decoders import CascadeStats
+
+log = logging.getLogger(__name__)
+
+
+class Frame(NamedTuple):
+    seq: int
+    captured_at: float
+    image: Any
+    source: str = ""  # camera name when several streams share the decoders
+
+
+class FrameResult(NamedTuple):
+    seq: int
+    captured_at: float
+    decoded_at: float
+    detections: List[Any]
+    source: str = ""
+
+
+class DropOldestQueue:
+    """Bounded queue whose ``put`` discards the oldest item when full."""
+
+    def __init__(self, maxsize: int) -> None:
+        self._items: Deque[Any] = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self.dropped = 0
+
+    def put(self, item: Any) -> None:
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """Return the oldest item, or ``None`` after ``timeout`` seconds."""
+        with self._cond:
+            if not self._items and not self._cond.wait_for(lambda: self._items, timeout):
+                return None
+            return self._items.popleft()
+
+    def drain(self) -> List[Any]:
+        with self._cond:
+            items = list(self._items)
+            self._items.clear()
+            return items
+
+
+class FairScheduler:
+    """Latest-frame slots for many cameras, served round-robin.
+
+    Each camera keeps at most one pending frame (newer frames replace older
+    ones), and ``get`` rotates over cameras so a fast stream cannot starve
+    the others. Has the same ``put``/``get`` interface as
+    :class:`DropOldestQueue`, so decode pools can consume it directly.
+    """
+
+    def __init__(self) -> None:
+        self._slots: Dict[str, Any] = {}
+        self._order: List[str] = []
+        self._next = 0
+        self._cond = threading.Condition()
+        self.dropped = 0
+
+    def put(self, frame: Frame) -> None:
+        with self._cond:
+            if frame.source not in self._slots:
+                self._order.append(frame.source)
+            if self._slots.get(frame.source) is not None:
+                self.dropped += 1
+            self._slots[frame.source] = frame
+            self._cond.notify()
+
+    def _pop_next(self) -> Optional[Frame]:
+        for i in range(len(self._order)):
+            index = (self._next + i) % len(self._order)
+            frame = self._slots[self._order[index]]
+            if frame is not None:
+                self._slots[self._order[index]] = None
+                self._next = index + 1
+                return frame
+        return None
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Frame]:
+        with self._cond:
+            frame = self._pop_next()
+            if frame is None and self._cond.wait_for(
+                lambda: any(f is not None for f in self._slots.values()), timeout
+            ):
+                frame = self._pop_next()
+            return frame
+
+
+class StageStats:
+    """Throughput and latency counters for one pipeline stage."""
+
+    def __init__(self, name: str, window: float = 5.0) -> None:
+        self.name = name
+        self.window = window
+        self.count = 0
+        self._lock = threading.Lock()
+        self._events: Deque[tuple] = deque()
+
+    def record(self, latency: float = 0.0) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self.count += 1
+            self._events.append((now, latency))
+            while self._events and now - self._events[0][0] > self.window:
+                self._events.popleft()
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            events = list(self._events)
+        if not events:
+            return {"fps": 0.0, "latency_ms": 0.0, "max_latency_ms": 0.0}
+        latencies = [latency for _, latency in events]
+        span = events[-1][0] - events[0][0]
+        return {
+            "fps": (len(events) - 1) / span if span > 0 else 0.0,
+            "latency_ms": 1000 * sum(latencies) / len(latencies),
+            "max_latency_ms": 1000 * max(latencies),
+        }
+
+    def __str__(self) -> str:
+        snap = self.snapshot()
+        return (
+            f"{self.name}: {snap['fps']:.1f} fps, "
+            f"{snap['latency_ms']:.0f} ms avg, {snap['max_latency_ms']:.0f} ms max"
+        )
+
+
+class FrameGrabber:
+    """Read ``cap`` on a thread, keeping only the most recent frame.
+
+    Every frame accepted by ``gate`` (all of them by default) is also
+    offered to ``output`` (normally a one-slot :class:`DropOldestQueue`) so
+    decoders always work on fresh frames.
+    """
+
+    def __init__(
+        self,
+        cap: cv2.VideoCapture,
+        output: Any,
+        gate: Optional[Callable[[Any], bool]] = None,
+        source: str = "",
+    ) -> None:
+        self.cap = cap
+        self.output = output
+        self.gate = gate
+        self.source = source
+        self.stats = StageStats("capture")
+        self.failed = False
+        self._latest: Optional[Frame] = None
+        self._new_frame = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="frame-grabber", daemon=True)
+
+    def start(self) -> "FrameGrabber":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(2.0)
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    def wait_latest(self, after_seq: int, timeout: float) -> Optional[Frame]:
+        """Return the latest frame newer than ``after_seq`` or ``None``."""
+        with self._new_frame:
+            self._new_frame.wait_for(
+                lambda: self._latest is not None and self._latest.seq > after_seq,
+                timeout,
+            )
+            return self._latest
+
+    def _run(self) -> None:
+        seq = 0
+        while not self._stop.is_set():
+            start = time.monotonic()
+            ret, image = self.cap.read()
+            if not ret:
+                log.warning("Failed to read frame")
+                self.failed = True
+                break
+            seq += 1
+            frame = Frame(seq, time.time(), image, self.source)
+            self.stats.record(time.monotonic() - start)
+            with self._new_frame:
+                self._latest = frame
+                self._new_frame.notify_all()
+            if self.gate is None or self.gate(image):
+                self.output.put(frame)
+        with self._new_frame:
+            self._new_frame.notify_all()
+
+
+class DecodePool:
+    """Decode frames from ``source`` on ``workers`` threads.
+
+    ``make_decoder`` is called once per thread so detector instances are
+    never shared between threads; ``source`` is a :class:`DropOldestQueue`
+    or :class:`FairScheduler`. Results are pushed to ``output``; decoders exposing
+    ``pop_timings()`` feed :attr:`decoder_stats`.
+    """
+
+    def __init__(
+        self,
+        make_decoder: Callable[[], Callable[[Any, str], List[Any]]],
+        source: Any,
+        output: DropOldestQueue,
+        workers: int = 1,
+    ) -> None:
+        self.make_decoder = make_decoder
+        self.source = source
+        self.output = output
+        self.stats = StageStats("decode")
+        self.decoder_stats = CascadeStats()
+        self._stop = threading.Event()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"decoder-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+
+    def start(self) -> "DecodePool":
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(2.0)
+
+    def _run(self) -> None:
+        decode = self.make_decoder()
+        while not self._stop.is_set():
+            frame = self.source.get(timeout=0.2)
+            if frame is None:
+                continue
+            start = time.monotonic()
+            try:
+                detections = decode(frame.image, frame.source)
+            except Exception as exc:  # keep the thread alive for the next frame
+                log.warning("Decoder thread failed on frame %d: %s", frame.seq, exc)
+                detections = []
+            self.stats.record(time.monotonic() - start)
+            if hasattr(decode, "pop_timings"):
+                self.decoder_stats.record(decode.pop_timings())
+            self.output.put(
+                FrameResult(frame.seq, frame.captured_at, time.time(), detections, frame.source)
+            )
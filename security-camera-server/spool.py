@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""Durable on-disk spool for scans that could not be delivered."""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+
+class ScanSpool:
+    """FIFO of scan payloads stored in a SQLite database in WAL mode.
+
+    Payloads keep their original capture timestamp. When the stored payloads
+    exceed ``max_bytes`` the oldest ones are evicted.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 50 * 1024 * 1024) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.evicted = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS spool ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL)"
+        )
+        self._count, self._bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) FROM spool"
+        ).fetchone()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def push(self, payloads: Iterable[Dict]) -> None:
+        """Append ``payloads`` in one transaction."""
+        rows = [(json.dumps(p, separators=(",", ":")),) for p in payloads]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT INTO spool (payload) VALUES (?)", rows)
+            self._count += len(rows)
+            self._bytes += sum(len(r[0]) for r in rows)
+            self._evict()
+            self._conn.execute("COMMIT")
+
+    def peek(self, limit: int) -> Tuple[int, List[Dict]]:
+        """Return the id of the last row and up to ``limit`` oldest payloads."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, payload FROM spool ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+        if not rows:
+            return 0, []
+        return rows[-1][0], [json.loads(payload) for _, payload in rows]
+
+    def ack(self, last_id: int) -> None:
+        """Remove every payload up to and including ``last_id``."""
+        with self._lock:
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) FROM spool WHERE id <= ?",
+                (last_id,),
+            ).fetchone()
+            self._conn.execute("DELETE FROM spool WHERE id <= ?", (last_id,))
+            self._count -= count
+            self._bytes -= size
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _evict(self) -> None:
+        """Drop the oldest payloads until the spool fits in ``max_bytes``."""
+        while self._bytes > self.max_bytes and self._count:
+            rows = self._conn.execute(
+                "SELECT id, LENGTH(payload) FROM spool ORDER BY id LIMIT 500"
+            ).fetchall()
+            last_id = rows[-1][0]
+            for row_id, size in rows:
+                self._count -= 1
+                self._bytes -= size
+                self.evicted += 1
+                if self._bytes <= self.max_bytes:
+                    last_id = row_id
+                    break
+            self._conn.execute("DELETE FROM spool WHERE id <= ?", (last_id,))
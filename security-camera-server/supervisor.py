@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""Serve many camera streams from one process with shared decoder workers."""
+
+from __future__ import annotations
+
+import argparse
+import configparser
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+import utils
+import yolo_service
+from client import add_stream_arguments
+from decoders import DEFAULT_CASCADE
+from dedup import make_deduper
+from motion import MotionGate
+from pipeline import DecodePool, DropOldestQueue, FairScheduler, FrameGrabber, FrameResult, StageStats
+from procpool import ProcessDecodePool
+from sender import ScanSender
+from spool import ScanSpool
+from stream import FrameDecoder, install_signal_handlers
+
+log = logging.getLogger(__name__)
+
+
+def load_cameras(path: str) -> Dict[str, Dict[str, str]]:
+    """Read one camera per section of the INI file at ``path``.
+
+    Keys are the ``camera_info.txt`` keys; ``[DEFAULT]`` holds settings shared
+    by every camera (server address, client IP, ...). The section name is
+    used as ``Camera Name`` unless one is given.
+    """
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.optionxform = str  # type: ignore  # keep "Camera Area" as written
+    if not parser.read(path, encoding="utf-8"):
+        raise FileNotFoundError(f"Camera config '{path}' not found")
+    cameras = {}
+    for section in parser.sections():
+        info = dict(parser[section])
+        info.setdefault("Camera Name", section)
+        if info["Camera Name"] in cameras:
+            raise ValueError(f"Duplicate camera name '{info['Camera Name']}' in {path}")
+        cameras[info["Camera Name"]] = info
+    return cameras
+
+
+class CameraStream:
+    """Capture thread for one camera that reopens the stream when it fails.
+
+    Frames go to ``output`` tagged with the camera name. A failed or
+    unreachable stream is retried after ``min_backoff`` seconds, doubling up
+    to ``max_backoff`` while it keeps failing.
+    """
+
+    def __init__(
+        self,
+        info: Dict[str, str],
+        output: FairScheduler,
+        gate: Optional[MotionGate] = None,
+        min_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+    ) -> None:
+        self.info = info
+        self.name = info["Camera Name"]
+        self.output = output
+        self.gate = gate
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.grabber: Optional[FrameGrabber] = None
+        self.restarts = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"camera-{self.name}", daemon=True)
+
+    def start(self) -> "CameraStream":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(5.0)
+
+    @property
+    def connected(self) -> bool:
+        return self.grabber is not None and self.grabber.running
+
+    def _run(self) -> None:
+        url = self.info.get("Camera URL", "0")
+        backoff = self.min_backoff
+        while not self._stop.is_set():
+            cap = utils.open_capture(url)
+            if cap is None:
+                log.warning("Cannot open camera %s (%s), retrying in %.0fs", self.name, url, backoff)
+            else:
+                log.info("Camera %s connected", self.name)
+                self.grabber = FrameGrabber(cap, self.output, gate=self.gate, source=self.name)
+                self.grabber.start()
+                started = time.monotonic()
+                while self.grabber.running and not self._stop.wait(0.5):
+                    pass
+                self.grabber.stop()
+                cap.release()
+                if self._stop.is_set():
+                    break
+                self.restarts += 1
+                if time.monotonic() - started > self.max_backoff:
+                    backoff = self.min_backoff  # it was healthy for a while
+                log.warning("Camera %s stream failed, reconnecting in %.0fs", self.name, backoff)
+            if self._stop.wait(backoff):
+                break
+            backoff = min(2 * backoff, self.max_backoff)
+
+    def __str__(self) -> str:
+        capture = str(self.grabber.stats) if self.connected else "disconnected"  # type: ignore
+        gate = f", {self.gate}" if self.gate is not None else ""
+        return f"{self.name}: {capture}, restarts: {self.restarts}{gate}"
+
+
+def _spool_path(base: str, index: int) -> str:
+    """Spool file for the ``index``-th server; the first one uses ``base``."""
+    if index == 0:
+        return base
+    root, ext = os.path.splitext(base)
+    return f"{root}-{index}{ext}"
+
+
+def run_supervisor(cameras: Dict[str, Dict[str, str]], args) -> None:
+    """Stream every camera in ``cameras`` until SIGINT/SIGTERM.
+
+    All cameras feed one :class:`FairScheduler`, so a single decoder pool
+    serves them round-robin with one copy of each model per worker. Scans
+    are delivered by one sender (and spool) per server.
+
+    Without ``--decode-threads`` the pool gets one thread per CPU core (at
+    most one per camera), since each thread loads its own detectors. The
+    YOLO batch then defaults to as many cameras as those threads can have
+    in flight.
+    """
+    if args.decode_threads <= 0:
+        args.decode_threads = min(len(cameras), os.cpu_count() or 1)
+    if args.yolo_batch <= 0 and args.decode_workers <= 0:
+        args.yolo_batch = min(len(cameras), args.decode_threads)
+    dedups = {name: make_deduper(info, args) for name, info in cameras.items()}
+    stop = threading.Event()
+    install_signal_handlers(stop)
+
+    def log_result(payload: Dict[str, str], valid: Optional[bool]) -> None:
+        if valid:
+            log.info("Scan %s valid at %s", payload["barcode"], payload["area"])
+        else:
+            log.warning("Scan %s NOT valid at %s", payload["barcode"], payload["area"])
+
+    spools: List[ScanSpool] = []
+    senders: Dict[str, ScanSender] = {}
+    for info in cameras.values():
+        url = utils.server_url(info)
+        if url not in senders:
+            spool = ScanSpool(
+                _spool_path(args.spool_path, len(spools)),
+                max_bytes=int(args.spool_max_mb * 1024 * 1024),
+            )
+            spools.append(spool)
+            senders[url] = ScanSender(url, on_result=log_result, spool=spool).start()
+
+    frames = FairScheduler()
+    results = DropOldestQueue(maxsize=8 * len(cameras))
+    streams = {
+        name: CameraStream(info, frames, MotionGate(args.motion_threshold, args.force_decode_interval))
+        for name, info in cameras.items()
+    }
+    if args.decode_workers > 0:
+        decoders = ProcessDecodePool(args, frames, results, workers=args.decode_workers).start()
+    else:
+        decoders = DecodePool(lambda: FrameDecoder(args), frames, results, workers=args.decode_threads).start()
+    for camera in streams.values():
+        camera.start()
+    log.info("Supervisor started for %d cameras", len(streams))
+
+    e2e_stats = StageStats("end-to-end")
+    stats_due = time.monotonic() + args.stats_interval
+
+    def handle(result: FrameResult) -> None:
+        e2e_stats.record(result.decoded_at - result.captured_at)
+        info = cameras[result.source]
+        for det in result.detections:
+            if dedups[result.source](det.text, result.captured_at):
+                senders[utils.server_url(info)].submit(
+                    utils.build_payload(det.text, info, result.captured_at)
+                )
+
+    while not stop.is_set():
+        result = results.get(timeout=0.5)
+        if result is not None:
+            handle(result)
+        if args.stats_interval and time.monotonic() >= stats_due:
+            stats_due = time.monotonic() + args.stats_interval
+            log.info(
+                "%s | %s | dropped frames: %d | scans sent: %d, replayed: %d, "
+                "spooled: %d, dropped: %d, rejected: %d",
+                decoders.stats,
+                e2e_stats,
+                frames.dropped,
+                sum(s.sent for s in senders.values()),
+                sum(s.replayed for s in senders.values()),
+                sum(len(s) for s in spools),
+                sum(s.dropped for s in senders.values()),
+                sum(s.rejected for s in senders.values()),
+            )
+            log.info(
+                "cameras:\n%s",
+                "\n".join(f"  {camera}, {dedups[name]}" for name, camera in streams.items()),
+            )
+            log.info("decoder cascade:\n%s", decoders.decoder_stats.report())
+            if yolo_service.current() is not None:
+                log.info("%s", yolo_service.current())
+
+    for camera in streams.values():
+        camera.stop()
+    decoders.stop()
+    for sender in senders.values():
+        sender.close()
+    for spool in spools:
+        spool.close()
+    log.info("Supervisor stopped")
+
+
+def main() -> None:
+    """Run every camera listed in the supervisor config."""
+    parser = argparse.ArgumentParser(
+        description="Serve many camera streams from one process with shared decoder workers."
+    )
+    parser.add_argument(
+        "--config",
+        default=os.getenv(
+            "CAMERAS_CONFIG", os.path.join(os.path.dirname(__file__), "cameras.ini")
+        ),
+        help="INI file with one [section] per camera and shared settings in [DEFAULT]",
+    )
+    add_stream_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    cameras = load_cameras(args.config)
+    if not cameras:
+        print(f"No cameras configured in {args.config}")
+        return
+
+    args.source_decoders = {
+        name: info["Decoders"] for name, info in cameras.items() if info.get("Decoders")
+    }
+    args.decoders = args.decoders or DEFAULT_CASCADE
+    utils.ensure_wechat_models(
+        args.wechat_det_prototxt,
+        args.wechat_det_model,
+        args.wechat_sr_prototxt,
+        args.wechat_sr_model,
+    )
+    run_supervisor(cameras, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Window and session duplicate suppression."""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+
+from dedup import SessionDeduper, WindowDeduper, make_deduper
+
+
+def test_window_passes_a_code_once_per_window():
+    dedup = WindowDeduper(window=2.0, buckets=4)
+    assert dedup("A", now=100.0)
+    assert not dedup("A", now=101.0)
+    assert dedup("B", now=101.0)
+    assert not dedup("A", now=101.9)
+    assert dedup("A", now=102.6)  # at most window * (1 + 1/buckets) later
+    assert (dedup.passed, dedup.suppressed) == (3, 2)
+
+
+def test_window_forgets_expired_codes():
+    dedup = WindowDeduper(window=1.0, buckets=4)
+    for i in range(100):
+        dedup(f"code-{i}", now=10.0 + i * 0.01)
+    assert len(dedup) == 100
+    dedup("other", now=1000.0)  # one tick far ahead clears the whole ring
+    assert len(dedup) == 1
+
+
+def test_window_is_bounded_by_max_codes():
+    dedup = WindowDeduper(window=60.0, max_codes=10)
+    for i in range(50):
+        assert dedup(f"code-{i}", now=5.0)
+    assert len(dedup) == 10
+    assert dedup("code-0", now=5.0)  # evicted early rather than growing
+
+
+def test_empty_codes_never_pass():
+    assert not WindowDeduper()("", now=1.0)
+    assert not SessionDeduper()("", now=1.0)
+
+
+def test_session_passes_each_code_once_until_idle():
+    dedup = SessionDeduper(idle_timeout=300.0)
+    assert dedup("A", now=1000.0)
+    assert not dedup("A", now=1250.0)
+    assert dedup("B", now=1500.0)  # < 300 s since the last code: same trailer
+    assert not dedup("A", now=1510.0)
+    assert dedup("A", now=1900.0)  # idle for 390 s: next trailer
+    assert dedup.sessions == 2
+
+
+def test_session_forgets_least_recently_seen():
+    dedup = SessionDeduper(max_codes=3)
+    for code in "ABC":
+        dedup(code, now=1.0)
+    dedup("A", now=2.0)  # refreshes A
+    dedup("D", now=3.0)  # evicts B
+    assert len(dedup) == 3
+    assert not dedup("A", now=4.0)
+    assert dedup("B", now=5.0)
+
+
+ARGS = SimpleNamespace(dedup_window=2.0, dedup_idle=300.0)
+
+
+@pytest.mark.parametrize(
+    "info, kind, setting",
+    [
+        ({"Camera Area": "AISLE-3"}, WindowDeduper, 2.0),
+        ({"Camera Area": "DD-01"}, SessionDeduper, 300.0),
+        ({"Camera Area": "DD-01", "Dedup Mode": "window", "Dedup Window": "5"}, WindowDeduper, 5.0),
+        ({"Camera Area": "A", "Dedup Mode": "Session", "Dedup Idle": "60"}, SessionDeduper, 60.0),
+    ],
+)
+def test_make_deduper_picks_mode_and_settings(info, kind, setting):
+    dedup = make_deduper(info, ARGS)
+    assert isinstance(dedup, kind)
+    assert setting == (dedup.window if kind is WindowDeduper else dedup.idle_timeout)
+
+
+def test_make_deduper_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        make_deduper({"Dedup Mode": "never"}, ARGS)
@@ -0,0 +1,56 @@
+"""Motion gate: static frames are not handed to the decoders."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+motion = pytest.importorskip("motion", exc_type=ImportError)  # needs OpenCV
+from pipeline import DropOldestQueue, FrameGrabber  # noqa: E402
+
+STATIC = np.full((360, 640, 3), 80, np.uint8)
+CHANGED = STATIC.copy()
+CHANGED[100:200, 200:300] = 255  # a label entering the view
+
+
+def test_static_frames_are_skipped_until_something_changes():
+    gate = motion.MotionGate(threshold=0.5, force_interval=2.0)
+    assert gate(STATIC, now=0.0)  # nothing to compare with yet
+    assert not gate(STATIC, now=0.5)
+    assert not gate(STATIC + 3, now=0.6)  # sensor noise is not a change
+    assert gate(CHANGED, now=0.7)
+    assert not gate(CHANGED, now=0.8)  # the changed frame is the new reference
+    assert (gate.checked, gate.skipped) == (5, 3)
+
+
+def test_decode_is_forced_after_the_interval():
+    gate = motion.MotionGate(threshold=0.5, force_interval=2.0)
+    assert gate(STATIC, now=0.0)
+    assert not gate(STATIC, now=1.9)
+    assert gate(STATIC, now=2.0)
+    assert not gate(STATIC, now=2.1)
+
+
+def test_zero_threshold_disables_the_gate():
+    gate = motion.MotionGate(threshold=0)
+    assert all(gate(STATIC, now=t) for t in (0.0, 0.1, 0.2))
+    assert gate.skipped == 0
+
+
+class FakeCapture:
+    def __init__(self, images):
+        self.images = list(images)
+
+    def read(self):
+        return (True, self.images.pop(0)) if self.images else (False, None)
+
+
+def test_grabber_only_queues_frames_the_gate_accepts():
+    frames = DropOldestQueue(10)
+    gate = motion.MotionGate(threshold=0.5, force_interval=60.0)
+    grabber = FrameGrabber(FakeCapture([STATIC, STATIC, STATIC, CHANGED]), frames, gate=gate)
+    grabber.start()
+    grabber._thread.join(5.0)
+    assert grabber.failed  # the capture ran out
+    assert [frame.seq for frame in frames.drain()] == [1, 4]
+    assert grabber.stats.count == 4
@@ -0,0 +1,121 @@
+"""Durable spool and the sender's replay of it."""
+
+from __future__ import annotations
+
+import pytest
+
+from sender import ScanSender
+from spool import ScanSpool
+
+
+def payloads(*barcodes):
+    return [{"barcode": barcode, "scan_id": f"id-{barcode}"} for barcode in barcodes]
+
+
+@pytest.fixture
+def spool(tmp_path):
+    spool = ScanSpool(str(tmp_path / "spool.db"))
+    yield spool
+    spool.close()
+
+
+def test_fifo_peek_and_ack(spool):
+    spool.push(payloads("a", "b", "c"))
+    last_id, batch = spool.peek(2)
+    assert [p["barcode"] for p in batch] == ["a", "b"]
+    spool.ack(last_id)
+    assert len(spool) == 1
+    assert spool.peek(10)[1] == payloads("c")
+
+
+def test_survives_reopen(tmp_path):
+    path = str(tmp_path / "spool.db")
+    spool = ScanSpool(path)
+    spool.push(payloads("a", "b"))
+    spool.close()
+    reopened = ScanSpool(path)
+    assert len(reopened) == 2
+    assert reopened.peek(10)[1] == payloads("a", "b")
+    reopened.close()
+
+
+def test_evicts_oldest_past_max_bytes(tmp_path):
+    spool = ScanSpool(str(tmp_path / "spool.db"), max_bytes=400)
+    spool.push(payloads(*(f"{i:04d}" for i in range(50))))
+    kept = [p["barcode"] for p in spool.peek(100)[1]]
+    assert spool.evicted == 50 - len(kept) > 0
+    assert kept == [f"{i:04d}" for i in range(50 - len(kept), 50)]
+    assert spool._bytes <= 400
+    spool.close()
+
+
+class Response:
+    def __init__(self, status_code: int, body: dict) -> None:
+        self.status_code = status_code
+        self.body = body
+        self.text = str(body)
+        self.ok = status_code < 400
+
+    def json(self) -> dict:
+        return self.body
+
+
+class FakeServer:
+    """Answers batch posts with ``status``; 400s name scans starting with "bad"."""
+
+    def __init__(self, status: int = 200) -> None:
+        self.status = status
+        self.posts = []
+
+    def post(self, url, json, timeout):
+        self.posts.append([p["barcode"] for p in json])
+        bad = [i for i, p in enumerate(json) if p["barcode"].startswith("bad")]
+        if self.status == 400 and bad:
+            return Response(400, {"errors": [{"index": i, "error": "x"} for i in bad]})
+        if self.status in (200, 400):
+            results = [{"id": i + 1, "valid": True} for i in range(len(json))]
+            return Response(200, {"results": results})
+        return Response(self.status, {"error": "no"})
+
+
+def replay_with(spool, status: int):
+    sender = ScanSender("http://server", spool=spool, retries=0, backoff=0)
+    server = FakeServer(status)
+    sender._session.post = server.post
+    sender._replay()
+    return sender, server
+
+
+def test_replay_acks_delivered_scans(spool):
+    spool.push(payloads("a", "b"))
+    sender, _server = replay_with(spool, 200)
+    assert len(spool) == 0
+    assert sender.replayed == 2
+
+
+@pytest.mark.parametrize("status", [404, 413, 500, 503])
+def test_replay_keeps_scans_the_server_did_not_take(spool, status):
+    spool.push(payloads("a", "b", "c"))
+    sender, _server = replay_with(spool, status)
+    assert len(spool) == 3
+    assert sender.replayed == 0
+
+
+def test_replay_drops_only_rejected_scans(spool):
+    spool.push(payloads("a", "bad-1", "b", "bad-2"))
+    sender, server = replay_with(spool, 400)
+    assert server.posts == [["a", "bad-1", "b", "bad-2"], ["a", "b"]]
+    assert len(spool) == 0
+    assert sender.rejected == 2
+
+
+def test_replay_reports_validation_results(spool):
+    spool.push(payloads("a", "bad-1"))
+    seen = []
+    sender = ScanSender(
+        "http://server", on_result=lambda p, v: seen.append((p["barcode"], v)),
+        spool=spool, retries=0, backoff=0,
+    )
+    sender._session.post = FakeServer(400).post
+    sender._replay()
+    assert seen == [("a", True)]
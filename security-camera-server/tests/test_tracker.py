@@ -0,0 +1,49 @@
+"""ROI tracker: region planning, box expiry and merging."""
+
+from __future__ import annotations
+
+import numpy as np
+
+from tracker import ROITracker, merge_boxes
+
+
+def polygon(x1, y1, x2, y2) -> np.ndarray:
+    return np.array([[x1, y1], [x2, y1], [x2, y2], [x1, y2]], np.float32)
+
+
+def test_regions_expire_after_ttl():
+    tracker = ROITracker(full_scan_every=100, ttl=1.0, padding=0.0, min_margin=10)
+    assert tracker.plan((480, 640), now=0.0) is None  # nothing seen yet
+    tracker.update([polygon(100, 100, 149, 119)], now=0.0)
+    assert tracker.plan((480, 640), now=0.5) == [(90, 90, 160, 130)]
+    assert tracker.plan((480, 640), now=1.5) is None
+    assert (tracker.full_scans, tracker.roi_scans) == (2, 1)
+
+
+def test_full_scan_every_n_frames():
+    tracker = ROITracker(full_scan_every=3, ttl=10.0)
+    tracker.update([polygon(100, 100, 149, 119)], now=0.0)
+    plans = [tracker.plan((480, 640), now=0.1 * i) for i in range(6)]
+    assert [plan is None for plan in plans] == [False, False, True, False, False, True]
+
+
+def test_a_code_in_view_keeps_one_box():
+    tracker = ROITracker(full_scan_every=1000, ttl=10.0, padding=0.0, min_margin=0)
+    for frame in range(50):
+        tracker.update([polygon(100 + frame, 100, 149 + frame, 119)], now=frame * 0.03)
+    assert len(tracker._boxes) == 1
+    assert tracker.plan((480, 640), now=1.5) == [(149, 100, 199, 120)]  # the latest sighting
+
+
+def test_overlapping_codes_of_one_frame_are_merged_and_boxes_are_capped():
+    tracker = ROITracker(ttl=10.0, max_boxes=4)
+    tracker.update([polygon(0, 0, 19, 19), polygon(10, 10, 29, 29)], now=0.0)
+    assert [box for box, _seen in tracker._boxes] == [(0, 0, 30, 30)]
+    for i in range(10):
+        tracker.update([polygon(100 * i, 200, 100 * i + 9, 209)], now=1.0 + i)
+    assert [box[0] for box, _seen in tracker._boxes] == [600, 700, 800, 900]
+
+
+def test_merge_boxes_joins_chains_of_overlaps():
+    boxes = [(0, 0, 10, 10), (20, 0, 30, 10), (5, 0, 25, 10), (50, 50, 60, 60)]
+    assert sorted(merge_boxes(boxes)) == [(0, 0, 30, 10), (50, 50, 60, 60)]
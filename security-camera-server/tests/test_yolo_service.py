@@ -0,0 +1,77 @@
+"""Shared YOLO service: micro-batching and failures reaching the callers."""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+
+yolo_service = pytest.importorskip("yolo_service", exc_type=ImportError)  # needs OpenCV
+import decoders  # noqa: E402
+
+
+class Boxes:
+    def __init__(self, image):
+        self.image = image
+
+    @property
+    def xyxy(self):
+        if self.image == "bad":
+            raise ValueError("unreadable boxes")
+        return SimpleNamespace(tolist=lambda: [[self.image, 0, self.image + 1.9, 2.0]])
+
+
+class FakeModel:
+    """Stands in for ``ultralytics.YOLO``: one box per image, at x = the image."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, images, imgsz, verbose):
+        self.batches.append(list(images))
+        return [SimpleNamespace(boxes=Boxes(image)) for image in images]
+
+
+def test_images_are_batched_up_to_max_batch():
+    model = FakeModel()
+    service = yolo_service.YOLOService("", max_batch=3, max_wait=0.05, model=model)
+    futures = [service.submit(image) for image in range(5)]  # queued before the thread runs
+    service.start()
+    try:
+        boxes = [future.result(5) for future in futures]
+    finally:
+        service.stop()
+    assert model.batches == [[0, 1, 2], [3, 4]]  # the second closed after max_wait
+    assert boxes == [[(i, 0, i + 1, 2)] for i in range(5)]
+    assert service.mean_batch == 2.5
+
+
+def test_parse_failure_fails_only_its_caller_and_the_service_keeps_going():
+    service = yolo_service.YOLOService("", max_batch=3, max_wait=0.05, model=FakeModel())
+    futures = [service.submit(image) for image in (1, "bad", 2)]
+    service.start()
+    try:
+        assert futures[0].result(5) == [(1, 0, 2, 2)]
+        with pytest.raises(ValueError):
+            futures[1].result(5)
+        assert futures[2].result(5) == [(2, 0, 3, 2)]
+        assert service(3, timeout=5) == [(3, 0, 4, 2)]
+    finally:
+        service.stop()
+
+
+def test_stop_fails_queued_and_later_images():
+    service = yolo_service.YOLOService("", model=FakeModel())  # never started
+    queued = service.submit(1)
+    service.stop()
+    with pytest.raises(RuntimeError):
+        queued.result(1)
+    with pytest.raises(RuntimeError):
+        service(2, timeout=1)
+
+
+def test_decoder_treats_an_unanswered_frame_as_no_detections(monkeypatch):
+    monkeypatch.setattr(decoders, "YOLO_TIMEOUT", 0.05)
+    decoder = object.__new__(decoders.YOLODecoder)  # skip the model file checks
+    decoder.service = yolo_service.YOLOService("", model=FakeModel())  # never started
+    assert decoder.decode(None, 1) == []
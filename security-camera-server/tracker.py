@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""Track where barcodes were recently seen so decoders can skip the rest."""
+
+from __future__ import annotations
+
+import time
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+Box = Tuple[int, int, int, int]  # x1, y1, x2, y2
+
+
+def _overlaps(a: Box, b: Box) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def _union(a: Box, b: Box) -> Box:
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+def merge_boxes(boxes: Iterable[Box]) -> List[Box]:
+    """Merge overlapping boxes into their bounding boxes."""
+    merged: List[Box] = []
+    for box in boxes:
+        while True:
+            for other in merged:
+                if _overlaps(box, other):
+                    merged.remove(other)
+                    box = _union(box, other)
+                    break
+            else:
+                break
+        merged.append(box)
+    return merged
+
+
+class ROITracker:
+    """Remember recent barcode boxes and plan which regions to decode.
+
+    A full-frame scan is requested every ``full_scan_every`` frames, when no
+    box was seen within ``ttl`` seconds, or after a region pass found
+    nothing. Boxes are grown by ``padding`` (fraction of their size, at
+    least ``min_margin`` pixels) to allow for movement between frames.
+
+    A box replaces the older boxes it overlaps, so a code that stays in
+    view keeps one entry instead of one per frame, and at most
+    ``max_boxes`` of the newest boxes are kept.
+    """
+
+    def __init__(
+        self,
+        full_scan_every: int = 10,
+        ttl: float = 1.0,
+        padding: float = 0.5,
+        min_margin: int = 32,
+        max_boxes: int = 32,
+    ) -> None:
+        self.full_scan_every = full_scan_every
+        self.ttl = ttl
+        self.padding = padding
+        self.min_margin = min_margin
+        self.max_boxes = max_boxes
+        self.full_scans = 0
+        self.roi_scans = 0
+        self._boxes: List[Tuple[Box, float]] = []
+        self._since_full = 0
+
+    def plan(self, shape: Tuple[int, ...], now: Optional[float] = None) -> Optional[List[Box]]:
+        """Return the regions to decode, or ``None`` for a full-frame scan."""
+        now = time.monotonic() if now is None else now
+        self._boxes = [(box, seen) for box, seen in self._boxes if now - seen <= self.ttl]
+        if not self._boxes or self._since_full + 1 >= self.full_scan_every:
+            self._since_full = 0
+            self.full_scans += 1
+            return None
+        self._since_full += 1
+        self.roi_scans += 1
+        height, width = shape[:2]
+        grown = []
+        for x1, y1, x2, y2 in (box for box, _ in self._boxes):
+            dx = max(self.min_margin, int((x2 - x1) * self.padding))
+            dy = max(self.min_margin, int((y2 - y1) * self.padding))
+            grown.append((max(0, x1 - dx), max(0, y1 - dy), min(width, x2 + dx), min(height, y2 + dy)))
+        return merge_boxes(grown)
+
+    def update(self, polygons: Iterable[np.ndarray], now: Optional[float] = None) -> None:
+        """Record the bounding boxes of the ``polygons`` found in a frame."""
+        now = time.monotonic() if now is None else now
+        for pts in polygons:
+            x1, y1 = pts.min(axis=0)
+            x2, y2 = pts.max(axis=0)
+            box = (int(x1), int(y1), int(x2) + 1, int(y2) + 1)
+            kept = []
+            for old, seen in self._boxes:
+                if not _overlaps(old, box):
+                    kept.append((old, seen))
+                elif seen == now:  # overlapping codes of the same frame
+                    box = _union(box, old)
+            kept.append((box, now))
+            self._boxes = kept
+        del self._boxes[: -self.max_boxes]
+
+    def reset(self) -> None:
+        self._boxes.clear()
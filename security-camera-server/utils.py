@@ -6,10 +6,11 @@ from __future__ import annotations
 import os
 import time
 import urllib.request
+import uuid
+from datetime import datetime, timezone
 from typing import Dict, Optional
 
-import requests
-
+import cv2  # type: ignore
 
 BASE_WECHAT_URL = (
     "https://raw.githubusercontent.com/WeChatCV/opencv_3rdparty/wechat_qrcode/"
@@ -40,40 +41,41 @@ def parse_camera_info(info_path: str) -> Dict[str, str]:
     return info
 
 
-def send_barcode(data: str, info: Dict[str, str], last: Dict[str, float]) -> Optional[bool]:
-    """Send scanned ``data`` to the server with rate limiting.
+def is_enabled(value: str) -> bool:
+    """Interpret a yes/no setting from ``camera_info.txt``."""
+    return value.strip().lower() in ("1", "yes", "true", "on")
 
-    Returns the validation result if provided by the server.
-    """
-    if not data:
-        return None
 
-    now = time.time()
-    if now - last.get(data, 0) < 2:
+def open_capture(camera_url: str) -> Optional[cv2.VideoCapture]:
+    """Open ``camera_url`` (a device index or stream URL), or return ``None``."""
+    cap = cv2.VideoCapture(int(camera_url) if camera_url.isdigit() else camera_url)
+    if not cap.isOpened():
+        cap.release()
         return None
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 1080)
+    return cap
+
+
+def server_url(info: Dict[str, str]) -> str:
+    """Return the base URL of the scan server described by ``info``."""
+    return f"http://{info.get('Server IP', 'localhost')}:{info.get('Port', '5000')}"
 
-    payload = {
+
+def build_payload(data: str, info: Dict[str, str], captured_at: Optional[float] = None) -> Dict[str, str]:
+    """Build the scan payload for ``data`` captured at ``captured_at``.
+
+    ``scan_id`` is unique per scan, so the server stores retried or replayed
+    deliveries only once.
+    """
+    captured = datetime.fromtimestamp(captured_at or time.time(), timezone.utc)
+    return {
         "barcode": data,
         "camera_name": info.get("Camera Name", ""),
         "area": info.get("Camera Area", ""),
         "camera_type": info.get("Camera Type", ""),
         "client_ip": info.get("Client IP", ""),
         "camera_url": info.get("Camera URL", ""),
+        "timestamp": captured.isoformat().replace("+00:00", "Z"),
+        "scan_id": str(uuid.uuid4()),
     }
-    url = f"http://{info.get('Server IP', 'localhost')}:{info.get('Port', '5000')}/api/scan"
-
-    try:
-        resp = requests.post(url, json=payload, timeout=2)
-        if resp.ok:
-            try:
-                result = resp.json()
-                if "valid" in result:
-                    last[data] = now
-                    return bool(result["valid"])
-            except Exception:
-                pass
-    except Exception as exc:  # pragma: no cover - network or server errors
-        print(f"Failed to send barcode data: {exc}")
-
-    last[data] = now
-    return None